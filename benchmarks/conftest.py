@@ -0,0 +1,122 @@
+"""pytest-benchmark suite of the numeric hot paths in src/method
+
+    python -m pytest benchmarks                       # run and compare with benchmarks/baseline.json
+    python -m pytest benchmarks --save-baseline       # run and store the results as the new baseline
+    python -m pytest benchmarks --max-n 10000         # quick run, skip sizes above 1e4
+    python -m pytest benchmarks --slowdown 0.5 --fail-on-slowdown
+
+Every case runs over n=1e2...1e6 (capped where the algorithm is quadratic or cubic in n, see the cases).\
+The mean time comes from pytest-benchmark, the peak memory of one extra run from tracemalloc. A case is\
+flagged when its mean time or peak memory exceeds the baseline by more than `--slowdown`.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+SIZES=[10**k for k in range(2,7)]
+_HERE=os.path.dirname(os.path.abspath(__file__))
+_RESULTS={}
+
+def sizes(max_n:int=10**6):
+    """n values of a case, capped at max_n"""
+    return [n for n in SIZES if n<=max_n]
+
+def pytest_addoption(parser):
+    group=parser.getgroup("method benchmarks")
+    group.addoption("--max-n",type=int,default=10**6,help="skip cases with a larger n")
+    group.addoption("--baseline",default=os.path.join(_HERE,"baseline.json"),help="JSON file of the baseline")
+    group.addoption("--save-baseline",action="store_true",help="store the results into the baseline file")
+    group.addoption("--slowdown",type=float,default=0.25,
+                    help="flag cases slower (or using more memory) than the baseline by this fraction")
+    group.addoption("--fail-on-slowdown",action="store_true",help="exit with an error if any case is flagged")
+
+@pytest.fixture
+def measure(benchmark,request):
+    """measure(func, *args) times func(*args) with pytest-benchmark and records its peak memory
+
+    The number of rounds is chosen from one warm-up call, so that every case takes about one second.
+    """
+    n=request.node.callspec.params.get("n") if hasattr(request.node,"callspec") else None
+    if n is not None and n>request.config.getoption("--max-n"):
+        pytest.skip(f"n={n} is larger than --max-n")
+
+    def run(func,*args,max_rounds:int=20):
+        start=time.perf_counter()
+        func(*args)
+        elapsed=time.perf_counter()-start
+        rounds=int(np.clip(1.0/max(elapsed,1e-9),1,max_rounds))
+        result=benchmark.pedantic(func,args=args,rounds=rounds,iterations=1)
+        # with --benchmark-disable the function is called once and no statistics are collected
+        mean=benchmark.stats.stats.mean if benchmark.stats is not None else elapsed
+        tracemalloc.start()
+        try:
+            func(*args)
+            peak=tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory"]=peak
+        benchmark.extra_info["n"]=n
+        record_result(request.node,mean,peak,n)
+        return result
+    return run
+
+def record_result(node,mean:float,peak_memory:int=0,n:int=None):
+    """add a result measured without `measure` to the baseline comparison (peak_memory=0 is not compared)"""
+    # keyed by file and test name, node ids depend on the rootdir of the run
+    _RESULTS[f"{node.path.name}::{node.name}"]={"mean":mean,"peak_memory":peak_memory,"n":n}
+
+def _compare(baseline,slowdown):
+    flagged=[]
+    for name,result in sorted(_RESULTS.items()):
+        base=baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("mean","peak_memory"):
+            if base[metric]>0 and result[metric]>(1+slowdown)*base[metric]:
+                flagged.append((name,metric,base[metric],result[metric]))
+    return flagged
+
+def pytest_sessionfinish(session,exitstatus):
+    if not _RESULTS:
+        return
+    config=session.config
+    path=config.getoption("--baseline")
+    try:
+        with open(path) as f:
+            stored=json.load(f)
+    except FileNotFoundError:
+        stored={"machine":{},"results":{}}
+    config._method_baseline=bool(stored["results"])
+    config._method_flagged=_compare(stored["results"],config.getoption("--slowdown"))
+    if config.getoption("--save-baseline"):
+        stored["machine"]={"python":platform.python_version(),"numpy":np.__version__,
+                           "platform":platform.platform(),"processor":platform.processor()}
+        stored["results"].update(_RESULTS)
+        with open(path,"w") as f:
+            json.dump(stored,f,indent=1,sort_keys=True)
+    elif config._method_flagged and config.getoption("--fail-on-slowdown"):
+        session.exitstatus=1
+
+def pytest_terminal_summary(terminalreporter,exitstatus,config):
+    flagged=getattr(config,"_method_flagged",None)
+    if flagged is None:
+        return
+    if config.getoption("--save-baseline"):
+        terminalreporter.write_line(f"baseline saved to {config.getoption('--baseline')}")
+    if not getattr(config,"_method_baseline",True):
+        terminalreporter.write_line(f"no baseline at {config.getoption('--baseline')}, use --save-baseline")
+        return
+    if not flagged:
+        terminalreporter.write_line(f"no case exceeds the baseline by more than {config.getoption('--slowdown'):.0%}")
+        return
+    terminalreporter.section("slower than baseline")
+    for name,metric,base,value in flagged:
+        terminalreporter.write_line(f"{name}  {metric}: {base:.4g} -> {value:.4g} (x{value/base:.2f})",red=True)
@@ -0,0 +1,81 @@
+import math
+import numpy as np
+import pytest
+from conftest import sizes
+from src.method.backend import BACKEND, numba_available
+from src.method.chromatography import HPLCSimulator, CHROM_SCHEME
+from src.method.devint import intergration_func, INTEGRATION_TYPE
+from src.method.interpolation import Interpolation, INTERPOLATE_TYPE
+from src.method.regression import Regressor
+from src.method.regression.RegressUtils import holliday
+
+# every case is timed with both backends and checked against the NumPy result (parity)
+BACKENDS=[BACKEND.NUMPY,pytest.param(BACKEND.NUMBA,marks=pytest.mark.skipif(not numba_available(),
+                                                                             reason="numba is not installed"))]
+
+def _piecewise(x):
+    # per-point control flow, numba compiles it, NumPy calls it point by point
+    return math.exp(-x)*math.sin(3*x) if x>1 else x*x
+
+@pytest.mark.parametrize("backend",BACKENDS,ids=lambda b:b.name)
+@pytest.mark.parametrize("n",sizes(10**5))
+def test_regressor_jacobian(measure,n,backend):
+    x=np.linspace(0,5,n)
+    y=holliday(x,2.0,0.3,0.1)+np.random.default_rng(0).normal(0,0.001,n)
+    def fit(backend):
+        regressor=Regressor(holliday,x,y,initial_para=np.array([1.5,0.2,0.2]),max_iter=10,tol=0)
+        return regressor.fit(cache=False,backend=backend)[0]
+    fit(backend) # compiled outside the measurement
+    parameters=measure(fit,backend)
+    assert parameters==pytest.approx(fit(BACKEND.NUMPY),rel=1e-8)
+
+@pytest.mark.parametrize("backend",BACKENDS,ids=lambda b:b.name)
+@pytest.mark.parametrize("n",sizes(10**2))
+def test_lagrange_value(measure,n,backend):
+    # Chebyshev points keep the interpolation well conditioned, 100 evaluations of o(n^2); the products of\
+    # the Lagrange basis overflow beyond a few hundred points
+    x=np.sort(np.cos(np.pi*(np.arange(n)+0.5)/n))
+    interpolation=Interpolation(x,np.exp(x),INTERPOLATE_TYPE.LAGRANGE)
+    points=np.linspace(-0.9,0.9,100)
+    def evaluate(backend):
+        return np.array([interpolation(val,backend=backend) for val in points])
+    evaluate(backend)
+    values=measure(evaluate,backend)
+    assert values==pytest.approx(evaluate(BACKEND.NUMPY),rel=1e-10)
+
+@pytest.mark.parametrize("backend",BACKENDS,ids=lambda b:b.name)
+@pytest.mark.parametrize("n",sizes(10**2))
+def test_lagrange_derivative(measure,n,backend):
+    # o(n^3) per evaluation, the NumPy backend holds an n^3 array
+    x=np.sort(np.cos(np.pi*(np.arange(n)+0.5)/n))
+    interpolation=Interpolation(x,np.exp(x),INTERPOLATE_TYPE.LAGRANGE)
+    points=np.linspace(-0.9,0.9,20)
+    def evaluate(backend):
+        return np.array([interpolation.derivative(val,backend=backend) for val in points])
+    evaluate(backend)
+    values=measure(evaluate,backend)
+    assert values==pytest.approx(evaluate(BACKEND.NUMPY),rel=1e-9)
+    assert values==pytest.approx(np.exp(points),rel=1e-6)
+
+@pytest.mark.parametrize("backend",BACKENDS,ids=lambda b:b.name)
+@pytest.mark.parametrize("rule",[INTEGRATION_TYPE.TRAPZOID,INTEGRATION_TYPE.BOOLE],ids=lambda r:r.name)
+@pytest.mark.parametrize("n",sizes(10**5))
+def test_newton_cotes(measure,n,rule,backend):
+    intergration_func(0,4,_piecewise,rule,10,backend=backend)
+    area=measure(lambda:intergration_func(0,4,_piecewise,rule,n,False,backend=backend))
+    assert area==intergration_func(0,4,_piecewise,rule,n,False,backend=BACKEND.NUMPY)
+
+@pytest.mark.parametrize("backend",BACKENDS,ids=lambda b:b.name)
+@pytest.mark.parametrize("scheme",[CHROM_SCHEME.EXPLICIT,CHROM_SCHEME.CRANK_NICOLSON],ids=lambda s:s.name)
+@pytest.mark.parametrize("n",sizes(10**4))
+def test_hplc_time_loop(measure,n,scheme,backend):
+    # n grid points, 200 steps, two components
+    dx=10.0/n
+    dt=0.2*dx if scheme==CHROM_SCHEME.EXPLICIT else 0.05
+    simulator=HPLCSimulator(dx=dx,dt=dt,D=np.array([0.001,0.002]),Ka=np.array([0.1,0.2]),scheme=scheme)
+    inlet=lambda t:1.0 if t<0.5 else 0.0
+    simulator.simulate(2,inlet=inlet,save_every=None,backend=backend)
+    field=measure(simulator.simulate,200,None,inlet,50,None,backend)
+    detector=simulator.detector.copy()
+    assert field==pytest.approx(simulator.simulate(200,None,inlet,50,backend=BACKEND.NUMPY),abs=1e-12)
+    assert detector==pytest.approx(simulator.detector,abs=1e-12)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from conftest import sizes
+from src.method.devint import (derivative_discrete, integration_discrete, derivative_func, intergration_func,
+                               derivative_stencil, derivative_ridders, savgol_filter, savgol_stream,
+                               DERIVATIZATION_TYPE, INTEGRATION_TYPE)
+
+def _func(x):
+    return np.sin(x)+0.1*x**2
+
+# scalar Ridders extrapolation costs up to 2*max_levels evaluations plus the tableau per point
+CASES=[(t,n) for t in DERIVATIZATION_TYPE for n in sizes(10**4 if t==DERIVATIZATION_TYPE.RIDDERS else 10**6)]
+
+@pytest.mark.parametrize("dev_type,n",CASES,ids=[f"{t.name}-{n}" for t,n in CASES])
+def test_derivative_func(measure,n,dev_type):
+    # n scalar derivatives
+    points=np.linspace(-5,5,n)
+    measure(lambda:[derivative_func(val,_func,dev_type) for val in points])
+
+@pytest.mark.parametrize("intergral_type",list(INTEGRATION_TYPE),ids=lambda t:t.name)
+@pytest.mark.parametrize("n",sizes())
+def test_intergration_func(measure,n,intergral_type):
+    # n sub-domains
+    area=measure(intergration_func,0.0,np.pi,_func,intergral_type,n)
+    assert area==pytest.approx(2+0.1*np.pi**3/3,rel=1e-3)
+
+@pytest.mark.parametrize("order",[1,2])
+@pytest.mark.parametrize("n",sizes())
+def test_derivative_stencil(measure,n,order):
+    # n points in one vectorized call
+    points=np.linspace(-5,5,n)
+    dev=measure(derivative_stencil,points,_func,order,4)
+    assert dev.shape==(n,)
+
+@pytest.mark.parametrize("n",sizes())
+def test_derivative_ridders(measure,n):
+    # n points in one batch
+    points=np.linspace(-5,5,n)
+    result=measure(derivative_ridders,points,_func)
+    assert np.allclose(result["derivative"],np.cos(points)+0.2*points,atol=1e-9)
+
+@pytest.mark.parametrize("uniform",[True,False],ids=["uniform","nonuniform"])
+@pytest.mark.parametrize("accuracy",[2,4])
+@pytest.mark.parametrize("n",sizes())
+def test_derivative_discrete(measure,n,accuracy,uniform):
+    x=np.linspace(0,10,n) if uniform else np.sort(np.random.default_rng(0).uniform(0,10,n))
+    dev=measure(derivative_discrete,x,_func(x),1,accuracy)
+    assert dev.shape==(n,)
+
+@pytest.mark.parametrize("n",sizes())
+def test_integration_discrete(measure,n):
+    x=np.linspace(0,np.pi,n)
+    area=measure(integration_discrete,x,_func(x))
+    assert area==pytest.approx(2+0.1*np.pi**3/3,rel=1e-3)
+
+@pytest.mark.parametrize("deriv",[0,1])
+@pytest.mark.parametrize("n",sizes())
+def test_savgol_filter(measure,n,deriv):
+    x=np.linspace(0,10,n)
+    y=_func(x)+1e-3*np.random.default_rng(0).standard_normal(n)
+    filtered=measure(savgol_filter,y,21,3,deriv,x)
+    assert filtered.shape==(n,)
+
+@pytest.mark.parametrize("n",sizes())
+def test_savgol_filter_nonuniform(measure,n):
+    x=np.sort(np.random.default_rng(0).uniform(0,10,n))
+    filtered=measure(savgol_filter,_func(x),21,3,1,x)
+    assert filtered.shape==(n,)
+
+@pytest.mark.parametrize("n",sizes())
+def test_savgol_stream(measure,n):
+    # 8 signals in chunks of 1e4 samples
+    y=np.random.default_rng(0).standard_normal((8,n))
+    chunks=np.array_split(y,max(1,n//10**4),axis=1)
+    measure(lambda:[part for part in savgol_stream(chunks,21,3)])
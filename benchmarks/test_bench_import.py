@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+import pytest
+from conftest import record_result
+
+_ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+# modules that must not be loaded by importing the package (only by the functions that use them)
+HEAVY=["scipy","matplotlib","multiprocessing.pool","sympy"]
+STATEMENTS={
+    "package":"import src.method.regression",
+    "linregress":"from src.method.regression import LinRegressor",
+    "everything":"from src.method.regression import *",
+    "devint":"from src.method.devint import derivative_func",
+    "interpolation":"from src.method.interpolation import Interpolation",
+}
+
+def _import_in_subprocess(statement):
+    # a fresh interpreter per run, numpy is imported first so only the package itself is timed
+    code=(f"import sys,time,json,numpy\nstart=time.perf_counter()\n{statement}\n"
+          f"print(json.dumps([time.perf_counter()-start,[m for m in {HEAVY!r} if m in sys.modules]]))")
+    output=subprocess.run([sys.executable,"-c",code],cwd=_ROOT,capture_output=True,text=True,check=True)
+    return json.loads(output.stdout)
+
+@pytest.mark.parametrize("name",list(STATEMENTS))
+def test_import_time(request,name,rounds=7):
+    # interpreter startup would dominate a benchmark of the whole subprocess, so the import itself is timed
+    # inside it and the median is compared with the baseline
+    times=[]
+    for _ in range(rounds):
+        elapsed,loaded=_import_in_subprocess(STATEMENTS[name])
+        assert not loaded,f"{STATEMENTS[name]} loads {loaded}"
+        times.append(elapsed)
+    record_result(request.node,float(np.median(times)))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from conftest import sizes
+from src.method.interpolation import Interpolation, INTERPOLATE_TYPE
+
+# construction of cubic splines solves a dense (4n-4)*(4n-4) system, Lagrange evaluation is o(n^2) per point\
+# and its derivative o(n^3), so these cases stop at smaller n
+MAX_N={INTERPOLATE_TYPE.LINEAR:10**6,INTERPOLATE_TYPE.CUBIC:10**3,INTERPOLATE_TYPE.LAGRANGE:10**2}
+NUM_EVAL={INTERPOLATE_TYPE.LINEAR:1000,INTERPOLATE_TYPE.CUBIC:1000,INTERPOLATE_TYPE.LAGRANGE:20}
+NUM_DERIVATIVE={INTERPOLATE_TYPE.LINEAR:1000,INTERPOLATE_TYPE.CUBIC:1000,INTERPOLATE_TYPE.LAGRANGE:1}
+BOUNDS={INTERPOLATE_TYPE.LINEAR:(0.05,9.95),INTERPOLATE_TYPE.CUBIC:(0.05,9.95),INTERPOLATE_TYPE.LAGRANGE:(4.5,5.5)}
+CASES=[(t,n) for t in INTERPOLATE_TYPE for n in sizes(MAX_N[t])]
+IDS=[f"{t.name}-{n}" for t,n in CASES]
+
+def _data(n,interpo_type):
+    if interpo_type==INTERPOLATE_TYPE.LAGRANGE:
+        # Chebyshev nodes, equidistant nodes make high degree polynomials oscillate
+        x=5-5*np.cos(np.linspace(0,np.pi,n))
+    else:
+        x=np.linspace(0,10,n)
+    return x,np.sin(x)
+
+pytestmark=pytest.mark.filterwarnings("ignore:If there are too many points")
+
+@pytest.mark.parametrize("interpo_type,n",CASES,ids=IDS)
+def test_construct(measure,interpo_type,n):
+    x,y=_data(n,interpo_type)
+    measure(Interpolation,x,y,interpo_type,False)
+
+@pytest.mark.parametrize("interpo_type,n",CASES,ids=IDS)
+def test_call(measure,interpo_type,n):
+    x,y=_data(n,interpo_type)
+    interpolation=Interpolation(x,y,interpo_type,False)
+    points=np.linspace(0,10,NUM_EVAL[interpo_type])
+    values=measure(lambda:[interpolation(val) for val in points])
+    assert np.allclose(values,np.sin(points),atol=1e-2)
+
+@pytest.mark.parametrize("interpo_type,n",CASES,ids=IDS)
+def test_derivative(measure,interpo_type,n):
+    x,y=_data(n,interpo_type)
+    interpolation=Interpolation(x,y,interpo_type,False)
+    points=np.linspace(0.01,9.99,NUM_DERIVATIVE[interpo_type])
+    measure(lambda:[interpolation.derivative(val) for val in points])
+
+@pytest.mark.parametrize("interpo_type,n",CASES,ids=IDS)
+def test_integration(measure,interpo_type,n):
+    x,y=_data(n,interpo_type)
+    interpolation=Interpolation(x,y,interpo_type,False)
+    lb,ub=BOUNDS[interpo_type]
+    area=measure(interpolation.integration,lb,ub)
+    assert area==pytest.approx(np.cos(lb)-np.cos(ub),abs=1e-2)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from conftest import sizes
+from src.method.peaks import find_peaks, find_peaks_batch
+
+def _trace(n,rng):
+    # 20 Gaussian peaks on a drifting baseline
+    t=np.linspace(0,100,n)
+    signal=0.01*t+0.005*rng.standard_normal(n)
+    for rt in np.linspace(5,95,20):
+        signal+=rng.uniform(0.1,2.0)*np.exp(-0.5*((t-rt)/0.5)**2)
+    return t,signal
+
+# 20 peaks could not be resolved with 100 samples
+@pytest.mark.parametrize("n",sizes()[1:])
+def test_find_peaks(measure,n):
+    t,signal=_trace(n,np.random.default_rng(0))
+    peaks=measure(find_peaks,t,signal,None,11 if n<10**5 else 51)
+    assert len(peaks)==20
+
+@pytest.mark.parametrize("n",sizes(10**4)[1:])
+def test_find_peaks_batch(measure,n):
+    # 256 injections of n samples
+    rng=np.random.default_rng(0)
+    t,_=_trace(n,rng)
+    signals=np.stack([_trace(n,rng)[1] for _ in range(256)])
+    peaks=measure(find_peaks_batch,t,signals)
+    assert np.all(np.bincount(peaks["injection"])==20)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from conftest import sizes
+from src.method.regression import LinRegressor, SAPARATE_DELETE, PolynomialRegressor, PolyvarRegressor, Regressor
+from src.method.regression.lasso import LASSO, LASSO_SOLVER
+from src.method.regression.robust import ROBUST_LOSS
+from src.method.regression.consensus import consensus_fit
+from src.method.regression.RegressUtils import hyperbl
+
+def _line(n,outliers=0.05):
+    rng=np.random.default_rng(0)
+    x=np.linspace(0,10,n)
+    y=3.5*x+4.2+rng.normal(0,0.5,n)
+    idx=rng.choice(n,int(outliers*n),replace=False)
+    y[idx]+=rng.normal(0,30,len(idx))
+    return x,y
+
+# the Jacobian takes one vectorized call per parameter, max_iter is fixed so the time is o(n)
+@pytest.mark.parametrize("n",sizes(10**5))
+def test_regressor_fit(measure,n):
+    x=np.linspace(2,10,n)
+    y=hyperbl(x,4.5,6.5)+np.random.default_rng(0).normal(0,0.01,n)
+    def fit():
+        return Regressor(hyperbl,x,y,initial_para=np.array([4.0,6.0]),max_iter=10,tol=0).fit(cache=False)
+    parameters,_=measure(fit)
+    assert parameters==pytest.approx([4.5,6.5],rel=1e-2)
+
+@pytest.mark.parametrize("n",sizes())
+def test_linregressor(measure,n):
+    x,y=_line(n,outliers=0)
+    slope,intercept,*_=measure(lambda:LinRegressor(x,y).fit(cache=False))
+    assert slope==pytest.approx(3.5,rel=1e-2)
+
+# every RANSAC/LMedS trial pickles the data to a worker process
+@pytest.mark.parametrize("optim_method",list(SAPARATE_DELETE),ids=lambda m:m.name)
+@pytest.mark.parametrize("n",sizes())
+def test_linregressor_outliers(measure,n,optim_method):
+    if optim_method in (SAPARATE_DELETE.RANSAC,SAPARATE_DELETE.LMedS) and n>10**5:
+        pytest.skip("RANSAC and LMedS are benchmarked up to n=1e5")
+    x,y=_line(n)
+    def fit():
+        return LinRegressor(x,y,del_saparated_point=True,optim_method=optim_method).fit(cache=False)
+    slope,intercept,*_=measure(fit,max_rounds=5)
+    assert slope==pytest.approx(3.5,rel=0.1)
+
+@pytest.mark.parametrize("degree",[3,8])
+@pytest.mark.parametrize("n",sizes())
+def test_polynomial(measure,n,degree):
+    x=np.linspace(-1,1,n)
+    truth=np.polynomial.polynomial.polyval(x,np.arange(1,degree+2))
+    y=truth+np.random.default_rng(0).normal(0,0.01,n)
+    weights,*_=measure(lambda:PolynomialRegressor(x,y,degree=degree).fit(cache=False))
+    assert np.polynomial.polynomial.polyval(x,weights)==pytest.approx(truth,abs=0.05)
+
+@pytest.mark.parametrize("robust",list(ROBUST_LOSS),ids=lambda r:r.name)
+@pytest.mark.parametrize("n",sizes())
+def test_polynomial_robust(measure,n,robust):
+    # 10% of the points are shifted by 5
+    rng=np.random.default_rng(0)
+    x=np.linspace(-1,1,n)
+    truth=np.polynomial.polynomial.polyval(x,np.arange(1,5))
+    y=truth+rng.normal(0,0.01,n)+np.where(rng.random(n)<0.1,5.0,0.0)
+    weights,*_=measure(lambda:PolynomialRegressor(x,y,degree=3).fit(cache=False,robust=robust),max_rounds=5)
+    assert np.polynomial.polynomial.polyval(x,weights)==pytest.approx(truth,abs=0.05)
+
+@pytest.mark.parametrize("method",[SAPARATE_DELETE.RANSAC,SAPARATE_DELETE.LMedS],ids=lambda m:m.name)
+@pytest.mark.parametrize("n",sizes())
+def test_polynomial_consensus(measure,n,method):
+    # 30% of the points are gross errors, hypotheses are scored in batches of min(64,2^21/n)
+    rng=np.random.default_rng(0)
+    x=np.linspace(-1,1,n)
+    truth=np.polynomial.polynomial.polyval(x,np.arange(1,5))
+    y=truth+rng.normal(0,0.01,n)+np.where(rng.random(n)<0.3,rng.uniform(-5,5,n),0.0)
+    result=measure(lambda:consensus_fit(PolynomialRegressor(x,y,degree=3),method,seed=0),max_rounds=5)
+    assert result["params"]==pytest.approx(np.arange(1,5),abs=0.05)
+
+@pytest.mark.parametrize("n",sizes())
+def test_polyvar(measure,n):
+    rng=np.random.default_rng(0)
+    X=rng.normal(size=(n,10))
+    y=X.dot(np.arange(1,11))+2+rng.normal(0,0.1,n)
+    weights,*_=measure(lambda:PolyvarRegressor(X,y).fit())
+    assert np.ravel(weights)==pytest.approx(np.arange(0,11)+np.eye(11)[0]*2,abs=0.1)
+
+# X is n*50, 400 MB at n=1e6
+@pytest.mark.parametrize("solver",list(LASSO_SOLVER),ids=lambda s:s.name)
+@pytest.mark.parametrize("n",sizes(10**5))
+def test_lasso(measure,n,solver):
+    rng=np.random.default_rng(0)
+    X=rng.normal(size=(n,50))
+    w=np.zeros(50)
+    w[:5]=[3,-2,1.5,4,-1]
+    y=X.dot(w)+rng.normal(0,0.1,n)
+    weights,_=measure(LASSO,X,y,0.01,None,1e-6,500,solver,max_rounds=5)
+    assert np.ravel(weights)[:5]==pytest.approx(w[:5],abs=0.1)
@@ -1,49 +1,218 @@
 import sys
+import os
+import time
+import threading
 import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QTableView, QFileDialog, QDialog, QLabel, QComboBox, QDialogButtonBox
 )
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.method.plotting import plot_lod, update_line
+from src.method.interpolation import Interpolation, INTERPOLATE_TYPE
+from src.method.regression import LinRegressor, PolynomialRegressor, Regressor, FitCancelled
+from src.method.regression.RegressUtils import expdec
+
 
 class TableModel(QAbstractTableModel):
-    def __init__(self, data):
+    def __init__(self, data, batch_size=10000):
         super().__init__()
-        self._data = data  # 2D list
+        # 列存储：每一列在内存中连续，按列提取绘图数据无需逐个单元格转换
+        data = np.asarray(data, dtype=float)
+        if data.ndim != 2:
+            raise ValueError("Table data should be a 2D array.")
+        self._data = np.array(data, dtype=float, order="F")
+        self._rows = data.shape[0]  # 有效行数（_data 可能预留了额外容量）
+        self._loaded = min(self._rows, batch_size)  # 已交给视图的行数
+        self.batch_size = batch_size
+
+    @property
+    def values(self):
+        return self._data[:self._rows]
 
     def data(self, index, role):
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            return str(self._data[index.row()][index.column()])
+            # 只格式化视图请求的单元格
+            value = self._data[index.row(), index.column()]
+            return "" if np.isnan(value) else f"{value:.10g}"
 
     def setData(self, index, value, role):
         if role == Qt.EditRole:
             try:
-                self._data[index.row()][index.column()] = float(value)
+                self._data[index.row(), index.column()] = float(value) if value != "" else np.nan
             except ValueError:
-                self._data[index.row()][index.column()] = value
+                return False
+            self.dataChanged.emit(index, index)
             return True
+        return False
 
     def rowCount(self, _=None):
-        return len(self._data)
+        return self._loaded
 
     def columnCount(self, _=None):
-        return len(self._data[0]) if self._data else 0
+        return self._data.shape[1]
+
+    def canFetchMore(self, _=None):
+        return self._loaded < self._rows
+
+    def fetchMore(self, _=None):
+        count = min(self.batch_size, self._rows - self._loaded)
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
 
     def flags(self, index):
         return Qt.ItemIsSelectable | Qt.ItemIsEditable | Qt.ItemIsEnabled
 
+    def column(self, col, start=0, stop=None):
+        """第 col 列 [start, stop) 行的视图（不复制数据）"""
+        stop = self._rows if stop is None else min(stop, self._rows)
+        return self._data[start:stop, col]
+
+    def set_data(self, data):
+        self.beginResetModel()
+        data = np.asarray(data, dtype=float)
+        self._data = np.array(data.reshape(len(data), -1), order="F")
+        self._rows = self._data.shape[0]
+        self._loaded = min(self._rows, self.batch_size)
+        self.endResetModel()
+
     def add_row(self):
-        self.beginInsertRows(QModelIndex(), len(self._data), len(self._data))
-        self._data.append([0.0] * self.columnCount())
-        self.endInsertRows()
+        if self._rows == self._data.shape[0]:
+            # 容量按倍数增长，避免每次添加行都复制整个表格
+            grown = np.zeros((max(2 * self._rows, 16), self._data.shape[1]), order="F")
+            grown[:self._rows] = self._data[:self._rows]
+            self._data = grown
+        self._data[self._rows] = 0.0
+        self._rows += 1
+        if self._loaded == self._rows - 1:
+            self.beginInsertRows(QModelIndex(), self._loaded, self._loaded)
+            self._loaded += 1
+            self.endInsertRows()
 
     def add_column(self):
-        for row in self._data:
-            row.append(0.0)
-        self.layoutChanged.emit()
+        col = self._data.shape[1]
+        self.beginInsertColumns(QModelIndex(), col, col)
+        self._data = np.concatenate((self._data, np.zeros((self._data.shape[0], 1))), axis=1)
+        self._data = np.asfortranarray(self._data)
+        self.endInsertColumns()
+
+    def load_csv(self, path, delimiter=","):
+        self.set_data(np.loadtxt(path, delimiter=delimiter, ndmin=2))
+
+    def save_csv(self, path, delimiter=","):
+        np.savetxt(path, self.values, delimiter=delimiter, fmt="%.10g")
+
+
+def _curve(x, func, num_points=500):
+    xs = np.linspace(np.min(x), np.max(x), num_points)
+    return xs, func(xs)
+
+
+def fit_linear(x, y, report, cancel):
+    model = LinRegressor(x, y)
+    slope, intercept, _, Rsq, _ = model.fit()
+    return f"y={slope:.6g}x{intercept:+.6g}, R²={Rsq:.6f}", _curve(x, model)
+
+
+def fit_ransac(x, y, report, cancel, max_iter=500):
+    model = LinRegressor(x, y, del_saparated_point=True, max_iter=max_iter)
+    best = {"num_inliers": -1}
+
+    def callback(iteration, result):
+        # 只有出现更好的小模型时才更新曲线
+        improved = result["num_inliers"] > best["num_inliers"]
+        if improved:
+            best.update(result)
+        report(f"RANSAC {iteration + 1}/{max_iter}，内点数 {best['num_inliers']}",
+               _curve(x, lambda xs: best["slope"] * xs + best["intercept"]) if improved else None,
+               force=improved)
+
+    slope, intercept, _, Rsq, _ = model.fit(callback=callback, cancel=cancel)
+    return f"y={slope:.6g}x{intercept:+.6g}, R²={Rsq:.6f}，内点 {len(model.inlier_id)}/{len(x)}", _curve(x, model)
+
+
+def fit_cubic(x, y, report, cancel):
+    model = PolynomialRegressor(x, y, degree=3)
+    _, _, Rsq, _ = model.fit()
+    return f"三次多项式，R²={Rsq:.6f}", _curve(x, model)
+
+
+def fit_expdec(x, y, report, cancel):
+    model = Regressor(expdec, x, y, max_iter=2000, tol=1e-8)
+
+    def callback(iteration, loss, lamb, parameters):
+        report(f"迭代 {iteration + 1}，损失 {loss:.6g}，阻尼 {lamb:.3g}",
+               lambda: _curve(x, lambda xs: expdec(xs, *parameters)))
+
+    parameters, _ = model.fit(callback=callback, cancel=cancel)
+    return "y=a+exp(-bx+c)，" + "，".join(f"{k}={v:.6g}" for k, v in zip("abc", parameters)), _curve(x, model)
+
+
+def fit_spline(x, y, report, cancel, chunk=100):
+    model = Interpolation(x, y, INTERPOLATE_TYPE.CUBIC)
+    xs = np.linspace(x[0], x[-1], 500)
+    ys = np.empty_like(xs)
+    for start in range(0, len(xs), chunk):
+        if cancel.is_set():
+            raise FitCancelled("Fitting is cancelled.")
+        ys[start:start + chunk] = [model(v) for v in xs[start:start + chunk]]
+    return "三次样条插值", (xs, ys)
+
+
+FIT_METHODS = {
+    "线性回归": fit_linear,
+    "线性回归 (RANSAC)": fit_ransac,
+    "三次多项式": fit_cubic,
+    "指数衰减 (非线性)": fit_expdec,
+    "三次样条插值": fit_spline,
+}
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(str, object)  # 进度文字，当前曲线 (x, y) 或 None
+    result = pyqtSignal(str, object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class FitWorker(QRunnable):
+    def __init__(self, task, x, y, interval=0.05):
+        """在线程池中运行 task(x, y, report, cancel)，通过信号把进度和结果交给主线程"""
+        super().__init__()
+        self.task, self.x, self.y = task, x, y
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        self.interval = interval
+        self._last = 0.0
+
+    def cancel(self):
+        # 协作式取消：拟合循环在下一次迭代前检查该标志
+        self.cancel_event.set()
+
+    def report(self, text, curve=None, force=False):
+        # 限制进度信号的频率，避免堆满主线程的事件队列；curve 可以是函数，只在真正发送时计算
+        now = time.monotonic()
+        if force or now - self._last >= self.interval:
+            self._last = now
+            self.signals.progress.emit(text, curve() if callable(curve) else curve)
+
+    def run(self):
+        try:
+            text, curve = self.task(self.x, self.y, self.report, self.cancel_event)
+        except FitCancelled:
+            self.signals.cancelled.emit()
+        except Exception as err:
+            self.signals.error.emit(str(err))
+        else:
+            self.signals.result.emit(text, curve)
+        finally:
+            self.signals.finished.emit()
 
 
 class MatplotlibCanvas(FigureCanvas):
@@ -51,12 +220,27 @@ class MatplotlibCanvas(FigureCanvas):
         self.fig = Figure(figsize=(5, 4))
         self.ax = self.fig.add_subplot(111)
         super().__init__(self.fig)
+        self.ax.set_title("绘图结果")
+        self.trace = None
+        self.fit_line = None
 
     def plot_data(self, x, y):
-        self.ax.clear()
-        self.ax.plot(x, y, marker='o')
-        self.ax.set_title("绘图结果")
-        self.draw()
+        # 每个像素列只绘制最小值和最大值；再次绘图时复用同一条曲线，不清空坐标轴
+        x, y = np.asarray(x), np.asarray(y)
+        if np.any(np.diff(x) < 0):
+            order = np.argsort(x, kind="stable")
+            x, y = x[order], y[order]
+        if self.trace is None:
+            self.trace = plot_lod(self.ax, x, y, marker='o', markersize=3)
+        else:
+            self.trace.set_data(x, y)
+            self.ax.relim()
+            self.ax.autoscale_view()
+            self.draw_idle()
+
+    def show_fit(self, curve, label=None):
+        # 曲线在工作线程中算好，主线程只替换数据
+        self.fit_line = update_line(self.ax, curve[0], curve[1], self.fit_line, color="red", label=label)
 
 
 class ExportDialog(QDialog):
@@ -83,7 +267,7 @@ class MainApp(QWidget):
         super().__init__()
         self.setWindowTitle("PyQt5 表格 + 图形")
 
-        self.model = TableModel([[0.0 for _ in range(3)] for _ in range(5)])
+        self.model = TableModel(np.zeros((5, 3)))
         self.table = QTableView()
         self.table.setModel(self.model)
         self.table.setSelectionMode(QTableView.ContiguousSelection)
@@ -96,34 +280,108 @@ class MainApp(QWidget):
 
         buttons = QHBoxLayout()
         btn_plot = QPushButton("绘图")
+        btn_import = QPushButton("导入")
         btn_export = QPushButton("导出")
         btn_row = QPushButton("添加行")
         btn_col = QPushButton("添加列")
+        self.fit_choice = QComboBox()
+        self.fit_choice.addItems(list(FIT_METHODS))
+        self.btn_fit = QPushButton("拟合")
+        self.btn_cancel = QPushButton("取消")
+        self.btn_cancel.setEnabled(False)
         btn_plot.clicked.connect(self.plot_selected)
+        btn_import.clicked.connect(self.import_data)
         btn_export.clicked.connect(self.export_data)
         btn_row.clicked.connect(self.model.add_row)
         btn_col.clicked.connect(self.model.add_column)
-        for b in [btn_plot, btn_export, btn_row, btn_col]:
+        self.btn_fit.clicked.connect(self.fit_selected)
+        self.btn_cancel.clicked.connect(self.cancel_fit)
+        for b in [btn_plot, btn_import, btn_export, btn_row, btn_col, self.fit_choice, self.btn_fit, self.btn_cancel]:
             buttons.addWidget(b)
 
+        self.status = QLabel()
+        self.pool = QThreadPool.globalInstance()
+        self.worker = None
+
         main_layout = QVBoxLayout()
         main_layout.addLayout(layout)
         main_layout.addLayout(buttons)
+        main_layout.addWidget(self.status)
 
         self.setLayout(main_layout)
 
+    def selected_xy(self):
+        # ContiguousSelection：选区是一个矩形，用选区范围切片提取整列，不遍历单元格
+        selection = self.table.selectionModel().selection()
+        if selection.isEmpty():
+            return None
+        block = selection[0]
+        if block.right() - block.left() < 1:
+            return None
+        start, stop = block.top(), block.bottom() + 1
+        if self.table.selectionModel().isColumnSelected(block.left(), QModelIndex()):
+            # 选中整列时包括尚未加载到视图的行
+            start, stop = 0, None
+        x = self.model.column(block.left(), start, stop)
+        y = self.model.column(block.left() + 1, start, stop)
+        return x, y
+
     def plot_selected(self):
-        indexes = self.table.selectionModel().selectedIndexes()
-        if not indexes:
-            return
-        rows = sorted(set(i.row() for i in indexes))
-        cols = sorted(set(i.column() for i in indexes))
-        if len(cols) < 2:
-            return
+        selected = self.selected_xy()
+        if selected is not None:
+            self.canvas.plot_data(*selected)
 
-        x = [float(self.model._data[r][cols[0]]) for r in rows]
-        y = [float(self.model._data[r][cols[1]]) for r in rows]
+    def fit_selected(self):
+        selected = self.selected_xy()
+        if selected is None or self.worker is not None:
+            return
+        # 复制并排序，工作线程运行期间表格仍可编辑
+        x, y = (np.array(v, dtype=float) for v in selected)
+        keep = ~(np.isnan(x) | np.isnan(y))
+        order = np.argsort(x[keep], kind="stable")
+        x, y = x[keep][order], y[keep][order]
         self.canvas.plot_data(x, y)
+        # 方法名在启动时记下，拟合期间切换下拉框不影响结果曲线的标签
+        method = self.fit_choice.currentText()
+        self.worker = FitWorker(FIT_METHODS[method], x, y)
+        self.worker.signals.progress.connect(self.on_fit_progress)
+        self.worker.signals.result.connect(lambda text, curve: self.on_fit_result(text, curve, method))
+        self.worker.signals.error.connect(lambda message: self.status.setText(f"拟合失败：{message}"))
+        self.worker.signals.cancelled.connect(lambda: self.status.setText("拟合已取消"))
+        self.worker.signals.finished.connect(self.on_fit_finished)
+        self.btn_fit.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status.setText("拟合中…")
+        self.pool.start(self.worker)
+
+    def cancel_fit(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.status.setText("正在取消…")
+
+    def on_fit_progress(self, text, curve):
+        self.status.setText(text)
+        if curve is not None:
+            self.canvas.show_fit(curve)
+
+    def on_fit_result(self, text, curve, method):
+        self.status.setText(text)
+        self.canvas.show_fit(curve, label=method)
+
+    def on_fit_finished(self):
+        self.worker = None
+        self.btn_fit.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.cancel_fit()
+        self.pool.waitForDone()
+        super().closeEvent(event)
+
+    def import_data(self):
+        path, _ = QFileDialog.getOpenFileName(self, "导入 CSV", "", "CSV文件 (*.csv)")
+        if path:
+            self.model.load_csv(path)
 
     def export_data(self):
         dialog = ExportDialog(self)
@@ -132,9 +390,7 @@ class MainApp(QWidget):
             if fmt == "CSV":
                 path, _ = QFileDialog.getSaveFileName(self, "保存为 CSV", "", "CSV文件 (*.csv)")
                 if path:
-                    with open(path, "w") as f:
-                        for row in self.model._data:
-                            f.write(",".join(map(str, row)) + "\n")
+                    self.model.save_csv(path)
             elif fmt == "PNG":
                 path, _ = QFileDialog.getSaveFileName(self, "保存图像", "", "PNG图片 (*.png)")
                 if path:
@@ -0,0 +1,13 @@
+# submodules are imported on first attribute access (PEP 562), e.g. src.method.regression
+_SUBMODULES=["backend","cache","chromatography","devint","formula","instrument","interpolation","peaks","plotting",
+             "regression","stoichiometry"]
+__all__=list(_SUBMODULES)
+
+def __getattr__(name):
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return importlib.import_module(f".{name}",__name__)
+
+def __dir__():
+    return sorted(set(globals())|set(__all__))
@@ -0,0 +1,91 @@
+import warnings
+import weakref
+from enum import Enum, auto
+
+class BACKEND(Enum):
+    NUMPY=auto() # NumPy, scalar functions are called point by point in Python
+    NUMBA=auto() # loop kernels and scalar functions compiled by numba.njit at their first call
+
+_DEFAULT_BACKEND=BACKEND.NUMPY
+_NUMBA=False # numba module, imported at the first use of BACKEND.NUMBA (None if numba is not installed)
+_KERNELS={} # compiled kernels of this package
+_FUNCTIONS=weakref.WeakKeyDictionary() # compiled user functions, None if numba could not compile them
+
+def set_default_backend(backend:BACKEND=BACKEND.NUMPY):
+    """backend used by the loop kernels (Regressor Jacobian, Lagrange interpolation, Newton-Cotes integration\
+        and the HPLC time step) when no backend is passed, BACKEND.NUMPY by default"""
+    global _DEFAULT_BACKEND
+    _DEFAULT_BACKEND=_as_backend(backend)
+
+def get_default_backend():
+    return _DEFAULT_BACKEND
+
+def numba_available():
+    """whether numba could be imported"""
+    global _NUMBA
+    if _NUMBA is False:
+        try:
+            import numba as _NUMBA
+        except ImportError:
+            _NUMBA=None
+    return _NUMBA is not None
+
+def resolve_backend(backend=None):
+    # None: the default backend; NUMBA falls back to NUMPY (with a warning) when numba is not installed
+    backend=_DEFAULT_BACKEND if backend is None else _as_backend(backend)
+    if backend==BACKEND.NUMBA and not numba_available():
+        warnings.warn("numba is not installed, the NumPy backend is used.")
+        return BACKEND.NUMPY
+    return backend
+
+def jit_run(kernel:callable,functions:tuple,*args):
+    """run `kernel` compiled by numba
+
+    Args:
+        kernel (callable): loop kernel written for numba (a plain Python function), compiled once
+        functions (tuple): user functions passed to the kernel before `args`, each compiled once
+        *args: other arguments of the kernel
+
+    Returns:
+        result: output of the kernel, None if the kernel or a user function could not be compiled. Such\
+            functions are remembered (with one warning), the caller must then take its NumPy path.
+    """
+    compiled=[]
+    for func in functions:
+        jitted=_jit_function(func)
+        if jitted is None:
+            return None
+        compiled.append(jitted)
+    if kernel not in _KERNELS:
+        _KERNELS[kernel]=_NUMBA.njit(kernel)
+    try:
+        return _KERNELS[kernel](*compiled,*args)
+    except _NUMBA.core.errors.NumbaError:
+        # typing fails at the first call, the functions are not compiled again
+        for func in functions:
+            _FUNCTIONS[func]=None
+        warnings.warn(f"numba could not compile {', '.join(_name(func) for func in functions or (kernel,))}, "
+                      "the NumPy backend is used.")
+        return None
+
+def _jit_function(func):
+    try:
+        if func not in _FUNCTIONS:
+            _FUNCTIONS[func]=func if hasattr(func,"py_func") else _NUMBA.njit(func)
+        return _FUNCTIONS[func]
+    except Exception:
+        # e.g. callable objects, or objects that could not be weakly referenced
+        return None
+
+def _as_backend(backend):
+    if isinstance(backend,str):
+        try:
+            return BACKEND[backend.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown backend {backend}.")
+    if not isinstance(backend,BACKEND):
+        raise ValueError(f"Unknown backend {backend}.")
+    return backend
+
+def _name(func):
+    return getattr(func,"__name__",repr(func))
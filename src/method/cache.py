@@ -0,0 +1,227 @@
+import os
+import numpy as np
+from collections import OrderedDict
+
+class ResultCache:
+    def __init__(self,max_bytes:int=256*2**20,path:str=None):
+        """content-addressed cache of fitted results (dicts of arrays)
+
+        Entries are kept in memory in least-recently-used order until their total size exceeds `max_bytes`.\
+        With a `path`, every entry is also written to `path/<key>.npz`, so results survive between runs and\
+        evicted entries are loaded back from disk.
+
+        Args:
+            max_bytes (int, optional): byte budget of the memory tier. Defaults to 256 MiB.
+            path (str, optional): directory of the disk tier. Defaults to None (memory only).
+        """
+        self.max_bytes=max_bytes
+        self.path=path
+        if path is not None:
+            os.makedirs(path,exist_ok=True)
+        self.entries=OrderedDict()
+        self.nbytes=0
+        self.hits,self.disk_hits,self.misses,self.evictions=0,0,0,0
+
+    def get(self,key:str):
+        """cached result of key (copies of the stored arrays), or None"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits+=1
+            return {name:value.copy() for name,value in self.entries[key].items()}
+        if self.path is not None:
+            try:
+                with np.load(self._file(key)) as data:
+                    result={name:data[name] for name in data.files}
+            except (FileNotFoundError,OSError,ValueError):
+                pass
+            else:
+                self.hits+=1
+                self.disk_hits+=1
+                self._remember(key,result)
+                return {name:value.copy() for name,value in result.items()}
+        self.misses+=1
+        return None
+
+    def put(self,key:str,result:dict):
+        """store a dict of arrays (scalars are stored as 0D arrays)"""
+        result={name:np.array(value) for name,value in result.items()}
+        self._remember(key,result)
+        if self.path is not None:
+            # write to a temporary file first, so a crash never leaves a broken entry
+            tmp=self._file(key)+".tmp.npz"
+            np.savez(tmp,**result)
+            os.replace(tmp,self._file(key))
+
+    def invalidate(self,key:str=None):
+        """remove one entry from both tiers, or every entry if key is None"""
+        if key is None:
+            self.entries.clear()
+            self.nbytes=0
+            if self.path is not None:
+                for name in os.listdir(self.path):
+                    if name.endswith(".npz"):
+                        os.remove(os.path.join(self.path,name))
+            return
+        result=self.entries.pop(key,None)
+        if result is not None:
+            self.nbytes-=_nbytes(result)
+        if self.path is not None and os.path.exists(self._file(key)):
+            os.remove(self._file(key))
+
+    def stats(self):
+        """hit/miss counters and the size of the memory tier"""
+        requests=self.hits+self.misses
+        return {
+            "hits":self.hits,
+            "disk_hits":self.disk_hits,
+            "misses":self.misses,
+            "hit_rate":self.hits/requests if requests else 0.0,
+            "evictions":self.evictions,
+            "entries":len(self.entries),
+            "bytes":self.nbytes
+        }
+
+    def __contains__(self,key):
+        return key in self.entries or (self.path is not None and os.path.exists(self._file(key)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _file(self,key):
+        return os.path.join(self.path,f"{key}.npz")
+
+    def _remember(self,key,result):
+        size=_nbytes(result)
+        if key in self.entries:
+            self.nbytes-=_nbytes(self.entries.pop(key))
+        if size>self.max_bytes:
+            return
+        self.entries[key]=result
+        self.nbytes+=size
+        while self.nbytes>self.max_bytes:
+            _,evicted=self.entries.popitem(last=False)
+            self.nbytes-=_nbytes(evicted)
+            self.evictions+=1
+
+_DEFAULT_CACHE=None
+
+def set_default_cache(cache:ResultCache=None):
+    """cache used by fit() of regressors and by cubic interpolation when no cache is passed,\
+        None disables caching (default)"""
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE=cache
+
+def get_default_cache():
+    return _DEFAULT_CACHE
+
+def resolve_cache(cache):
+    # None: the default cache, False: no cache
+    if cache is None:
+        return _DEFAULT_CACHE
+    return None if cache is False else cache
+
+def hash_key(name:str,*arrays,**config):
+    """fast content hash of input arrays and model configuration
+
+    Args:
+        name (str): name of the computation, e.g. the class name
+        *arrays: arrays (or None), hashed by dtype, shape and raw bytes
+        **config: other settings, hashed by repr (functions by their code, the names and globals they use,\
+            default arguments and closure values)
+
+    Returns:
+        key: hex string, None if a callable could not be identified by its content (e.g. a callable object\
+            or a closure over an object without a stable repr), the result should then not be cached
+    """
+    import hashlib
+    h=hashlib.blake2b(name.encode(),digest_size=16)
+    for array in arrays:
+        _update(h,array)
+    for item in sorted(config):
+        h.update(item.encode())
+        value=config[item]
+        if callable(value):
+            token=_callable_token(value)
+            if token is None:
+                return None
+            h.update(token)
+        elif isinstance(value,np.ndarray):
+            _update(h,value)
+        else:
+            h.update(repr(value).encode())
+    return h.hexdigest()
+
+def _update(h,array):
+    if array is None:
+        h.update(b"None")
+        return
+    array=np.ascontiguousarray(array)
+    h.update(f"{array.dtype.str}{array.shape}".encode())
+    h.update(array.data if array.dtype!=object else repr(array.tolist()).encode())
+
+def _callable_token(func,seen=None):
+    # content of a function: bytecode, constants, names, defaults, closure cells and the globals it reads;
+    # None if some part has no stable identity
+    import types,functools
+    seen=set() if seen is None else seen
+    if id(func) in seen:
+        return b"<recursion>"
+    seen.add(id(func))
+    if isinstance(func,functools.partial):
+        parts=[_callable_token(func.func,seen),_value_token(func.args,seen),_value_token(func.keywords,seen)]
+        return None if None in parts else b"partial"+b"".join(parts)
+    if isinstance(func,(types.BuiltinFunctionType,np.ufunc,type)):
+        return f"{getattr(func,'__module__','')}.{getattr(func,'__qualname__',func.__name__)}".encode()
+    if not isinstance(func,types.FunctionType):
+        return None
+    token=f"{func.__module__}.{func.__qualname__}".encode()
+    parts=[_code_token(func.__code__),_value_token(func.__defaults__,seen),_value_token(func.__kwdefaults__,seen)]
+    for cell in func.__closure__ or ():
+        try:
+            parts.append(_value_token(cell.cell_contents,seen))
+        except ValueError:
+            # empty cell
+            parts.append(b"<empty>")
+    for name in _global_names(func.__code__):
+        if name in func.__globals__:
+            parts.append(name.encode()+_value_token(func.__globals__[name],seen))
+    if None in parts:
+        return None
+    return token+b"".join(parts)
+
+def _code_token(code):
+    consts=[_code_token(item) if hasattr(item,"co_code") else repr(item).encode() for item in code.co_consts]
+    return code.co_code+b"".join(consts)+repr(code.co_names).encode()
+
+def _global_names(code):
+    # names of the function and of nested functions (lambdas, comprehensions) which may be globals
+    names=set(code.co_names)
+    for item in code.co_consts:
+        if hasattr(item,"co_code"):
+            names.update(_global_names(item))
+    return sorted(names)
+
+def _value_token(value,seen):
+    import types
+    if value is None or isinstance(value,(bool,int,float,complex,str,bytes,np.generic)):
+        return repr(value).encode()
+    if isinstance(value,types.ModuleType):
+        return f"<module {value.__name__}>".encode()
+    if isinstance(value,np.ndarray):
+        import hashlib
+        h=hashlib.blake2b(digest_size=16)
+        _update(h,value)
+        return h.digest()
+    if isinstance(value,dict):
+        value=[item for pair in value.items() for item in pair]
+    if isinstance(value,(tuple,list)):
+        parts=[_value_token(item,seen) for item in value]
+        return None if None in parts else type(value).__name__.encode()+b"".join(parts)
+    if callable(value):
+        return _callable_token(value,seen)
+    text=repr(value)
+    # reprs with memory addresses do not identify the content
+    return None if " at 0x" in text or "object at" in text else text.encode()
+
+def _nbytes(result):
+    return sum(value.nbytes for value in result.values())
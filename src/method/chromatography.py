@@ -0,0 +1,389 @@
+import numpy as np
+import warnings
+import json
+import itertools
+from enum import Enum, auto
+from .backend import BACKEND, resolve_backend, jit_run
+from .cache import hash_key
+
+_SOLVE_BANDED=False # scipy.linalg.solve_banded, imported at the first solve (None if scipy is not available)
+
+class CHROM_SCHEME(Enum):
+    EXPLICIT=auto() # forward Euler, conditionally stable
+    IMPLICIT=auto() # backward Euler, o(dt)
+    CRANK_NICOLSON=auto() # o(dt^2)
+
+class HPLCSimulator:
+    def __init__(self,
+                 L:float=10.0,
+                 v:float=1.0,
+                 D=0.01,
+                 Ka=0.5,
+                 dx:float=0.1,
+                 dt:float=0.1,
+                 scheme:CHROM_SCHEME=CHROM_SCHEME.CRANK_NICOLSON,
+                 *args,**kwargs):
+        """finite-difference model of a chromatography column: dC/dt=D*d2C/dx2-v*dC/dx-Ka*C
+
+        Convection is discretized upwind and diffusion centrally. The inlet (x=0) is a Dirichlet boundary\
+        and the outlet (x=L) has zero gradient, so peaks could leave the column and reach the detector.
+
+        Args:
+            L (float, optional): column length (cm). Defaults to 10.0.
+            v (float, optional): flow velocity (cm/min). Defaults to 1.0.
+            D (float or np.ndarray, optional): diffusion coefficient (cm^2/min), an 1D array gives one value\
+                for each component of a multi-component sample. Defaults to 0.01.
+            Ka (float or np.ndarray, optional): adsorption constant (1/min), scalar or one value for each\
+                component. Defaults to 0.5.
+            dx (float, optional): space step (cm). Defaults to 0.1.
+            dt (float, optional): time step (min). Defaults to 0.1.
+            scheme (CHROM_SCHEME, optional): time integration scheme. CHROM_SCHEME.IMPLICIT and\
+                CHROM_SCHEME.CRANK_NICOLSON solve a tridiagonal system every step and allow large time steps.\
+                Defaults to CHROM_SCHEME.CRANK_NICOLSON.
+        """
+        if L<=0 or dx<=0 or dt<=0:
+            raise ValueError("Column length, space step and time step should be positive.")
+        self.L,self.v,self.dx,self.dt=L,v,dx,dt
+        self.multi_component=np.ndim(D)>0 or np.ndim(Ka)>0
+        self.D,self.Ka=np.broadcast_arrays(np.atleast_1d(np.asarray(D,dtype=float)),
+                                           np.atleast_1d(np.asarray(Ka,dtype=float)))
+        self.n_components=len(self.D)
+        self.nx=int(round(L/dx))
+        if self.nx<3:
+            raise ValueError("At least 3 grid points are needed, use a smaller space step.")
+        self.x=np.arange(self.nx)*dx
+        self.scheme=scheme
+        # tridiagonal operator of each component: lower*C[i-1]+diag*C[i]+upper*C[i+1]
+        self.lower=self.D/dx**2+v/dx
+        self.diag=-2*self.D/dx**2-v/dx-self.Ka
+        self.upper=self.D/dx**2
+        courant=dt*(v/dx+2*self.D/dx**2+self.Ka)
+        if scheme==CHROM_SCHEME.EXPLICIT and np.any(courant>1):
+            warnings.warn(f"Explicit scheme is unstable (dt*(v/dx+2D/dx^2+Ka)={courant.max():.3g}>1), "
+                          "use a smaller time step or CHROM_SCHEME.CRANK_NICOLSON.")
+        if scheme!=CHROM_SCHEME.EXPLICIT:
+            self._banded=[self._lhs_banded(k) for k in range(self.n_components)]
+
+    def simulate(self,
+                 time_steps:int=100,
+                 c0:np.ndarray=None,
+                 inlet:callable=None,
+                 save_every:int=1,
+                 out=None,
+                 backend:BACKEND=None):
+        """run the simulation.
+
+        Args:
+            time_steps (int, optional): number of time steps. Defaults to 100.
+            c0 (np.ndarray, optional): initial concentration, 1D (nx) or 2D (n_components*nx).\
+                Defaults to None (a unit amount of solute, concentration 1/dx, in the first interior cell; the\
+                first cell is the Dirichlet inlet and is overwritten by inlet(t) at every step).
+            inlet (callable, optional): inlet concentration inlet(t), returns a scalar or one value for\
+                each component. Defaults to None (0 after injection).
+            save_every (int, optional): only every `save_every`-th time slice is stored, None stores no\
+                concentration field (only the detector signal). Defaults to 1.
+            out (np.ndarray or str, optional): preallocated output array, or a file name of a .npy file which\
+                is created as a memmap. Shape: (time_steps//save_every+1, nx), with a component axis\
+                after the time axis for multi-component samples. Defaults to None (a new array).
+            backend (BACKEND, optional): BACKEND.NUMBA runs the whole time loop (stencil and tridiagonal\
+                solves, factorized once) in one compiled kernel, inlet(t) is evaluated for all steps first.\
+                Defaults to None (backend.set_default_backend).
+
+        Returns:
+            C: concentration field of the saved time slices (None if save_every is None). The signal at\
+                the column outlet of every time step is stored in `self.detector`, times in `self.t`.
+        """
+        C=np.zeros((self.n_components,self.nx),dtype=float)
+        field=None
+        if c0 is None:
+            C[:,1]=1.0/self.dx
+        else:
+            C[:]=np.asarray(c0,dtype=float)
+        if save_every is not None:
+            n_saved=time_steps//save_every+1
+            shape=(n_saved,self.n_components,self.nx) if self.multi_component else (n_saved,self.nx)
+            if out is None:
+                out=np.empty(shape,dtype=float)
+            elif isinstance(out,str):
+                out=np.lib.format.open_memmap(out,mode="w+",dtype=float,shape=shape)
+            elif out.shape!=shape:
+                raise ValueError(f"Output array should be in shape {shape}.")
+            field=out.reshape(n_saved,self.n_components,self.nx)
+            field[0]=C
+        self.t=np.arange(time_steps+1)*self.dt
+        self.detector=np.empty((time_steps+1,self.n_components),dtype=float)
+        self.detector[0]=C[:,-1]
+        if resolve_backend(backend)!=BACKEND.NUMBA or not self._simulate_numba(C,time_steps,inlet,save_every,field):
+            # C is untouched when numba could not compile the kernel
+            self._simulate(C,time_steps,inlet,save_every,field)
+        if not self.multi_component:
+            self.detector=self.detector[:,0]
+        if save_every is None:
+            return None
+        if isinstance(out,np.memmap):
+            out.flush()
+        return out
+
+    def _simulate(self,C,time_steps,inlet,save_every,field):
+        rhs=np.empty_like(C)
+        for step in range(1,time_steps+1):
+            c_in=0.0 if inlet is None else inlet(step*self.dt)
+            if self.scheme==CHROM_SCHEME.EXPLICIT:
+                self._apply(C,rhs)
+                C+=self.dt*rhs
+                C[:,0]=c_in
+            else:
+                if self.scheme==CHROM_SCHEME.CRANK_NICOLSON:
+                    self._apply(C,rhs)
+                    rhs*=0.5*self.dt
+                    rhs+=C
+                else:
+                    rhs[:]=C
+                rhs[:,0]=c_in
+                for k in range(self.n_components):
+                    C[k]=_solve_tridiagonal(self._banded[k],rhs[k])
+            self.detector[step]=C[:,-1]
+            if save_every is not None and step%save_every==0:
+                field[step//save_every]=C
+
+    def _simulate_numba(self,C,time_steps,inlet,save_every,field):
+        c_in=np.zeros((time_steps,self.n_components),dtype=float)
+        if inlet is not None:
+            for step in range(1,time_steps+1):
+                c_in[step-1]=inlet(step*self.dt)
+        if self.scheme==CHROM_SCHEME.EXPLICIT:
+            banded=np.zeros((self.n_components,3,self.nx),dtype=float)
+        else:
+            banded=np.stack(self._banded)
+        if field is None:
+            save_every,field=0,np.zeros((0,self.n_components,self.nx),dtype=float)
+        scheme={CHROM_SCHEME.EXPLICIT:0,CHROM_SCHEME.IMPLICIT:1,CHROM_SCHEME.CRANK_NICOLSON:2}[self.scheme]
+        # False if the kernel could not be compiled (jit_run warned)
+        return jit_run(_simulate_kernel,(),C,self.lower,self.diag,self.upper,banded,float(self.dt),scheme,c_in,
+                       self.detector,np.asarray(field),int(save_every)) is not None
+
+    def _apply(self,C,out):
+        # out=L*C on interior points (vectorized stencil), zero gradient at the outlet
+        lower,diag,upper=self.lower[:,None],self.diag[:,None],self.upper[:,None]
+        out[:,1:-1]=lower*C[:,:-2]+diag*C[:,1:-1]+upper*C[:,2:]
+        out[:,-1]=self.lower*C[:,-2]+(self.diag+self.upper)*C[:,-1]
+        out[:,0]=0.0
+
+    def _lhs_banded(self,k):
+        # banded (I-theta*dt*L), theta=1 (implicit) or 0.5 (Crank-Nicolson), Dirichlet row at the inlet
+        theta=1.0 if self.scheme==CHROM_SCHEME.IMPLICIT else 0.5
+        ab=np.zeros((3,self.nx),dtype=float)
+        ab[0,2:]=-theta*self.dt*self.upper[k]
+        ab[1,1:]=1-theta*self.dt*self.diag[k]
+        ab[1,-1]=1-theta*self.dt*(self.diag[k]+self.upper[k])
+        ab[2,:-1]=-theta*self.dt*self.lower[k]
+        ab[1,0]=1.0 # row 0 is the Dirichlet boundary
+        return ab
+
+def _simulate_kernel(C,lower,diag,upper,banded,dt,scheme,c_in,detector,field,save_every):
+    # time loop of HPLCSimulator.simulate (compiled by numba), scheme: 0 explicit, 1 implicit, 2 Crank-Nicolson
+    n_components,nx=C.shape
+    # LU factors of the constant tridiagonal matrices (Thomas algorithm without pivoting)
+    factor=np.zeros((n_components,nx))
+    pivot=np.zeros((n_components,nx))
+    if scheme!=0:
+        for k in range(n_components):
+            pivot[k,0]=banded[k,1,0]
+            for i in range(1,nx):
+                factor[k,i]=banded[k,2,i-1]/pivot[k,i-1]
+                pivot[k,i]=banded[k,1,i]-factor[k,i]*banded[k,0,i]
+    rhs=np.empty(nx)
+    for step in range(1,c_in.shape[0]+1):
+        for k in range(n_components):
+            if scheme!=1:
+                # rhs=L*C, zero gradient at the outlet
+                rhs[0]=0.0
+                for i in range(1,nx-1):
+                    rhs[i]=lower[k]*C[k,i-1]+diag[k]*C[k,i]+upper[k]*C[k,i+1]
+                rhs[nx-1]=lower[k]*C[k,nx-2]+(diag[k]+upper[k])*C[k,nx-1]
+            if scheme==0:
+                for i in range(nx):
+                    C[k,i]+=dt*rhs[i]
+                C[k,0]=c_in[step-1,k]
+                continue
+            for i in range(nx):
+                rhs[i]=rhs[i]*(0.5*dt)+C[k,i] if scheme==2 else C[k,i]
+            rhs[0]=c_in[step-1,k]
+            for i in range(1,nx):
+                rhs[i]-=factor[k,i]*rhs[i-1]
+            C[k,nx-1]=rhs[nx-1]/pivot[k,nx-1]
+            for i in range(nx-2,-1,-1):
+                C[k,i]=(rhs[i]-banded[k,0,i+1]*C[k,i+1])/pivot[k,i]
+        detector[step]=C[:,nx-1]
+        if save_every>0 and step%save_every==0:
+            field[step//save_every]=C
+    return C
+
+def _solve_tridiagonal(ab,b):
+    global _SOLVE_BANDED
+    if _SOLVE_BANDED is False:
+        try:
+            from scipy.linalg import solve_banded as _SOLVE_BANDED
+        except ImportError:
+            _SOLVE_BANDED=None
+    if _SOLVE_BANDED is not None:
+        return _SOLVE_BANDED((1,1),ab,b,overwrite_ab=False,overwrite_b=False,check_finite=False)
+    # Thomas algorithm when scipy is not available
+    n=len(b)
+    upper,diag,lower=ab[0,1:],ab[1].copy(),ab[2,:-1]
+    d=np.array(b,dtype=float)
+    for i in range(1,n):
+        m=lower[i-1]/diag[i-1]
+        diag[i]-=m*upper[i-1]
+        d[i]-=m*d[i-1]
+    d[-1]/=diag[-1]
+    for i in range(n-2,-1,-1):
+        d[i]=(d[i]-upper[i]*d[i+1])/diag[i]
+    return d
+
+SWEEP_FIELDS=[("v",float),("D",float),("Ka",float),("L",float),
+              ("retention_time",float),("peak_width",float),("plates",float),("height",float),("area",float)]
+
+def peak_metrics(t:np.ndarray,signal:np.ndarray):
+    """summary of the main peak of a detector signal
+
+    Args:
+        t (np.ndarray): 1D array, time
+        signal (np.ndarray): 1D array, detector signal
+
+    Returns:
+        retention_time, peak_width, plates, height, area: retention time (parabolic interpolation of the\
+            maximum), width at half height, plate count N=5.54*(t_R/W_h)^2, peak height and area.\
+            NaN if the peak has not eluted completely.
+    """
+    i=int(np.argmax(signal))
+    height=signal[i]
+    if i==0 or i==len(signal)-1 or height<=0:
+        return np.nan,np.nan,np.nan,height,np.nan
+    # vertex of the parabola through the three points around the maximum
+    y0,y1,y2=signal[i-1],signal[i],signal[i+1]
+    denom=y0-2*y1+y2
+    shift=0.5*(y0-y2)/denom if denom!=0 else 0.0
+    retention_time=t[i]+shift*(t[i+1]-t[i])
+    half=0.5*height
+    left=np.where(signal[:i]<half)[0]
+    right=np.where(signal[i:]<half)[0]
+    if len(left)==0 or len(right)==0:
+        return retention_time,np.nan,np.nan,height,np.nan
+    l,r=left[-1],i+right[0]
+    t_left=t[l]+(half-signal[l])/(signal[l+1]-signal[l])*(t[l+1]-t[l])
+    t_right=t[r-1]+(half-signal[r-1])/(signal[r]-signal[r-1])*(t[r]-t[r-1])
+    width=t_right-t_left
+    area=np.sum(0.5*(signal[1:]+signal[:-1])*np.diff(t))
+    return retention_time,width,5.54*(retention_time/width)**2,height,area
+
+class SweepCache:
+    def __init__(self,path:str=None):
+        """summary metrics of finished simulations, keyed by parameter set and grid setup
+
+        Args:
+            path (str, optional): JSON file to load from and save to. Defaults to None (memory only).
+        """
+        self.path=path
+        self.results={}
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self.results={key:tuple(value) for key,value in json.load(f).items()}
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self,key):
+        return key in self.results
+
+    def __getitem__(self,key):
+        return self.results[key]
+
+    def __setitem__(self,key,value):
+        self.results[key]=tuple(float(item) for item in value)
+
+    def __len__(self):
+        return len(self.results)
+
+    def clear(self):
+        self.results={}
+
+    def save(self):
+        if self.path is not None:
+            with open(self.path,"w") as f:
+                json.dump(self.results,f)
+
+def sweep(v=1.0,D=0.01,Ka=0.5,L=10.0,
+          dx:float=0.1,
+          dt:float=0.1,
+          scheme:CHROM_SCHEME=CHROM_SCHEME.CRANK_NICOLSON,
+          t_max:float=None,
+          inlet:callable=None,
+          cache:SweepCache=None,
+          n_jobs:int=None,
+          chunksize:int=4):
+    """simulate every combination of v, D, Ka and L on a process pool, only peak metrics are kept
+
+    Args:
+        v, D, Ka, L (float or list, optional): values of flow velocity, diffusion coefficient, adsorption\
+            constant and column length, the Cartesian product of them is simulated.
+        dx (float, optional): space step shared by all runs. Defaults to 0.1.
+        dt (float, optional): time step shared by all runs. Defaults to 0.1.
+        scheme (CHROM_SCHEME, optional): time integration scheme. Defaults to CHROM_SCHEME.CRANK_NICOLSON.
+        t_max (float, optional): simulated time. Defaults to None (3*L/v for each run).
+        inlet (callable, optional): inlet concentration inlet(t), must be picklable (module-level function).\
+            Defaults to None (a unit amount of solute in the first interior cell at t=0, see simulate).
+        cache (SweepCache, optional): finished runs are looked up and stored here, so repeated sweeps skip\
+            them. Runs are not cached if the inlet could not be hashed by content (e.g. a callable object).\
+            Defaults to None.
+        n_jobs (int, optional): number of processes. Defaults to None (min(cpu_count(), 8)).
+        chunksize (int, optional): runs sent to a worker at once. Defaults to 4.
+
+    Returns:
+        result: structured array with fields v, D, Ka, L, retention_time, peak_width, plates, height, area
+    """
+    params=list(itertools.product(*(np.atleast_1d(np.asarray(item,dtype=float)).tolist() for item in (v,D,Ka,L))))
+    settings={"dx":dx,"dt":dt,"scheme":scheme,"t_max":t_max,"inlet":inlet}
+    # the inlet is identified by its content (code, defaults, closure values and globals it reads)
+    inlet_key=None if inlet is None else hash_key("sweep.inlet",inlet=inlet)
+    if inlet is not None and inlet_key is None and cache is not None:
+        warnings.warn("The inlet function could not be identified by its content, the sweep is not cached.")
+        cache=None
+    setup_key=f"{dx!r}|{dt!r}|{scheme.name}|{t_max!r}|{inlet_key}"
+    keys=[f"{setup_key}|"+"|".join(repr(item) for item in param) for param in params]
+    todo=[i for i,key in enumerate(keys) if cache is None or key not in cache]
+    metrics={}
+    if todo:
+        if len(todo)==1 or n_jobs==1:
+            _sweep_init(settings)
+            results=map(_sweep_run,[params[i] for i in todo])
+            metrics.update(zip(todo,results))
+        else:
+            from multiprocessing import Pool,cpu_count
+            with Pool(processes=min(n_jobs or min(cpu_count(),8),len(todo)),
+                      initializer=_sweep_init,initargs=(settings,)) as pool:
+                # results are streamed back as soon as each chunk is finished
+                for i,result in zip(todo,pool.imap(_sweep_run,[params[i] for i in todo],chunksize=chunksize)):
+                    metrics[i]=result
+        if cache is not None:
+            for i in todo:
+                cache[keys[i]]=metrics[i]
+            cache.save()
+    result=np.zeros(len(params),dtype=SWEEP_FIELDS)
+    for i,param in enumerate(params):
+        result[i]=param+tuple(metrics[i] if i in metrics else cache[keys[i]])
+    return result
+
+_SWEEP_SETTINGS={}
+
+def _sweep_init(settings):
+    # grid setup is sent once to each worker, tasks only carry (v, D, Ka, L)
+    _SWEEP_SETTINGS.update(settings)
+
+def _sweep_run(param):
+    v,D,Ka,L=param
+    settings=_SWEEP_SETTINGS
+    simulator=HPLCSimulator(L=L,v=v,D=D,Ka=Ka,dx=settings["dx"],dt=settings["dt"],scheme=settings["scheme"])
+    t_max=3*L/v if settings["t_max"] is None else settings["t_max"]
+    simulator.simulate(int(np.ceil(t_max/settings["dt"])),inlet=settings["inlet"],save_every=None)
+    return peak_metrics(simulator.t,simulator.detector)
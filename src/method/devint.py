@@ -1,29 +1,310 @@
 import numpy as np
 from enum import Enum, auto
+from functools import lru_cache
+from .instrument import counted, count
+from .backend import BACKEND, resolve_backend, jit_run
+
+def fd_weights(order:int,offsets)->np.ndarray:
+    """finite-difference weights of a stencil (Fornberg's algorithm), cached by (order, offsets)
+
+    f^(order)(x) is approximated by sum(w[i]*f(x+offsets[i]*h))/h**order. Offsets could be any distinct\
+    real numbers, e.g. (-1,1) for the central difference or (0,0.5,2) for a non-uniform stencil.
+
+    Args:
+        order (int): order of derivative (0 gives interpolation weights)
+        offsets: distinct offsets of the stencil points in units of h
+
+    Returns:
+        weights: read-only 1D array, same length as offsets
+    """
+    return _cached_weights(int(order),tuple(float(offset) for offset in np.ravel(offsets)))
+
+def stencil_size(order:int,accuracy:int=2):
+    """number of points of a centered stencil of a derivative of `order` with error o(h^accuracy)"""
+    if order<0 or accuracy<1:
+        raise ValueError("order should be non-negative and accuracy should be positive.")
+    return 2*((order+1)//2)-1+accuracy
+
+def central_offsets(order:int,accuracy:int=2):
+    """offsets of the smallest centered stencil, without the center point for odd orders (its weight is 0)"""
+    accuracy+=accuracy%2 # centered stencils have even orders of accuracy
+    half=stencil_size(order,accuracy)//2
+    offsets=np.arange(-half,half+1)
+    return tuple(int(offset) for offset in offsets if order%2==0 or offset!=0)
+
+def clear_stencil_cache():
+    _cached_weights.cache_clear()
+
+@lru_cache(maxsize=1024)
+def _cached_weights(order,offsets):
+    if len(set(offsets))!=len(offsets):
+        raise ValueError("Offsets of a stencil should be distinct.")
+    if len(offsets)<=order:
+        raise ValueError(f"At least {order+1} points are required for derivative of order {order}.")
+    weights=_fornberg(order,np.array(offsets))
+    weights.setflags(write=False)
+    return weights
+
+def _fornberg(order,offsets):
+    # Fornberg (1988) recursion for weights at 0, vectorized over leading dimensions of offsets (...,k)
+    offsets=np.asarray(offsets,dtype=float)
+    k=offsets.shape[-1]
+    c=np.zeros(offsets.shape+(order+1,))
+    c[...,0,0]=1.0
+    c1=np.ones(offsets.shape[:-1])
+    c4=offsets[...,0]
+    for i in range(1,k):
+        mn=min(i,order)
+        c2=np.ones(offsets.shape[:-1])
+        c5,c4=c4,offsets[...,i]
+        for j in range(i):
+            c3=offsets[...,i]-offsets[...,j]
+            c2=c2*c3
+            if j==i-1:
+                for m in range(mn,0,-1):
+                    c[...,i,m]=c1*(m*c[...,i-1,m-1]-c5*c[...,i-1,m])/c2
+                c[...,i,0]=-c1*c5*c[...,i-1,0]/c2
+            for m in range(mn,0,-1):
+                c[...,j,m]=(c4*c[...,j,m]-m*c[...,j,m-1])/c3
+            c[...,j,0]=c4*c[...,j,0]/c3
+        c1=c2
+    return c[...,order]
+
+def _apply_stencil(func,val,h,order,offsets):
+    # one call of func per stencil point, each over all points of val
+    weights=fd_weights(order,offsets)
+    val=np.asarray(val,dtype=float) if np.ndim(val) else val
+    result=sum(weight*func(val+offset*h) for offset,weight in zip(offsets,weights) if weight!=0)
+    return result/h**order
+
+def derivative_stencil(val,
+                       func:callable,
+                       order:int=1,
+                       accuracy:int=2,
+                       offsets=None,
+                       h=None,
+                       epsilon=None):
+    """derivative of any order of a function with a cached finite-difference stencil
+
+    Args:
+        val: point, or array of points (func is then called with arrays)
+        func (callable): function
+        order (int, optional): order of derivative. Defaults to 1.
+        accuracy (int, optional): order of accuracy o(h^p) of the centered stencil. Defaults to 2.
+        offsets (optional): stencil offsets in units of h, overrides accuracy, e.g. (0,1,2,3) for a\
+            one-sided stencil. Defaults to None.
+        h (optional): step. Defaults to None (epsilon^(1/(p+order))*max(|x|,1), p is the order of accuracy).
+        epsilon (optional): precision of func. Defaults to None (machine epsilon).
+
+    Returns:
+        derivative: float, or array with the shape of val
+    """
+    if not callable(func):
+        raise TypeError("Parameter func should be a callable function.")
+    func=counted(func,"derivative_stencil.evaluations")
+    if offsets is None:
+        offsets=central_offsets(order,accuracy)
+    else:
+        offsets=tuple(float(offset) for offset in np.ravel(offsets))
+        accuracy=len(offsets)-order
+    if not epsilon:
+        epsilon=np.finfo(float).eps
+    if not h:
+        h=epsilon**(1/(accuracy+order))*np.maximum(np.abs(val),1)
+    return _apply_stencil(func,val,h,order,offsets)
 
 def derivative_discrete(x:np.ndarray,
                         y:np.ndarray,
+                        order:int=1,
+                        accuracy:int=2,
                         *args,**kwargs):
+    """derivative of sampled data on a (non-uniform) grid with finite-difference stencils
+
+    Every point uses the `stencil_size(order,accuracy)` nearest samples (centered where possible, shifted\
+    inside at both ends), so the default (order=1, accuracy=2) is the classic 3-point formula for\
+    non-uniform spacing. Weights of uniform grids are taken from the stencil cache, weights of\
+    non-uniform grids are computed for all points at once.
+
+    Args:
+        x (np.ndarray): 1D array, monotonically increasing
+        y (np.ndarray): array with len(x) rows, columns are differentiated independently
+        order (int, optional): order of derivative. Defaults to 1.
+        accuracy (int, optional): order of accuracy o(h^p) of interior points. Defaults to 2.
+
+    Returns:
+        dev: array with the shape of y
+    """
+    x,y=np.asarray(x,dtype=float),np.asarray(y,dtype=float)
     if len(x)!=len(y):
+        raise ValueError("x and y are not in the same length.")
+    if not np.all(np.diff(x)>0):
+        raise ValueError("x should be monotonically increasing.")
+    size=stencil_size(order,accuracy)
+    if len(x)<size:
+        raise ValueError(f"At least {size} points are required for derivative of order {order} with accuracy {accuracy}.")
+    start=np.clip(np.arange(len(x))-size//2,0,len(x)-size)
+    index=start[:,None]+np.arange(size)
+    step=_uniform_step(x)
+    if step is not None:
+        # uniform grid: only `size` different stencils (interior and shifted ones at the ends)
+        shift=np.arange(len(x))-start
+        weights=np.stack([fd_weights(order,np.arange(size)-k) for k in range(size)])[shift]/step**order
+    else:
+        weights=_fornberg(order,x[index]-x[:,None])
+    return np.einsum("ij,ij...->i...",weights,y[index])
+
+def savgol_coeffs(window:int,polyorder:int,deriv:int=0)->np.ndarray:
+    """Savitzky-Golay coefficients, cached by (window, polyorder, deriv)
+
+    Row i holds the weights of the `window` samples for the deriv-th derivative (unit spacing) of the\
+    least-squares polynomial at sample i of the window. The middle row is the convolution kernel, the\
+    others are used at the edges of a signal.
+
+    Args:
+        window (int): odd window length
+        polyorder (int): order of the fitted polynomial, smaller than window
+        deriv (int, optional): order of derivative, not larger than polyorder. Defaults to 0.
+
+    Returns:
+        coeffs: read-only 2D array (window*window)
+    """
+    return _savgol_coeffs(int(window),int(polyorder),int(deriv))
+
+@lru_cache(maxsize=256)
+def _savgol_coeffs(window,polyorder,deriv):
+    if window%2==0 or window<1:
+        raise ValueError("window should be a positive odd number.")
+    if not 0<=polyorder<window:
+        raise ValueError("polyorder should be non-negative and smaller than window.")
+    if not 0<=deriv<=polyorder:
+        raise ValueError("deriv should be non-negative and not larger than polyorder.")
+    z=np.arange(window)-window//2
+    powers=np.arange(polyorder+1)
+    # polynomial coefficients of the least-squares fit, then the derivative of the polynomial at every z
+    fit=np.linalg.pinv(z[:,None]**powers)
+    falling=np.array([np.prod(np.arange(m-deriv+1,m+1)) if m>=deriv else 0 for m in powers],dtype=float)
+    coeffs=(falling*np.where(powers>=deriv,z[:,None]**np.maximum(powers-deriv,0),0))@fit
+    coeffs.setflags(write=False)
+    return coeffs
+
+def savgol_filter(y:np.ndarray,
+                  window:int,
+                  polyorder:int,
+                  deriv:int=0,
+                  x:np.ndarray=None,
+                  delta:float=1.0,
+                  axis:int=-1):
+    """Savitzky-Golay smoothing (deriv=0) or smoothed derivative of 1D or batched signals
+
+    Each sample is replaced by the value (or derivative) at that sample of a polynomial fitted by least\
+    squares to the `window` samples around it. On a uniform grid the cached coefficients are applied to\
+    all windows of all signals in one matrix product; the first and last window//2 samples use the\
+    polynomial of the first and last full window. A non-uniform `x` falls back to one local fit per\
+    sample, computed for all samples at once.
+
+    Args:
+        y (np.ndarray): signal, or array of signals along `axis`
+        window (int): odd window length
+        polyorder (int): order of the fitted polynomial, smaller than window
+        deriv (int, optional): order of derivative. Defaults to 0.
+        x (np.ndarray, optional): sample positions, monotonically increasing. Defaults to None (uniform\
+            spacing `delta`).
+        delta (float, optional): spacing of a uniform grid. Defaults to 1.0.
+        axis (int, optional): axis of the samples. Defaults to -1.
+
+    Returns:
+        filtered: array with the shape of y
+    """
+    y=np.moveaxis(np.asarray(y,dtype=float),axis,-1)
+    if y.shape[-1]<window:
+        raise ValueError(f"At least {window} samples are required for a window of {window}.")
+    if x is not None:
+        x=np.asarray(x,dtype=float)
+        if len(x)!=y.shape[-1]:
             raise ValueError("x and y are not in the same length.")
-    if not np.all(np.diff(x))>0:
+        if not np.all(np.diff(x)>0):
             raise ValueError("x should be monotonically increasing.")
-    dev=np.zeros((len(x),),dtype=float)
-    try:
-        for _ in range(len(x)):
-            if _==0:
-                dev[_]=(y[_+1]-y[_])/(x[_+1]-x[_])
-            elif _==len(x)-1:
-                dev[_]=(y[_]-y[_-1])/(x[_]-x[_-1])
-            else:
-                h1=x[_]-x[_-1]
-                h2=x[_+1]-x[_]
-                A, B, C=-h2/(h1*(h1 + h2)), h1/(h2*(h1 + h2)), (-h1 + h2)/(h1*h2)
-                dev[_]=A*y[_-1]+B*y[_+1]+C*y[_]
-        return dev
-    except:
-        raise RuntimeError("Error occurs when computing derivative of array x.")
-    
+        delta=_uniform_step(x)
+        if delta is None:
+            return np.moveaxis(_savgol_nonuniform(x,y,window,polyorder,deriv),-1,axis)
+    coeffs=savgol_coeffs(window,polyorder,deriv)/delta**deriv
+    return np.moveaxis(_savgol_apply(y,coeffs,head=True,tail=True),-1,axis)
+
+def savgol_stream(chunks,
+                  window:int,
+                  polyorder:int,
+                  deriv:int=0,
+                  delta:float=1.0):
+    """chunked savgol_filter of a long signal (or batch of signals along the last axis)
+
+    Yields filtered samples as soon as their window is complete, so the whole trace never has to be in\
+    memory; concatenating the yielded arrays gives savgol_filter of the concatenated chunks.
+
+    Args:
+        chunks: iterable of arrays, consecutive parts of the signal along the last axis
+        window (int): odd window length
+        polyorder (int): order of the fitted polynomial, smaller than window
+        deriv (int, optional): order of derivative. Defaults to 0.
+        delta (float, optional): sample spacing. Defaults to 1.0.
+
+    Yields:
+        filtered: array of the next filtered samples
+    """
+    coeffs=savgol_coeffs(window,polyorder,deriv)/delta**deriv
+    buffer,head=None,True
+    for chunk in chunks:
+        chunk=np.asarray(chunk,dtype=float)
+        buffer=chunk if buffer is None else np.concatenate([buffer,chunk],axis=-1)
+        if buffer.shape[-1]<window:
+            continue
+        filtered=_savgol_apply(buffer,coeffs,head=head,tail=False)
+        # the kept window is centered at a sample that has already been yielded
+        yield filtered if head else filtered[...,1:]
+        head=False
+        buffer=buffer[...,-window:]
+    if buffer is None or buffer.shape[-1]<window:
+        raise ValueError(f"At least {window} samples are required for a window of {window}.")
+    yield buffer[...,-window:]@coeffs[window//2+1:].T
+
+def _savgol_apply(y,coeffs,head,tail):
+    window=len(coeffs)
+    half=window//2
+    parts=[y[...,:window]@coeffs[:half].T] if head else []
+    parts.append(np.lib.stride_tricks.sliding_window_view(y,window,axis=-1)@coeffs[half])
+    if tail:
+        parts.append(y[...,-window:]@coeffs[half+1:].T)
+    return np.concatenate(parts,axis=-1)
+
+def _savgol_nonuniform(x,y,window,polyorder,deriv):
+    # local least-squares fit around every sample, offsets scaled by the window width for conditioning
+    size=len(x)
+    start=np.clip(np.arange(size)-window//2,0,size-window)
+    index=start[:,None]+np.arange(window)
+    offsets=x[index]-x[:,None]
+    scale=np.abs(offsets).max(axis=1)
+    z=offsets/scale[:,None]
+    powers=np.empty((2*polyorder+1,)+z.shape)
+    powers[0]=1.0
+    for m in range(1,2*polyorder+1):
+        np.multiply(powers[m-1],z,out=powers[m])
+    # normal equations G=A^TA (a Hankel matrix of power sums), weights of the derivative are A G^{-1} e_deriv
+    sums=powers.sum(axis=2).T
+    gram=sums[:,np.add.outer(np.arange(polyorder+1),np.arange(polyorder+1))]
+    unit=np.zeros((len(x),polyorder+1,1))
+    unit[:,deriv]=1.0
+    solved=np.linalg.solve(gram,unit)[...,0]
+    weights=np.einsum("mik,im->ik",powers[:polyorder+1],solved)
+    weights*=np.prod(np.arange(1,deriv+1))/scale[:,None]**deriv
+    return np.einsum("ij,...ij->...i",weights,y[...,index])
+
+def _uniform_step(x):
+    # spacing of x if it is uniform up to rounding of the positions, otherwise None
+    step=np.diff(x)
+    mean=(x[-1]-x[0])/(len(x)-1)
+    if np.ptp(step)<=1e-9*mean+8*np.finfo(float).eps*max(abs(x[0]),abs(x[-1])):
+        return mean
+    return None
+
 def integration_discrete(x:np.ndarray,
                          y:np.ndarray,
                          absolute=False,
@@ -49,7 +330,18 @@ class DERIVATIZATION_TYPE(Enum):
     CENTRAL=auto() #o(h^2)
     FOUR_POINTS=auto() #o(h^4)
     SIX_POINTS=auto() #o(h^6)
+    RIDDERS=auto() #Richardson extrapolation of central differences, step chosen by error estimate
     
+# stencil offsets and exponent of the automatic step h=\epsilon^\frac{1}{p+1}*max(|x|,1)
+# where p is order of accuracy of derivative o(h^p)
+_FIRST_DERIVATIVE_STENCILS={
+    DERIVATIZATION_TYPE.FORWARD:((0,1),1/2),
+    DERIVATIZATION_TYPE.BACKWARD:((-1,0),1/2),
+    DERIVATIZATION_TYPE.CENTRAL:((-1,1),1/3),
+    DERIVATIZATION_TYPE.FOUR_POINTS:((-2,-1,1,2),1/5),
+    DERIVATIZATION_TYPE.SIX_POINTS:((-3,-2,-1,1,2,3),1/7)
+}
+
 def derivative_func(val:float,
                     func:callable,
                     dev_type:DERIVATIZATION_TYPE=DERIVATIZATION_TYPE.CENTRAL,
@@ -58,51 +350,263 @@ def derivative_func(val:float,
                     *args, **kwargs):
     if not callable(func):
         raise TypeError("Parameter func should be a callable function.")
+    if dev_type==DERIVATIZATION_TYPE.RIDDERS:
+        # derivative_ridders counts the evaluations itself
+        return derivative_ridders(val,func,h)["derivative"]
+    func=counted(func,"derivative_func.evaluations")
     if not epsilon:
         epsilon=np.finfo(float).eps
+    offsets,power=_FIRST_DERIVATIVE_STENCILS[dev_type]
+    if not h:
+        h=epsilon**power*np.maximum(np.abs(val),1)
     try:
-        match dev_type:
-            case DERIVATIZATION_TYPE.FORWARD:
-                # automatically adjust h to h=\epsilon^\frac{1}{p+1}*max(|x|,1)
-                # where p is order of accuracy of derivative o(h^p)
-                if not h:
-                    h=epsilon**0.5*max(abs(val),1)
-                return (func(val+h)-func(val))/h
-            case DERIVATIZATION_TYPE.BACKWARD:
-                if not h:
-                    h=epsilon**0.5*max(abs(val),1)
-                return (func(val)-func(val-h))/h
-            case DERIVATIZATION_TYPE.CENTRAL:
-                if not h:
-                    h=epsilon**(1/3)*max(abs(val),1)
-                return (func(val+h)-func(val-h))/(2*h)
-            case DERIVATIZATION_TYPE.FOUR_POINTS:
-                if not h:
-                    h=epsilon**0.2*max(abs(val),1)
-                return (-func(val+2*h)+8*func(val+h)-8*func(val-h)+func(val-2*h))/(12*h)
-            case DERIVATIZATION_TYPE.SIX_POINTS:
-                if not h:
-                    h=epsilon**(1/7)*max(abs(val),1)
-                return (func(val-3*h)-9*func(val-2*h)+45*func(val-h)-45*func(val+h)+\
-                    9*func(val+2*h)-func(val+3*h))/(60*h)
+        return _apply_stencil(func,val,h,1,offsets)
     except:
         raise RuntimeError(f"Invalid value {val} for defined function.")
 
+_MAX_STEP_SHRINKS=12 # the initial Ridders step is reduced down to 1e-11 of its value
+
+def derivative_ridders(val,
+                       func:callable,
+                       h=None,
+                       factor:float=1.4,
+                       max_levels:int=10,
+                       safe:float=2.0):
+    """first derivative by Ridders' extrapolation of central differences, with an error estimate
+
+    Central differences with steps h, h/factor, h/factor^2... fill a Richardson tableau, every level costs\
+    two evaluations of func and reuses all earlier entries. The entry with the smallest error estimate is\
+    returned, so the step is chosen automatically. A point stops once the error of the new level grows\
+    beyond `safe` times the best error, the remaining points of an array continue without it. An initial\
+    step giving a non-finite difference (e.g. reaching out of the domain of func) is divided by 10 until\
+    the difference is finite.
+
+    Args:
+        val: point, or array of points (func is then called with arrays of the points not yet converged)
+        func (callable): function
+        h (optional): initial step, should be large rather than small. Defaults to None (0.1*max(|x|,1)).
+        factor (float, optional): ratio of successive steps. Defaults to 1.4.
+        max_levels (int, optional): maximum number of steps. Defaults to 10.
+        safe (float, optional): stop when the error grows by this factor. Defaults to 2.0.
+
+    Returns:
+        result: dict of derivative, error (estimated absolute error) and evaluations (calls of func per\
+            point), floats for a scalar val, arrays for an array
+
+    Raises:
+        RuntimeError: func fails at a point, or no finite derivative is found
+    """
+    if not callable(func):
+        raise TypeError("Parameter func should be a callable function.")
+    if factor<=1 or max_levels<2:
+        raise ValueError("factor should be larger than 1 and max_levels at least 2.")
+    func=counted(func,"derivative_func.evaluations")
+    scalar=np.ndim(val)==0
+    x=np.atleast_1d(np.asarray(val,dtype=float)).ravel()
+    step=np.broadcast_to(0.1*np.maximum(np.abs(x),1) if not h else np.abs(np.asarray(h,dtype=float)),x.shape).copy()
+    evaluate=(lambda points:np.array([func(point) for point in points],dtype=float)) if scalar\
+        else (lambda points:np.asarray(func(points),dtype=float))
+    tableau=np.zeros((max_levels,x.size)) # previous column of the tableau
+    column=np.zeros((max_levels,x.size))
+    derivative=np.zeros(x.size)
+    error=np.full(x.size,np.inf)
+    evaluations=np.zeros(x.size,dtype=int)
+    active=np.arange(x.size)
+    fac2=factor**2
+    try:
+        for level in range(max_levels):
+            pending=active
+            for _ in range(_MAX_STEP_SHRINKS if level==0 else 1):
+                xa,ha=x[pending],step[pending]
+                with np.errstate(invalid="ignore",divide="ignore"):
+                    column[0,pending]=(evaluate(xa+ha)-evaluate(xa-ha))/(2*ha)
+                evaluations[pending]+=2
+                pending=pending[~np.isfinite(column[0,pending])]
+                if pending.size==0 or level>0:
+                    break
+                step[pending]/=10
+            if level==0:
+                derivative[active]=column[0,active]
+            fac=fac2
+            for j in range(1,level+1):
+                column[j,active]=(column[j-1,active]*fac-tableau[j-1,active])/(fac-1)
+                fac*=fac2
+                new_error=np.maximum(np.abs(column[j,active]-column[j-1,active]),
+                                     np.abs(column[j,active]-tableau[j-1,active]))
+                better=new_error<=error[active]
+                error[active[better]]=new_error[better]
+                derivative[active[better]]=column[j,active[better]]
+            if level>0:
+                # higher order became worse than the best estimate: stop this point
+                diverged=np.abs(column[level,active]-tableau[level-1,active])>=safe*error[active]
+                active=active[~diverged]
+            if active.size==0:
+                break
+            tableau[:level+1,active]=column[:level+1,active]
+            step[active]/=factor
+    except:
+        raise RuntimeError(f"Invalid value {val} for defined function.")
+    if not np.all(np.isfinite(derivative)):
+        raise RuntimeError(f"No finite derivative at {val}, func may not be defined around it.")
+    if scalar:
+        return {"derivative":float(derivative[0]),"error":float(error[0]),"evaluations":int(evaluations[0])}
+    shape=np.shape(val)
+    return {"derivative":derivative.reshape(shape),"error":error.reshape(shape),
+            "evaluations":evaluations.reshape(shape)}
+
 class INTEGRATION_TYPE(Enum):
     RECTANGLE=auto()
     TRAPZOID=auto()
     BOOLE=auto()
+    GAUSS_LEGENDRE=auto() #exact for polynomials of degree 2*n_nodes-1
+    CLENSHAW_CURTIS=auto() #exact for polynomials of degree n_nodes-1, panels share end points
+
+def gauss_legendre(n_nodes:int):
+    """cached Gauss-Legendre nodes and weights on [-1,1]
+
+    Returns:
+        nodes, weights: read-only 1D arrays of length n_nodes
+    """
+    return _gauss_legendre(int(n_nodes))
+
+def clenshaw_curtis(n_nodes:int):
+    """cached Clenshaw-Curtis nodes (increasing, including -1 and 1) and weights on [-1,1]
+
+    Returns:
+        nodes, weights: read-only 1D arrays of length n_nodes
+    """
+    return _clenshaw_curtis(int(n_nodes))
+
+@lru_cache(maxsize=128)
+def _gauss_legendre(n_nodes):
+    if n_nodes<1:
+        raise ValueError("At least 1 node is required for Gauss-Legendre quadrature.")
+    nodes,weights=np.polynomial.legendre.leggauss(n_nodes)
+    nodes.setflags(write=False)
+    weights.setflags(write=False)
+    return nodes,weights
+
+@lru_cache(maxsize=128)
+def _clenshaw_curtis(n_nodes):
+    if n_nodes<2:
+        raise ValueError("At least 2 nodes are required for Clenshaw-Curtis quadrature.")
+    # x_k=-cos(k\pi/N), w_k=\frac{c_k}{N}(1-\sum_{j=1}^{N/2}\frac{b_j}{4j^2-1}\cos(2jk\pi/N))
+    # c_0=c_N=1, c_k=2 otherwise; b_{N/2}=1, b_j=2 otherwise
+    N=n_nodes-1
+    theta=np.arange(n_nodes)*np.pi/N
+    j=np.arange(1,N//2+1)
+    b=np.where(2*j==N,1.0,2.0)
+    weights=1-(b/(4*j**2-1))@np.cos(2*np.outer(j,theta))
+    weights*=np.where((np.arange(n_nodes)==0)|(np.arange(n_nodes)==N),1.0,2.0)/N
+    nodes=np.sin(np.pi*(2*np.arange(n_nodes)-N)/(2*N)) # =-cos(theta), exactly symmetric
+    nodes.setflags(write=False)
+    weights.setflags(write=False)
+    return nodes,weights
+
+# rule of the numba kernel and evaluations per panel
+_NEWTON_COTES={INTEGRATION_TYPE.RECTANGLE:(0,1),INTEGRATION_TYPE.TRAPZOID:(1,2),INTEGRATION_TYPE.BOOLE:(2,5)}
+
+def _newton_cotes(func,lb,step,n_domains,rule,absolute):
+    # the panel loop of intergration_func, same operations in the same order (compiled by numba)
+    area=0.0
+    for i in range(n_domains):
+        x=lb+i*step
+        if rule==0:
+            area+=step*abs(func(x+step/2)) if absolute else step*func(x+step/2)
+        elif rule==1:
+            area+=0.5*step*(abs(func(x))+abs(func(x+step))) if absolute\
+                else 0.5*step*(func(x)+func(x+step))
+        else:
+            area+=step/90*(7*abs(func(x))+32*abs(func(x+0.25*step))+\
+                12*abs(func(x+0.5*step))+32*abs(func(x+0.75*step))+7*abs(func(x+step)))\
+                if absolute else step/90*(7*func(x)+32*func(x+0.25*step)+\
+                12*func(x+0.5*step)+32*func(x+0.75*step)+7*func(x+step))
+    return area
+
+def _evaluate_nodes(func,nodes):
+    # one vectorized call, point by point if func only takes scalars
+    try:
+        values=np.asarray(func(nodes),dtype=float)
+        if values.shape==nodes.shape:
+            return values
+    except Exception:
+        pass
+    return np.array([func(node) for node in nodes],dtype=float)
+
+def _quadrature(lb,ub,func,intergral_type,n_domains,n_nodes,absolute):
+    step=(ub-lb)/n_domains
+    if intergral_type==INTEGRATION_TYPE.GAUSS_LEGENDRE:
+        nodes,weights=gauss_legendre(n_nodes)
+        x=(lb+step*(np.arange(n_domains)[:,None]+0.5*(nodes+1))).ravel()
+        weights=np.tile(0.5*step*weights,n_domains)
+    else:
+        nodes,weights=clenshaw_curtis(n_nodes)
+        # neighbouring panels share their end points, which are evaluated once
+        N=n_nodes-1
+        x=lb+step*(np.arange(n_domains)[:,None]+0.5*(nodes[:-1]+1)).ravel()
+        x=np.append(x,ub)
+        panel=np.zeros(n_domains*N+1)
+        np.add.at(panel,np.arange(n_domains)[:,None]*N+np.arange(n_nodes),np.broadcast_to(weights,(n_domains,n_nodes)))
+        weights=0.5*step*panel
+    count("intergration_func.points",x.size)
+    values=_evaluate_nodes(func,x)
+    return float(weights@(np.abs(values) if absolute else values))
 
 def intergration_func(lb:float,ub:float,
                       func:callable,
                       intergral_type:INTEGRATION_TYPE=INTEGRATION_TYPE.TRAPZOID,
-                      n_domains:int=100,
+                      n_domains:int=None,
                       absolute=False,
-                      *args,**kwargs):
+                      n_nodes:int=8,
+                      *args,
+                      backend:BACKEND=None,
+                      **kwargs):
+    """definite integral of func on [lb,ub]
+
+    Newton-Cotes rules (RECTANGLE, TRAPZOID, BOOLE) call func point by point on n_domains panels, in a numba\
+    loop with BACKEND.NUMBA (func is compiled, the NumPy backend is used if numba could not compile it).\
+    GAUSS_LEGENDRE and CLENSHAW_CURTIS use cached nodes and weights (n_nodes per panel) and call func once\
+    with the array of all nodes (point by point if func does not accept arrays), so a smooth integrand\
+    reaches machine precision with a single panel of a few tens of nodes.
+
+    Args:
+        lb (float): lower bound
+        ub (float): upper bound
+        func (callable): integrand
+        intergral_type (INTEGRATION_TYPE, optional): rule. Defaults to INTEGRATION_TYPE.TRAPZOID.
+        n_domains (int, optional): number of panels. Defaults to None (100 for the Newton-Cotes rules, 1 for\
+            GAUSS_LEGENDRE and CLENSHAW_CURTIS).
+        absolute (bool, optional): integrate |func|. Defaults to False.
+        n_nodes (int, optional): nodes per panel of GAUSS_LEGENDRE and CLENSHAW_CURTIS. Defaults to 8.
+        backend (BACKEND, optional): backend of the Newton-Cotes loop. Defaults to None\
+            (backend.set_default_backend).
+
+    Returns:
+        area: float
+    """
     if ub<=lb:
         raise ValueError("Upper bound must be larger than lower bound.")
     if not callable(func):
         raise TypeError("Parameter func should be a callable function.")
+    if n_domains is None:
+        n_domains=100 if intergral_type in _NEWTON_COTES else 1
+    if intergral_type in _NEWTON_COTES and resolve_backend(backend)==BACKEND.NUMBA:
+        rule,points=_NEWTON_COTES[intergral_type]
+        try:
+            area=jit_run(_newton_cotes,(func,),float(lb),(ub-lb)/n_domains,int(n_domains),rule,bool(absolute))
+        except Exception:
+            raise RuntimeError(f"Invalid value in [{lb}, {ub}] for the defined function.")
+        if area is not None:
+            count("intergration_func.evaluations",points*n_domains)
+            return area
+    func=counted(func,"intergration_func.evaluations")
+    if intergral_type in (INTEGRATION_TYPE.GAUSS_LEGENDRE,INTEGRATION_TYPE.CLENSHAW_CURTIS):
+        try:
+            return _quadrature(lb,ub,func,intergral_type,n_domains,n_nodes,absolute)
+        except ValueError:
+            raise
+        except:
+            raise RuntimeError(f"Invalid value in [{lb}, {ub}] for the defined function.")
     step=(ub-lb)/n_domains
     x,area,i=lb,0,0
     while i<n_domains:
@@ -0,0 +1,146 @@
+import re
+import numpy as np
+from functools import lru_cache
+
+# one token per match: element with count, opening bracket, or closing bracket with multiplier
+_TOKEN=re.compile(r"([A-Z][a-z]?)(\d+(?:\.\d+)?)?|([(\[{])|([)\]}])(\d+(?:\.\d+)?)?|\s+")
+# charge at the end of a formula: ^2-, ^+, -2, +3, +, ---
+_CHARGE=re.compile(r"(?:\^(\d*)([+-])|([+-])(\d+)|([+-]+))$")
+# hydrate / adduct separators, e.g. CuSO4·5H2O, CuSO4.5H2O, CuSO4*5H2O
+# ("." is only a separator before an integer coefficient and never the decimal point of a leading coefficient,\
+# so CaSO4·0.5H2O works while CaSO4.0.5H2O needs "·" or "*")
+_SEPARATOR=re.compile(r"[·•*]|\.(?=\s*\d*\s*[A-Z(\[{])")
+_INTEGER=re.compile(r"\s*\d+")
+_COEFFICIENT=re.compile(r"\s*(\d+(?:\.\d+)?)?")
+_CLOSING={")":"(","]":"[","}":"{"}
+
+def parse_formula(formula:str,return_charge:bool=False):
+    """count atoms of each element in a chemical formula
+
+    Nested brackets ((), [], {}), hydrates and adducts (CuSO4·5H2O, leading coefficients of each part),\
+    decimal counts (CaSO4·0.5H2O) and charges (SO4^2-, Fe+3, NO3-, e-) are supported. Results of\
+    repeated formulas are cached. A number before a trailing sign is a count, not the charge: "Fe3+" is\
+    Fe3 with charge +1, write "Fe^3+" or "Fe+3" for the iron(III) ion.
+
+    Args:
+        formula (str): chemical formula, e.g. "Mg[Fe(CN)6]2" or "K4[Fe(CN)6]·3H2O"
+        return_charge (bool, optional): also return the charge. Defaults to False.
+
+    Returns:
+        counts: dict {element: count}
+        charge (only if `return_charge`): charge of the species
+    """
+    items,charge=_parse(formula)
+    if return_charge:
+        return dict(items),charge
+    return dict(items)
+
+def formula_matrix(formulas,elements:list=None,return_charge:bool=False):
+    """parse many formulas into a dense count matrix
+
+    Args:
+        formulas: iterable of formula strings
+        elements (list, optional): elements of the columns. Defaults to None (elements in order of\
+            their first appearance).
+        return_charge (bool, optional): also return charges of all formulas. Defaults to False.
+
+    Returns:
+        matrix: 2D array (n_formulas*n_elements)
+        elements: list of elements of the columns
+        charges (only if `return_charge`): 1D array (n_formulas)
+    """
+    parsed=[_parse(formula) for formula in formulas]
+    if elements is None:
+        index={}
+        for items,_ in parsed:
+            for element,_ in items:
+                index.setdefault(element,len(index))
+        elements=list(index)
+    else:
+        elements=list(elements)
+        index={element:i for i,element in enumerate(elements)}
+    rows,cols,values=[],[],[]
+    try:
+        for row,(items,_) in enumerate(parsed):
+            for element,count in items:
+                rows.append(row)
+                cols.append(index[element])
+                values.append(count)
+    except KeyError as err:
+        raise ValueError(f"Element {err.args[0]} is not in the given elements.")
+    matrix=np.zeros((len(parsed),len(elements)),dtype=float)
+    matrix[rows,cols]=values
+    if return_charge:
+        return matrix,elements,np.array([charge for _,charge in parsed],dtype=float)
+    return matrix,elements
+
+def clear_formula_cache():
+    _parse.cache_clear()
+
+@lru_cache(maxsize=65536)
+def _parse(formula:str):
+    # returns an immutable result ((element, count), ...), charge so that it could be cached
+    if not isinstance(formula,str):
+        raise TypeError("Chemical formula should be a string.")
+    body,charge=formula.strip(),0
+    if body=="e-" or body=="e":
+        return (),-1 # electron
+    match=_CHARGE.search(body) if ("+" in body or "-" in body) else None
+    if match:
+        if match.group(5):
+            charge=len(match.group(5))*(1 if match.group(5)[0]=="+" else -1)
+        else:
+            sign=match.group(2) or match.group(3)
+            number=match.group(1) if match.group(2) else match.group(4)
+            charge=(int(number) if number else 1)*(1 if sign=="+" else -1)
+        body=body[:match.start()]
+    counts={}
+    for part in _split(body):
+        coefficient=_COEFFICIENT.match(part)
+        multiplier=_number(coefficient.group(1)) if coefficient.group(1) else 1
+        for element,count in _parse_part(part,coefficient.end(),formula).items():
+            counts[element]=counts.get(element,0)+multiplier*count
+    if not counts:
+        raise ValueError(f"Invalid chemical formula \"{formula}\".")
+    return tuple(counts.items()),charge
+
+def _split(body):
+    # split at separators, except a "." which is the decimal point of a leading coefficient (0.5H2O)
+    parts,start=[],0
+    for match in _SEPARATOR.finditer(body):
+        if match.group()=="." and _INTEGER.fullmatch(body,start,match.start()):
+            continue
+        parts.append(body[start:match.start()])
+        start=match.end()
+    parts.append(body[start:])
+    return parts
+
+def _parse_part(part,pos,formula):
+    stack=[{}]
+    brackets=[]
+    end=len(part)
+    while pos<end:
+        match=_TOKEN.match(part,pos)
+        if match is None or match.end()==pos:
+            raise ValueError(f"Invalid character \"{part[pos]}\" in chemical formula \"{formula}\".")
+        pos=match.end()
+        element,opening,closing=match.group(1),match.group(3),match.group(4)
+        if element:
+            count=_number(match.group(2)) if match.group(2) else 1
+            stack[-1][element]=stack[-1].get(element,0)+count
+        elif opening:
+            stack.append({})
+            brackets.append(opening)
+        elif closing:
+            if not brackets or brackets.pop()!=_CLOSING[closing]:
+                raise ValueError(f"Unbalanced brackets in chemical formula \"{formula}\".")
+            group=stack.pop()
+            multiplier=_number(match.group(5)) if match.group(5) else 1
+            for el,cnt in group.items():
+                stack[-1][el]=stack[-1].get(el,0)+cnt*multiplier
+    if brackets:
+        raise ValueError(f"Unbalanced brackets in chemical formula \"{formula}\".")
+    return stack[0]
+
+def _number(text):
+    return float(text) if "." in text else int(text)
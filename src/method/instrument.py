@@ -0,0 +1,117 @@
+import time
+from contextvars import ContextVar
+from contextlib import contextmanager, nullcontext
+
+# current Recorder of this thread (or asyncio task), threads started inside a block do not inherit it
+_ACTIVE=ContextVar("instrument_recorder",default=None)
+_OFF=nullcontext()
+
+class Recorder:
+    def __init__(self,callback:callable=None):
+        """counters, phase timers and per-iteration series collected inside `instrument()`
+
+        Args:
+            callback (callable, optional): called with to_dict() when the `instrument()` block exits.\
+                Defaults to None.
+        """
+        self.callback=callback
+        self.counters={}
+        self.timers={}
+        self.series={}
+
+    def count(self,name:str,k:int=1):
+        self.counters[name]=self.counters.get(name,0)+k
+
+    def add_time(self,name:str,seconds:float):
+        timer=self.timers.setdefault(name,{"total":0.0,"calls":0})
+        timer["total"]+=seconds
+        timer["calls"]+=1
+
+    def record(self,name:str,**values):
+        self.series.setdefault(name,[]).append(values)
+
+    def to_dict(self):
+        return {
+            "counters":dict(self.counters),
+            "timers":{name:dict(timer) for name,timer in self.timers.items()},
+            "series":{name:[dict(item) for item in items] for name,items in self.series.items()}
+        }
+
+    def to_json(self,path:str=None,**kwargs):
+        """JSON string of to_dict(), also written to `path` if given"""
+        import json
+        text=json.dumps(self.to_dict(),default=float,**kwargs)
+        if path is not None:
+            with open(path,"w") as f:
+                f.write(text)
+        return text
+
+class _Timer:
+    def __init__(self,recorder,name):
+        self.recorder,self.name=recorder,name
+
+    def __enter__(self):
+        self.start=time.perf_counter()
+        return self
+
+    def __exit__(self,*exc):
+        self.recorder.add_time(self.name,time.perf_counter()-self.start)
+        return False
+
+@contextmanager
+def instrument(callback:callable=None):
+    """switch instrumentation on inside a with block
+
+    Function evaluations, linear solves, phase times and per-iteration values (e.g. loss and damping of\
+    Regressor.fit) of src/method are collected into the yielded Recorder. Regressor.evaluations counts model\
+    evaluations per point (a vectorized call on n points counts n), the other *.evaluations counters count\
+    calls of func (intergration_func.points holds the points of vectorized quadrature). Outside the block\
+    every hook is a single context variable lookup. Blocks could be nested, the inner one collects alone.\
+    The recorder is local to the thread that opened the block, so concurrent fits in other threads are not\
+    mixed in. Work done in other processes (RANSAC and bootstrap workers) is only counted where the parent\
+    receives its results.
+
+    Args:
+        callback (callable, optional): called with the collected dict (see Recorder.to_dict) on exit,\
+            e.g. to feed a metrics system. Defaults to None.
+
+    Yields:
+        recorder: Recorder object
+    """
+    recorder=Recorder(callback)
+    token=_ACTIVE.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _ACTIVE.reset(token)
+        if callback is not None:
+            callback(recorder.to_dict())
+
+def active():
+    """the current Recorder, or None when instrumentation is off"""
+    return _ACTIVE.get()
+
+def count(name:str,k:int=1):
+    recorder=_ACTIVE.get()
+    if recorder is not None:
+        recorder.count(name,k)
+
+def record(name:str,**values):
+    recorder=_ACTIVE.get()
+    if recorder is not None:
+        recorder.record(name,**values)
+
+def phase(name:str):
+    """context manager timing a phase, a shared no-op when instrumentation is off"""
+    recorder=_ACTIVE.get()
+    return _OFF if recorder is None else _Timer(recorder,name)
+
+def counted(func:callable,name:str):
+    """func itself when instrumentation is off, otherwise a wrapper counting its calls under `name`"""
+    recorder=_ACTIVE.get()
+    if recorder is None:
+        return func
+    def wrapper(*args,**kwargs):
+        recorder.count(name)
+        return func(*args,**kwargs)
+    return wrapper
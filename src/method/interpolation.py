@@ -2,6 +2,10 @@ import numpy as np
 import warnings
 from enum import Enum,auto
 from .devint import intergration_func,INTEGRATION_TYPE
+from .plotting import update_line, curve_points, finish
+from .cache import resolve_cache, hash_key
+from .instrument import count, phase
+from .backend import BACKEND, resolve_backend, jit_run
 
 class INTERPOLATE_TYPE(Enum):
     LINEAR=auto()
@@ -13,6 +17,7 @@ class Interpolation:
                  x:np.ndarray,
                  y:np.ndarray,
                  interpo_type:INTERPOLATE_TYPE,
+                 cache=None,
                  *args,**kwargs):
         """create a interpolated curve object
 
@@ -20,6 +25,8 @@ class Interpolation:
             x (np.ndarray): indenpendent variable (must arranged from small number to large number)
             y (np.ndarray): dependent variable to x
             interpo_type (INTERPOLATE_TYPE): expected interpolation type
+            cache (optional): ResultCache for spline coefficients of cubic interpolation, looked up by x and y.\
+                Defaults to None (the default cache, see cache.set_default_cache), False disables it.
         """
         if len(x)!=len(y):
             raise ValueError("x and y are not in the same length.")
@@ -32,11 +39,11 @@ class Interpolation:
         self.interpolation_type=interpo_type
         self.para=None
         if self.interpolation_type==INTERPOLATE_TYPE.CUBIC:
-            self._cubicinterpo()
+            self._cubicinterpo(cache=cache)
         elif self.interpolation_type==INTERPOLATE_TYPE.LAGRANGE and self.length>50:
             warnings.warn("If there are too many points, Lagarange interpolation is not recommended.")
             
-    def __call__(self, val:float, *args, **kwargs):
+    def __call__(self, val:float, *args, backend:BACKEND=None, **kwargs):
         if val<self.x[0] or val>self.x[-1]:
             raise ValueError("Value out of range.")
         elif val==self.x[-1]:
@@ -51,14 +58,7 @@ class Interpolation:
                     return self.para[4*index]*val**3+self.para[4*index+1]*val**2+\
                         self.para[4*index+2]*val+self.para[4*index+3]
                 case INTERPOLATE_TYPE.LAGRANGE:
-                    func=0
-                    for j in range(self.length):
-                        L_j=1
-                        for i in range(self.length):
-                            if i!=j:
-                                L_j=L_j*(val-self.x[i])/(self.x[j]-self.x[i])
-                        func+=L_j*self.y[j]
-                    return func
+                    return self._lagrange(_lagrange_value,_lagrange_value_numpy,val,backend)
                 
     def __len__(self):
         return self.length
@@ -74,26 +74,22 @@ class Interpolation:
                  derivative:bool=False,
                  epsilon:float=1e-5,
                  *args,**kwargs):
-        if not num_points:
-            num_points=10*self.length
+        line=kwargs.pop("line",None)
+        num_points=curve_points(ax,num_points,10*self.length)
         if derivative:
             x_=np.linspace(self.x[0],self.x[-1]-epsilon*(self.x[-1]-self.x[-2]),num_points)
             y_=np.array([self.derivative(x_[i]) for i in range(num_points)])
         else:
             x_=np.linspace(self.x[0],self.x[-1],num_points)
             y_=np.array([self(x_[i]) for i in range(num_points)])
-        line, = ax.plot(x_,y_,*args,**kwargs)
-        ax.figure.canvas.draw()
-        ax.legend()
-        return line
+        return update_line(ax,x_,y_,line,*args,**kwargs)
     
     def scattering(self,ax,*args,**kwargs):
         points=ax.scatter(self.x,self.y,*args,**kwargs)
-        ax.figure.canvas.draw()
-        ax.legend()
+        finish(ax,points)
         return points
     
-    def derivative(self,val:float,*args,**kwargs):
+    def derivative(self,val:float,*args,backend:BACKEND=None,**kwargs):
         if val<self.x[0] or val>=self.x[-1]:
             raise ValueError("Value out of range.")
         else:
@@ -105,18 +101,7 @@ class Interpolation:
                     return 3*self.para[4*index]*val**2+2*self.para[4*index+1]*val+\
                         self.para[4*index+2]
                 case INTERPOLATE_TYPE.LAGRANGE:
-                    L=0
-                    for j in range(self.length):
-                        L_j=0
-                        for k in range(self.length):
-                            if k!=j:
-                                mul=1
-                                for m in range(self.length):
-                                    if m!=j and m!=k:
-                                        mul=mul*(val-self.x[m])/(self.x[j]-self.x[m])
-                                L_j+=mul/(self.x[j]-self.x[k])
-                        L+=self.y[j]*L_j
-                    return L
+                    return self._lagrange(_lagrange_derivative,_lagrange_derivative_numpy,val,backend)
                 
     def integration(self,lb:float,ub:float,*args,**kwargs):
         if not (lb>=self.x[0] and lb<self.x[-1] and ub>self.x[0] \
@@ -152,15 +137,34 @@ class Interpolation:
                                 self.para[4*id_l+3]*(ub-self.x[id_l])
                     return integ
                 case INTERPOLATE_TYPE.LAGRANGE:
+                    # the interpolation polynomial has degree length-1, so this is exact
                     return intergration_func(lb,ub,self,
-                                             intergral_type=INTEGRATION_TYPE.BOOLE,
-                                             n_domains=ub_domain-lb_domain,
-                                             absolute=False)
+                                             intergral_type=INTEGRATION_TYPE.GAUSS_LEGENDRE,
+                                             n_domains=1,
+                                             absolute=False,
+                                             n_nodes=self.length//2+1)
                                     
+    def _lagrange(self,kernel,kernel_numpy,val,backend):
+        # BACKEND.NUMBA runs the loop kernel compiled, BACKEND.NUMPY its vectorized equivalent
+        x,y=np.asarray(self.x,dtype=float),np.asarray(self.y,dtype=float)
+        if resolve_backend(backend)==BACKEND.NUMBA:
+            result=jit_run(kernel,(),x,y,float(val))
+            if result is not None:
+                return result
+        return kernel_numpy(x,y,val)
+
     def _cubicinterpo(self,
-                  boundries:tuple=(0,0)):
+                  boundries:tuple=(0,0),
+                  cache=None):
         
         x,y=self.x, self.y
+        cache=resolve_cache(cache)
+        if cache is not None:
+            key=hash_key("Interpolation._cubicinterpo",np.asarray(x),np.asarray(y),boundries=tuple(boundries))
+            result=cache.get(key)
+            if result is not None:
+                self.para=result["para"]
+                return
         legh,i=len(x),0
         mat=np.zeros((4*legh-4,4*legh-4))
         sol=np.zeros((4*legh-4,))
@@ -201,9 +205,60 @@ class Interpolation:
             
             i+=1
         
-        self.para=np.linalg.solve(mat,sol)
+        count("linear_solves")
+        with phase("Interpolation.cubic_solve"):
+            self.para=np.linalg.solve(mat,sol)
+        if cache is not None:
+            cache.put(key,{"para":self.para})
         # cubic curve stabilization finishes
         # parameters are solved to be this form:
         # [a_1 b_1 c_1 d_1 a_2 b_2 c_2 d_2 ... a_n b_n c_n d_n]
         # where a_i to d_i is cubic polynomial coefficients on each part of curve
-        # y=a_i*x^3+b_i*x^2+c_i*x+d_i (x_i<x<x_{i+1},i=0,1,...,n), n+1 is total number of points
\ No newline at end of file
+        # y=a_i*x^3+b_i*x^2+c_i*x+d_i (x_i<x<x_{i+1},i=0,1,...,n), n+1 is total number of points
+def _lagrange_value(x,y,val):
+    # sum_j y_j*prod_{i!=j}(val-x_i)/(x_j-x_i), O(n^2) loops (compiled by numba)
+    func=0.0
+    for j in range(len(x)):
+        L_j=1.0
+        for i in range(len(x)):
+            if i!=j:
+                L_j=L_j*(val-x[i])/(x[j]-x[i])
+        func+=L_j*y[j]
+    return func
+
+def _lagrange_derivative(x,y,val):
+    # sum_j y_j*sum_{k!=j}prod_{m!=j,k}(val-x_m)/(x_j-x_m)/(x_j-x_k), O(n^3) loops (compiled by numba)
+    L=0.0
+    for j in range(len(x)):
+        L_j=0.0
+        for k in range(len(x)):
+            if k!=j:
+                mul=1.0
+                for m in range(len(x)):
+                    if m!=j and m!=k:
+                        mul=mul*(val-x[m])/(x[j]-x[m])
+                L_j+=mul/(x[j]-x[k])
+        L+=y[j]*L_j
+    return L
+
+def _lagrange_ratios(x,val):
+    # ratios[j,i]=(val-x_i)/(x_j-x_i), 1 on the diagonal
+    with np.errstate(divide="ignore",invalid="ignore"):
+        ratios=(val-x[None,:])/(x[:,None]-x[None,:])
+    np.fill_diagonal(ratios,1.0)
+    return ratios
+
+def _lagrange_value_numpy(x,y,val):
+    return np.prod(_lagrange_ratios(x,val),axis=1).dot(y)
+
+def _lagrange_derivative_numpy(x,y,val):
+    # products[j,k]: prod over m!=j,k of ratios[j,m], from exclusive prefix and suffix products of\
+    # each row (the diagonal ratio is 1), O(n^2) memory and no division by (val-x_k)
+    ratios=_lagrange_ratios(x,val)
+    ones=np.ones((len(x),1))
+    prefix=np.concatenate((ones,np.cumprod(ratios[:,:-1],axis=1)),axis=1)
+    suffix=np.concatenate((np.cumprod(ratios[:,:0:-1],axis=1)[:,::-1],ones),axis=1)
+    products=prefix*suffix
+    difference=x[:,None]-x[None,:]
+    np.fill_diagonal(difference,np.inf)
+    return np.sum(products/difference,axis=1).dot(y)
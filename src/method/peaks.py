@@ -0,0 +1,235 @@
+import numpy as np
+from .devint import savgol_filter, derivative_discrete
+
+PEAK_FIELDS=[("injection",int),("index",int),("retention_time",float),("height",float),("area",float),
+             ("width",float),("plates",float),("prominence",float),("start",float),("end",float)]
+
+def estimate_noise(signal:np.ndarray):
+    """standard deviation of the noise of a trace, from the median absolute deviation of its first difference"""
+    step=np.diff(np.asarray(signal,dtype=float))
+    return 1.4826*np.median(np.abs(step-np.median(step)))/np.sqrt(2)
+
+def estimate_baseline(signal:np.ndarray,window:int=None):
+    """slowly varying baseline of a trace: morphological opening (moving minimum, then moving maximum)\
+        followed by a moving average, all over `window` samples
+
+    Peaks narrower than `window` samples are removed, drift and offset of the detector are kept. The\
+    opening follows the lower envelope of the noise, so smooth the signal first (see find_peaks).
+
+    Args:
+        signal (np.ndarray): 1D array, detector signal
+        window (int, optional): window length in samples, a few times the base width of the widest peak.\
+            Defaults to None (a tenth of the trace).
+
+    Returns:
+        baseline: 1D array, same length as signal
+    """
+    signal=np.asarray(signal,dtype=float)
+    window=max(3,len(signal)//10) if window is None else int(min(window,len(signal)))
+    lower=_moving(signal,window,np.minimum)
+    upper=_moving(lower,window,np.maximum)
+    padded=np.pad(upper,(window//2,window-1-window//2),mode="edge")
+    cumsum=np.concatenate(([0.0],np.cumsum(padded)))
+    return (cumsum[window:]-cumsum[:-window])/window
+
+def find_peaks(t:np.ndarray,
+               signal:np.ndarray,
+               baseline=None,
+               smooth:int=11,
+               min_prominence:float=None,
+               min_height:float=0.0,
+               min_width:float=0.0,
+               max_width:float=np.inf,
+               baseline_window:int=None,
+               injection:int=0):
+    """detect and integrate the peaks of one chromatogram
+
+    The baseline is subtracted, then the trace is smoothed and differentiated with a Savitzky-Golay filter\
+    and peaks are picked where the derivative changes from positive to negative. Prominences (height above\
+    the higher of the two lowest points before reaching a higher peak on each side) and widths at half\
+    height are computed for all candidates, and candidates failing the filters are dropped. Each peak is\
+    integrated (trapezoid rule on the corrected raw signal) between the valleys to its retained\
+    neighbours, cut where the smoothed signal returns to the noise level.
+
+    Args:
+        t (np.ndarray): 1D array, time, monotonically increasing
+        signal (np.ndarray): 1D array, detector signal
+        baseline (optional): None estimates it (estimate_baseline), False uses zero, an array is subtracted\
+            as given. Defaults to None.
+        smooth (int, optional): odd Savitzky-Golay window (polynomial order 2), 0 picks peaks on the raw\
+            signal. Defaults to 11.
+        min_prominence (float, optional): smallest prominence of a peak. Defaults to None (5 times the noise).
+        min_height (float, optional): smallest height above the baseline. Defaults to 0.0.
+        min_width (float, optional): smallest width at half height (in units of t). Defaults to 0.0.
+        max_width (float, optional): largest width at half height. Defaults to np.inf.
+        baseline_window (int, optional): window of the baseline estimate in samples. Defaults to None (a\
+            tenth of the trace).
+        injection (int, optional): value of the injection field of the results. Defaults to 0.
+
+    Returns:
+        peaks: structured array with fields injection, index, retention_time (parabolic interpolation of\
+            the maximum), height, area, width (at half height), plates (5.54*(t_R/W_h)^2), prominence, start\
+            and end (integration bounds), sorted by retention time
+    """
+    t,signal=np.asarray(t,dtype=float),np.asarray(signal,dtype=float)
+    if t.ndim!=1 or signal.shape!=t.shape:
+        raise ValueError("t and signal should be 1D arrays in the same length.")
+    if len(t)<3:
+        raise ValueError("At least 3 points are required to detect peaks.")
+    if not np.all(np.diff(t)>0):
+        raise ValueError("t should be monotonically increasing.")
+    noise=estimate_noise(signal)
+    if min_prominence is None:
+        min_prominence=5*noise
+    smooth=smooth if smooth and len(t)>=smooth else 0
+    smoothed=savgol_filter(signal,smooth,2,x=t) if smooth else signal
+    if baseline is None:
+        baseline=estimate_baseline(smoothed,baseline_window)
+    elif baseline is False:
+        baseline=0.0
+    # the filter is linear, the baseline is subtracted from the smoothed signal directly
+    corrected,smoothed=signal-baseline,smoothed-baseline
+    slope=savgol_filter(corrected,smooth,2,deriv=1,x=t) if smooth else derivative_discrete(t,corrected)
+    # candidates: the derivative changes sign from + to -, the larger neighbour is the maximum
+    candidates=np.flatnonzero((slope[:-1]>0)&(slope[1:]<=0))
+    candidates+=smoothed[candidates+1]>smoothed[candidates]
+    candidates=np.unique(candidates[(candidates>0)&(candidates<len(t)-1)])
+    if len(candidates)==0:
+        return np.zeros(0,dtype=PEAK_FIELDS)
+    heights=smoothed[candidates]
+    prominence=heights-np.maximum(*_bases(smoothed,candidates))
+    keep=(prominence>=min_prominence)&(heights>=min_height)
+    candidates,heights,prominence=candidates[keep],heights[keep],prominence[keep]
+    if len(candidates)==0:
+        return np.zeros(0,dtype=PEAK_FIELDS)
+    # integration bounds: valleys between retained peaks, cut where the signal returns to the noise level
+    valleys=np.array([candidates[i]+np.argmin(smoothed[candidates[i]:candidates[i+1]+1])
+                      for i in range(len(candidates)-1)],dtype=int)
+    quiet=np.flatnonzero(smoothed<=3*noise)
+    left=np.concatenate(([0],valleys))
+    right=np.concatenate((valleys,[len(t)-1]))
+    position=np.searchsorted(quiet,candidates)
+    if len(quiet):
+        before=quiet[np.maximum(position-1,0)]
+        after=quiet[np.minimum(position,len(quiet)-1)]
+        left=np.where((position>0)&(before>left),before,left)
+        right=np.where((position<len(quiet))&(after<right),after,right)
+    width=_half_widths(t,smoothed,candidates,left,right)
+    keep=(width>=min_width)&(width<=max_width)
+    candidates,heights,prominence,left,right,width=(item[keep] for item in
+                                                     (candidates,heights,prominence,left,right,width))
+    retention_time=_vertex(t,smoothed,candidates)
+    # areas of all peaks from one cumulative trapezoid sum
+    cumulative=np.concatenate(([0.0],np.cumsum(0.5*(corrected[1:]+corrected[:-1])*np.diff(t))))
+    peaks=np.zeros(len(candidates),dtype=PEAK_FIELDS)
+    peaks["injection"]=injection
+    peaks["index"]=candidates
+    peaks["retention_time"]=retention_time
+    peaks["height"]=heights
+    peaks["area"]=cumulative[right]-cumulative[left]
+    peaks["width"]=width
+    with np.errstate(divide="ignore",invalid="ignore"):
+        peaks["plates"]=5.54*(retention_time/width)**2
+    peaks["prominence"]=prominence
+    peaks["start"]=t[left]
+    peaks["end"]=t[right]
+    return peaks
+
+def find_peaks_batch(t:np.ndarray,
+                     signals:np.ndarray,
+                     n_jobs:int=None,
+                     chunksize:int=16,
+                     **kwargs):
+    """find_peaks of many injections on a process pool
+
+    Args:
+        t (np.ndarray): 1D array, time shared by all injections
+        signals (np.ndarray): 2D array (n_injections*len(t)), or an iterable of 1D signals
+        n_jobs (int, optional): number of processes, 1 runs serially. Defaults to None (min(cpu_count(), 8)).
+        chunksize (int, optional): injections sent to a worker at once. Defaults to 16.
+        **kwargs: settings of find_peaks (baseline must be None or False)
+
+    Returns:
+        peaks: structured array of the peaks of all injections (see find_peaks), injection is the row of signals
+    """
+    if isinstance(kwargs.get("baseline"),np.ndarray):
+        raise ValueError("Baselines of a batch are estimated per injection, use baseline=None or False.")
+    settings=dict(kwargs,t=np.asarray(t,dtype=float))
+    tasks=enumerate(signals)
+    if n_jobs==1 or (hasattr(signals,"__len__") and len(signals)<=1):
+        _batch_init(settings)
+        results=list(map(_batch_run,tasks))
+    else:
+        from multiprocessing import Pool,cpu_count
+        with Pool(processes=n_jobs or min(cpu_count(),8),initializer=_batch_init,initargs=(settings,)) as pool:
+            results=list(pool.imap(_batch_run,tasks,chunksize=chunksize))
+    if not results:
+        return np.zeros(0,dtype=PEAK_FIELDS)
+    return np.concatenate(results)
+
+_BATCH_SETTINGS={}
+
+def _batch_init(settings):
+    # t and filter settings are sent once to each worker, tasks only carry (injection, signal)
+    _BATCH_SETTINGS.clear()
+    _BATCH_SETTINGS.update(settings)
+
+def _batch_run(task):
+    injection,signal=task
+    settings=dict(_BATCH_SETTINGS)
+    t=settings.pop("t")
+    return find_peaks(t,signal,injection=injection,**settings)
+
+def _moving(y,window,ufunc):
+    # centered moving minimum/maximum in O(n) for any window (van Herk/Gil-Werman): every window is the\
+    # suffix of one block and the prefix of the next block
+    n=len(y)
+    padded=np.pad(y,(window//2,window-1-window//2),mode="edge")
+    padded=np.pad(padded,(0,-len(padded)%window),mode="edge")
+    blocks=padded.reshape(-1,window)
+    prefix=ufunc.accumulate(blocks,axis=1).ravel()
+    suffix=ufunc.accumulate(blocks[:,::-1],axis=1)[:,::-1].ravel()
+    return ufunc(suffix[:n],prefix[window-1:window-1+n])
+
+def _bases(y,peaks):
+    # lowest point on each side before a higher peak (or the edge), monotonic stack over the peaks
+    valleys=np.minimum.reduceat(y,np.concatenate(([0],peaks)))
+    left=_left_bases(y[peaks],valleys[:-1])
+    # the same from the right: valleys between peaks and from the last peak to the end
+    tail=np.minimum.reduceat(y[::-1],np.concatenate(([0],len(y)-1-peaks[::-1])))
+    right=_left_bases(y[peaks][::-1],tail[:-1])[::-1]
+    return left,right
+
+def _left_bases(heights,valleys):
+    # valleys[j]: lowest point between peak j-1 (or the edge) and peak j
+    bases=np.empty(len(heights))
+    stack=[]
+    for j,height in enumerate(heights):
+        base=valleys[j]
+        while stack and stack[-1][0]<=height:
+            base=min(base,stack.pop()[1])
+        stack.append((height,base))
+        bases[j]=base
+    return bases
+
+def _half_widths(t,y,peaks,left,right):
+    # width at half height, interpolated linearly, limited to the integration bounds
+    half=0.5*y[peaks]
+    t_left,t_right=t[left].copy(),t[right].copy()
+    for i,(peak,l,r) in enumerate(zip(peaks,left,right)):
+        below=np.flatnonzero(y[l:peak]<half[i])
+        if len(below):
+            j=l+below[-1]
+            t_left[i]=t[j]+(half[i]-y[j])/(y[j+1]-y[j])*(t[j+1]-t[j])
+        below=np.flatnonzero(y[peak:r+1]<half[i])
+        if len(below):
+            j=peak+below[0]
+            t_right[i]=t[j-1]+(half[i]-y[j-1])/(y[j]-y[j-1])*(t[j]-t[j-1])
+    return t_right-t_left
+
+def _vertex(t,y,peaks):
+    # vertex of the parabola through the three points around each maximum
+    y0,y1,y2=y[peaks-1],y[peaks],y[peaks+1]
+    denom=y0-2*y1+y2
+    shift=np.divide(0.5*(y0-y2),denom,out=np.zeros(len(peaks)),where=denom!=0)
+    return t[peaks]+shift*np.where(shift>=0,t[peaks+1]-t[peaks],t[peaks]-t[peaks-1])
@@ -0,0 +1,158 @@
+import numpy as np
+
+def decimate_minmax(x:np.ndarray,y:np.ndarray,n_bins:int):
+    """keep the minimum and maximum of y in each of n_bins columns of x (e.g. one column per pixel),\
+    so the drawn line looks the same as the full trace
+
+    Args:
+        x (np.ndarray): 1D array, monotonically increasing
+        y (np.ndarray): 1D array
+        n_bins (int): number of columns
+
+    Returns:
+        x_, y_: decimated arrays, at most 2*n_bins points, in the original order
+    """
+    n=len(x)
+    if n<=2*n_bins or n_bins<1:
+        return x,y
+    edges=np.searchsorted(x,np.linspace(x[0],x[-1],n_bins+1)[1:-1])
+    starts=np.unique(np.concatenate(([0],edges)))
+    starts=starts[starts<n]
+    finite=np.where(np.isnan(y),-np.inf,y)
+    # first index of the maximum and minimum inside each column
+    imax=_segment_argext(finite,starts,np.maximum)
+    imin=_segment_argext(np.where(np.isnan(y),np.inf,y),starts,np.minimum)
+    keep=np.unique(np.concatenate((imin,imax,[0,n-1])))
+    return x[keep],y[keep]
+
+def _segment_argext(y,starts,ufunc):
+    ext=ufunc.reduceat(y,starts)
+    segment=np.repeat(np.arange(len(starts)),np.diff(np.append(starts,len(y))))
+    hit=np.where(y==ext[segment])[0]
+    # keep the first hit of every segment
+    first=np.unique(segment[hit],return_index=True)[1]
+    return hit[first]
+
+def pixel_width(ax):
+    """width of the axes in display pixels"""
+    return max(int(ax.bbox.width),1)
+
+class LODLine:
+    def __init__(self,ax,x:np.ndarray,y:np.ndarray,line=None,blit:bool=False,*args,**kwargs):
+        """a matplotlib line showing a min/max decimated view of a long trace.
+
+        Only about two points per pixel column are handed to matplotlib. The visible x range is\
+        decimated again when the axes are zoomed or panned. Updating data reuses the same Line2D.
+
+        Args:
+            ax : matplotlib canvas object
+            x (np.ndarray): 1D array, monotonically increasing
+            y (np.ndarray): 1D array
+            line (optional): existing Line2D to reuse. Defaults to None (a new line is added).
+            blit (bool, optional): redraw only this line with blitting in `set_data` when the canvas\
+                supports it. Defaults to False (canvas.draw_idle).
+            *args, **kwargs: passed to ax.plot when a new line is created.
+        """
+        self.ax=ax
+        self.blit=blit and ax.figure.canvas.supports_blit
+        self._background=None
+        self.x,self.y=np.asarray(x),np.asarray(y)
+        x_,y_=self._decimated(*ax.get_xlim()) if line is not None else self._decimated()
+        if line is None:
+            line,=ax.plot(x_,y_,*args,**kwargs)
+        else:
+            line.set_data(x_,y_)
+        self.line=line
+        self._callbacks=[ax.callbacks.connect("xlim_changed",self._on_xlim)]
+        if self.blit:
+            self._draw_cid=ax.figure.canvas.mpl_connect("draw_event",self._on_draw)
+
+    def _decimated(self,lo=None,hi=None):
+        x,y=self.x,self.y
+        if lo is not None and len(x)>0:
+            # a margin of one point on both sides keeps the line continuous at the edges
+            i=max(np.searchsorted(x,lo)-1,0)
+            j=min(np.searchsorted(x,hi,"right")+1,len(x))
+            x,y=x[i:j],y[i:j]
+        return decimate_minmax(x,y,pixel_width(self.ax))
+
+    def _on_xlim(self,ax):
+        self.line.set_data(*self._decimated(*ax.get_xlim()))
+
+    def _on_draw(self,event):
+        self._background=event.canvas.copy_from_bbox(self.ax.bbox)
+
+    def set_data(self,x:np.ndarray,y:np.ndarray):
+        """replace the full data of the trace, the Line2D object is kept"""
+        self.x,self.y=np.asarray(x),np.asarray(y)
+        lo,hi=self.ax.get_xlim()
+        if self.ax.get_autoscalex_on():
+            lo,hi=None,None
+        self.line.set_data(*self._decimated(lo,hi))
+        self.redraw()
+
+    def redraw(self):
+        canvas=self.ax.figure.canvas
+        if self.blit and self._background is not None:
+            canvas.restore_region(self._background)
+            self.ax.draw_artist(self.line)
+            canvas.blit(self.ax.bbox)
+        else:
+            canvas.draw_idle()
+
+    def remove(self):
+        for cid in self._callbacks:
+            self.ax.callbacks.disconnect(cid)
+        if self.blit:
+            self.ax.figure.canvas.mpl_disconnect(self._draw_cid)
+        self.line.remove()
+
+def plot_lod(ax,x:np.ndarray,y:np.ndarray,line=None,*args,**kwargs):
+    """draw (or update) a trace through a min/max decimated level-of-detail line
+
+    Args:
+        ax : matplotlib canvas object
+        x (np.ndarray): 1D array, monotonically increasing
+        y (np.ndarray): 1D array
+        line (optional): LODLine or Line2D returned by an earlier call, its data are replaced instead of\
+            adding a new artist. Defaults to None.
+
+    Returns:
+        line: LODLine object, the matplotlib Line2D is `line.line`
+    """
+    if isinstance(line,LODLine):
+        line.set_data(x,y)
+        return line
+    lod=LODLine(ax,x,y,line,*args,**kwargs)
+    if line is None:
+        ax.relim()
+        ax.autoscale_view()
+    finish(ax,lod.line)
+    return lod
+
+def update_line(ax,x:np.ndarray,y:np.ndarray,line=None,*args,**kwargs):
+    """draw a model curve on ax, or replace the data of an existing Line2D"""
+    if line is None:
+        line,=ax.plot(x,y,*args,**kwargs)
+    else:
+        line.set_data(x,y)
+        label=kwargs.get("label")
+        if label is not None:
+            line.set_label(label)
+        ax.relim()
+        ax.autoscale_view()
+    finish(ax,line)
+    return line
+
+def curve_points(ax,num_points:int,default:int):
+    """number of points to evaluate a model curve: enough for about two points per pixel column"""
+    if num_points:
+        return num_points
+    return min(default,2*pixel_width(ax))
+
+def finish(ax,artist):
+    """refresh the legend only if the new artist has a label, then schedule one redraw"""
+    label=artist.get_label()
+    if label and not label.startswith("_"):
+        ax.legend()
+    ax.figure.canvas.draw_idle()
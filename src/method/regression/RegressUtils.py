@@ -1,41 +1,180 @@
 import numpy as np
 
-def double_log(x:float,y:float):
-    try:
-        return np.log(x),np.log(y)
-    except:
-        raise ValueError("Invalid input of transformation \"log\"")
+class Transform:
+    def __init__(self,name:str,
+                 forward_x:callable,forward_y:callable,
+                 inverse_x:callable,inverse_y:callable,
+                 jacobian:callable,
+                 valid_x:callable,valid_y:callable):
+        """linearization transform (x, y) -> (u, v) working on whole arrays, usable as\
+        `LinRegressor(transform_xy=...)` or called directly like the old function `transform(x, y)`.
 
-def double_reciprocal(x:float,y:float):
-    try:
-        return 1/x,1/y
-    except:
-        raise ValueError("Invalid input of reciprocal transformation")
-    
-def firstorder_kinetics(t:float,c:float):
-    try:
-        return t,np.log(c)
-    except:
-        raise ValueError("Invalid input")
-    
-def secondorder_kinetics(t:float,c:float):
-    try:
-        return t,1/c
-    except:
-        raise ValueError("Invalid input")
-    
-def hanes_woolf(S:float,V:float):
-    try:
-        return S,S/V
-    except:
-        raise ValueError("Invalid input")
-    
-def Arrhenius(T:float,k:float):
+        Args:
+            name (str): name of the transform in the registry
+            forward_x (callable): forward_x(x, out) writes u into out
+            forward_y (callable): forward_y(x, y, out) writes v into out (x is broadcast to y)
+            inverse_x (callable): inverse_x(u) returns x
+            inverse_y (callable): inverse_y(u, v) returns y
+            jacobian (callable): jacobian(x, y) returns du/dx, dv/dy
+            valid_x (callable): valid_x(x) returns a mask of points in the domain of the transform
+            valid_y (callable): valid_y(y) returns a mask of points in the domain of the transform
+        """
+        self.name=name
+        self.forward_x,self.forward_y=forward_x,forward_y
+        self.inverse_x,self.inverse_y=inverse_x,inverse_y
+        self.jacobian_func=jacobian
+        self.valid_x,self.valid_y=valid_x,valid_y
+
+    def __call__(self,x,y,inplace:bool=False,mask:np.ndarray=None,*args,**kwargs):
+        """transform x and y, points out of the domain of the transform become NaN.
+
+        Args:
+            x (np.ndarray): 1D array (or scalar)
+            y (np.ndarray): 1D array, or 2D array (dim 0: data for different x)
+            inplace (bool, optional): write results into x and y, they must be float arrays. Defaults to False.
+            mask (np.ndarray, optional): precomputed `self.mask(x, y)`. Defaults to None.
+
+        Returns:
+            u, v: transformed arrays
+        """
+        if inplace:
+            if not (isinstance(x,np.ndarray) and isinstance(y,np.ndarray) and
+                    x.dtype.kind=="f" and y.dtype.kind=="f"):
+                raise TypeError("In-place transform needs float arrays.")
+            u,v=x,y
+        else:
+            x,y=np.asarray(x,dtype=float),np.asarray(y,dtype=float)
+            u,v=np.empty_like(x),np.empty_like(y)
+        mask_x=self.valid_x(x)
+        if mask is None:
+            mask=_broadcast(mask_x,y)&self.valid_y(y)
+        with np.errstate(divide="ignore",invalid="ignore",over="ignore"):
+            # y first, forward_y may read the original x
+            self.forward_y(_broadcast(x,y),y,v)
+            self.forward_x(x,u)
+        if not np.all(mask):
+            v[~mask]=np.nan
+            if u.ndim>0:
+                u[~mask_x]=np.nan
+        if u.ndim==0:
+            return u[()],v[()]
+        return u,v
+
+    def mask(self,x,y):
+        """mask of valid points (same shape as y), computed in one pass"""
+        x,y=np.asarray(x),np.asarray(y)
+        return _broadcast(self.valid_x(x),y)&self.valid_y(y)
+
+    def inverse(self,u,v):
+        """map transformed values back to the original x and y"""
+        u,v=np.asarray(u,dtype=float),np.asarray(v,dtype=float)
+        with np.errstate(divide="ignore",invalid="ignore",over="ignore"):
+            return self.inverse_x(u),self.inverse_y(_broadcast(u,v),v)
+
+    def jacobian(self,x,y):
+        """derivatives du/dx and dv/dy at the original points"""
+        x,y=np.asarray(x,dtype=float),np.asarray(y,dtype=float)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            return self.jacobian_func(_broadcast(x,y),y)
+
+    def propagate_sd(self,sd,x,y):
+        """first-order error propagation of standard deviations of y: SD(v)=|dv/dy|*SD(y)"""
+        return np.abs(self.jacobian(x,y)[1])*sd
+
+    def propagate_weights(self,weights,x,y):
+        """first-order error propagation of regression weights w=1/SD(y) (the convention of LinRegressor):\
+            w_v=w/|dv/dy|"""
+        return weights/np.abs(self.jacobian(x,y)[1])
+
+    def __repr__(self):
+        return f"Transform({self.name})"
+
+def _broadcast(x,y):
+    # x is a column when y holds parallel values of each x
+    if np.ndim(y)==2 and np.ndim(x)==1:
+        return x[:,None]
+    return x
+
+def _identity(a,out):
+    if out is not a:
+        out[...]=a
+    return out
+
+def _log(a,out):
+    return np.log(a,out=out)
+
+def _reciprocal(a,out):
+    return np.divide(1.0,a,out=out)
+
+def _finite(a):
+    return np.isfinite(a)
+
+def _positive(a):
+    return np.isfinite(a)&(a>0)
+
+def _nonzero(a):
+    return np.isfinite(a)&(a!=0)
+
+def _hanes_woolf_y(S,V,out):
+    return np.divide(S,V,out=out)
+
+TRANSFORMS={}
+
+def register_transform(transform:Transform,name:str=None):
+    """add a transform to the registry, so it could be selected by name in `LinRegressor(transform_xy=name)`"""
+    if not isinstance(transform,Transform):
+        raise TypeError("Only Transform objects could be registered.")
+    TRANSFORMS[transform.name if name is None else name]=transform
+    return transform
+
+def get_transform(name:str):
     try:
-        return 1/T,np.log(k)
-    except:
-        raise ValueError("Invalid input")
-    
+        return TRANSFORMS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transform \"{name}\", registered transforms: {list(TRANSFORMS)}")
+
+# ln(y)=ln(a)+b*ln(x)
+double_log=register_transform(Transform("double_log",
+    forward_x=_log,forward_y=lambda x,y,out:_log(y,out),
+    inverse_x=np.exp,inverse_y=lambda u,v:np.exp(v),
+    jacobian=lambda x,y:(1/x,1/y),
+    valid_x=_positive,valid_y=_positive))
+
+# Lineweaver-Burk: 1/V=Km/Vmax*(1/S)+1/Vmax
+double_reciprocal=register_transform(Transform("double_reciprocal",
+    forward_x=_reciprocal,forward_y=lambda x,y,out:_reciprocal(y,out),
+    inverse_x=lambda u:1/u,inverse_y=lambda u,v:1/v,
+    jacobian=lambda x,y:(-1/x**2,-1/y**2),
+    valid_x=_nonzero,valid_y=_nonzero))
+
+# ln(c)=ln(c0)-k*t
+firstorder_kinetics=register_transform(Transform("firstorder_kinetics",
+    forward_x=_identity,forward_y=lambda t,c,out:_log(c,out),
+    inverse_x=lambda u:u,inverse_y=lambda u,v:np.exp(v),
+    jacobian=lambda t,c:(np.ones_like(t),1/c),
+    valid_x=_finite,valid_y=_positive))
+
+# 1/c=1/c0+k*t
+secondorder_kinetics=register_transform(Transform("secondorder_kinetics",
+    forward_x=_identity,forward_y=lambda t,c,out:_reciprocal(c,out),
+    inverse_x=lambda u:u,inverse_y=lambda u,v:1/v,
+    jacobian=lambda t,c:(np.ones_like(t),-1/c**2),
+    valid_x=_finite,valid_y=_nonzero))
+
+# S/V=S/Vmax+Km/Vmax
+hanes_woolf=register_transform(Transform("hanes_woolf",
+    forward_x=_identity,forward_y=_hanes_woolf_y,
+    inverse_x=lambda u:u,inverse_y=lambda u,v:u/v,
+    jacobian=lambda S,V:(np.ones_like(S),-S/V**2),
+    valid_x=_finite,valid_y=_nonzero))
+
+# ln(k)=ln(A)-Ea/R*(1/T)
+Arrhenius=register_transform(Transform("Arrhenius",
+    forward_x=_reciprocal,forward_y=lambda T,k,out:_log(k,out),
+    inverse_x=lambda u:1/u,inverse_y=lambda u,v:np.exp(v),
+    jacobian=lambda T,k:(-1/T**2,1/k),
+    valid_x=_positive,valid_y=_positive))
+
 def hyperbolic(x,a,b,c):
     return a*x**2+b*x+c
 
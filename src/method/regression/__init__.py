@@ -1,4 +1,28 @@
-from .linregress import SAPARATE_DELETE, LinRegressor
-from .RegressUtils import *
-from .regression import Regressor
-from .polyregress import PolynomialRegressor, PolyvarRegressor
\ No newline at end of file
+# submodules are imported on first attribute access (PEP 562), so importing the package stays cheap
+_EXPORTS={
+    "linregress":["SAPARATE_DELETE","LinRegressor"],
+    "RegressUtils":["Transform","TRANSFORMS","register_transform","get_transform",
+                    "double_log","double_reciprocal","firstorder_kinetics","secondorder_kinetics","hanes_woolf",
+                    "Arrhenius","hyperbolic","expdec","hyperbl","rational1","rational2","rlogistic","cubic",
+                    "holliday","logrithm"],
+    "regression":["FitCancelled","Regressor"],
+    "polyregress":["RIDGE_CRITERION","PolynomialRegressor","PolyvarRegressor"],
+    "robust":["ROBUST_LOSS","TUNING","OUTLIER_CUT","irls","mad_scale","robust_pcov","robust_weights"],
+    "crossval":["CV_BACKEND","kfold_indices","cross_validate","leave_one_out","select_degree","lasso_cv"],
+    "resampling":["bootstrap"], # not named bootstrap, the submodule would shadow the function
+    "consensus":["sample_consensus","consensus_fit"]
+}
+_LOCATIONS={name:module for module,names in _EXPORTS.items() for name in names}
+__all__=list(_LOCATIONS)
+
+def __getattr__(name):
+    module=_LOCATIONS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value=getattr(importlib.import_module(f".{module}",__name__),name)
+    globals()[name]=value # later lookups do not reach __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals())|set(__all__))
@@ -0,0 +1,308 @@
+import numpy as np
+from functools import partial
+from .linregress import SAPARATE_DELETE, LinRegressor
+from .polyregress import PolynomialRegressor, PolyvarRegressor
+from .regression import FitCancelled, Regressor
+from ..instrument import count, phase
+
+def sample_consensus(fit:callable,
+                     residues:callable,
+                     n:int,
+                     num_samples:int,
+                     refit:callable=None,
+                     method=SAPARATE_DELETE.RANSAC,
+                     threshold:float=3.0,
+                     scale:float=None,
+                     max_trials:int=1000,
+                     confidence:float=0.99,
+                     batch_size:int=None,
+                     seed=None,
+                     n_jobs:int=1,
+                     callback:callable=None,
+                     cancel=None):
+    """robust estimation by random sample consensus (RANSAC) or least median of squares (LMedS) for any model
+
+    Hypotheses are drawn in batches: `fit` turns a whole batch of minimal samples into parameters and\
+    `residues` evaluates all of them on all points at once, so only the scores of a batch leave numpy.\
+    Batches are scored in the calling process or on a process pool (`fit` and `residues` must then be\
+    picklable, e.g. functools.partial of module level functions); each batch has its own seed spawned\
+    from `seed`, so output does not depend on `n_jobs`. RANSAC keeps the hypothesis with most points\
+    within threshold*scale, LMedS the one with the lowest median squared residue. Sampling stops once\
+    enough hypotheses were drawn to hit an all-inlier sample with probability `confidence`, given the\
+    inlier fraction of the best hypothesis so far. The points within the band of the best hypothesis are\
+    the consensus set, which is refitted by `refit`.
+
+    Args:
+        fit (callable): fit(samples) returns the parameters (batch*p) of every row of samples\
+            (batch*num_samples indices), rows of degenerate samples could be nan
+        residues (callable): residues(params) returns y-prediction (batch*n) of every row of params
+        n (int): number of points
+        num_samples (int): points in each sample, usually the number of parameters
+        refit (callable, optional): refit(inliers, hypothesis) returns the parameters fitted on the consensus\
+            set, hypothesis (parameters of the best sample) is a starting point for iterative fits.\
+            Defaults to None (parameters of the best hypothesis).
+        method (SAPARATE_DELETE, optional): SAPARATE_DELETE.RANSAC or SAPARATE_DELETE.LMedS.\
+            Defaults to SAPARATE_DELETE.RANSAC.
+        threshold (float, optional): points with |residue|<=threshold*scale are inliers. Defaults to 3.0.
+        scale (float, optional): standard deviation of the noise. Defaults to None (RANSAC: LMedS scale of\
+            the best hypothesis of the first batch; LMedS: LMedS scale of the best hypothesis).
+        max_trials (int, optional): maximum number of hypotheses. Defaults to 1000.
+        confidence (float, optional): probability of drawing at least one all-inlier sample, 1 always draws\
+            max_trials hypotheses. Defaults to 0.99.
+        batch_size (int, optional): hypotheses evaluated together, bounds the memory to batch_size*n residues.\
+            Defaults to None (min(64, 2^21/n)).
+        seed (optional): seed of the random generator. Defaults to None.
+        n_jobs (int, optional): number of processes, 1 runs in the calling process. None uses\
+            min(cpu_count(), 8), which pays off for models with iterative minimal fits. Defaults to 1.
+        callback (callable, optional): called as callback(trials, result) after every batch, result is a dict\
+            of params, num_inliers and resmed of the best hypothesis so far. Defaults to None.
+        cancel (optional): object with an is_set() method (e.g. threading.Event), checked between batches;\
+            FitCancelled is raised once it is set. Defaults to None.
+
+    Returns:
+        result: dict of params, inliers (indices of the consensus set), scale, hypothesis (parameters of the\
+            best hypothesis), resmed (its median squared residue) and trials (number of hypotheses drawn)
+    """
+    if method not in (SAPARATE_DELETE.RANSAC,SAPARATE_DELETE.LMedS):
+        raise ValueError(f"{method} is not a sample consensus method, use RANSAC or LMedS.")
+    if n<num_samples:
+        raise ValueError(f"At least {num_samples} points are required.")
+    if batch_size is None:
+        batch_size=max(1,min(64,2**21//n))
+    sizes=[min(batch_size,max_trials-i) for i in range(0,max_trials,batch_size)]
+    seeds=np.random.SeedSequence(seed).spawn(len(sizes))
+    # LMedS scale of Rousseeuw and Leroy, corrected for small samples
+    correction=1.4826*(1+5/max(n-num_samples,1))
+    model=(fit,residues,n,num_samples)
+    tasks=zip(seeds,sizes)
+    best=None
+    trials=0
+    pool=None
+    try:
+        with phase("consensus"):
+            if method==SAPARATE_DELETE.RANSAC and scale is None:
+                # the band of RANSAC is fixed by the first batch, scored in the calling process
+                _consensus_init(model)
+                first=next(tasks)
+                scale=correction*np.sqrt(_consensus_batch((*first,None))["resmed"])
+                best=_consensus_batch((*first,threshold*scale))
+                trials=first[1]
+                count("consensus.trials",first[1])
+                if callback is not None:
+                    callback(trials,best)
+                if trials>=_needed_trials(best["num_inliers"]/n,num_samples,confidence):
+                    tasks=iter(())
+            band=None if scale is None else threshold*scale
+            tasks=((s,size,band) for s,size in tasks)
+            if n_jobs==1:
+                _consensus_init(model)
+                results=map(_consensus_batch,tasks)
+            else:
+                from multiprocessing import Pool,cpu_count
+                pool=Pool(processes=n_jobs or min(cpu_count(),8),initializer=_consensus_init,initargs=(model,))
+                results=pool.imap(_consensus_batch,tasks)
+            for result in results:
+                if cancel is not None and cancel.is_set():
+                    raise FitCancelled("Fitting is cancelled.")
+                trials+=result["size"]
+                count("consensus.trials",result["size"])
+                if best is None or _better(result,best,method):
+                    best=result
+                    if band is None and np.isfinite(best["resmed"]):
+                        # inlier fraction of the LMedS hypothesis, for the number of trials still needed
+                        r=residues(best["params"][None,:])[0]
+                        best["num_inliers"]=int(np.sum(np.abs(r)<=threshold*correction*np.sqrt(best["resmed"])))
+                if callback is not None:
+                    callback(trials,best)
+                if trials>=_needed_trials(best["num_inliers"]/n,num_samples,confidence):
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if not np.isfinite(best["resmed"]):
+        raise RuntimeError("All sampled models are degenerate.")
+    if method==SAPARATE_DELETE.LMedS and scale is None:
+        scale=correction*np.sqrt(best["resmed"])
+    hypothesis=best["params"]
+    inliers=np.where(np.abs(residues(hypothesis[None,:])[0])<=threshold*scale)[0]
+    if refit is None or len(inliers)<num_samples:
+        params=hypothesis
+    else:
+        params=np.asarray(refit(inliers,hypothesis))
+    return {
+        "params":params,
+        "inliers":inliers,
+        "scale":scale,
+        "hypothesis":hypothesis,
+        "resmed":best["resmed"],
+        "trials":trials
+    }
+
+def consensus_fit(regressor,
+                  method=SAPARATE_DELETE.RANSAC,
+                  threshold:float=3.0,
+                  num_samples:int=None,
+                  max_trials:int=1000,
+                  confidence:float=0.99,
+                  seed=None,
+                  n_jobs:int=1,
+                  callback:callable=None,
+                  cancel=None):
+    """fit a PolynomialRegressor, PolyvarRegressor or nonlinear Regressor without outliers (RANSAC or LMedS)
+
+    Minimal samples of polynomial and multivariate models are solved together by one stacked\
+    np.linalg.solve and scored with one matrix product per batch. Minimal samples of a Regressor are fitted\
+    by Levenberg-Marquardt from its current parameters, use n_jobs to spread them over processes (the model\
+    function should be picklable). The consensus set is refitted with the fit() of the regressor, which\
+    is left fitted on the inliers. LinRegressor has its own RANSAC and LMedS (del_saparated_point=True).
+
+    Args:
+        regressor: PolynomialRegressor, PolyvarRegressor or Regressor (parameters are the starting point)
+        method (SAPARATE_DELETE, optional): SAPARATE_DELETE.RANSAC or SAPARATE_DELETE.LMedS.\
+            Defaults to SAPARATE_DELETE.RANSAC.
+        threshold (float, optional): points with |residue|<=threshold*scale are inliers, scale is the LMedS\
+            estimate of the noise. Defaults to 3.0.
+        num_samples (int, optional): points in each sample. Defaults to None (number of parameters).
+        max_trials (int, optional): maximum number of hypotheses. Defaults to 1000.
+        confidence (float, optional): probability of drawing at least one all-inlier sample. Defaults to 0.99.
+        seed (optional): seed of the random generator. Defaults to None.
+        n_jobs (int, optional): number of processes, None uses min(cpu_count(), 8). Defaults to 1.
+        callback (callable, optional): see sample_consensus. Defaults to None.
+        cancel (optional): see sample_consensus. Defaults to None.
+
+    Returns:
+        result: dict of sample_consensus, params are the refitted `weights` or `parameters` of the regressor.\
+            The regressor also gets the attribute inlier_id.
+    """
+    if isinstance(regressor,LinRegressor):
+        raise TypeError("Use LinRegressor(del_saparated_point=True,optim_method=...) for straight lines.")
+    if isinstance(regressor,PolynomialRegressor):
+        X=np.vander(np.asarray(regressor.x,dtype=float),N=regressor.degree+1,increasing=True)
+        y=np.asarray(regressor.y,dtype=float)
+        refit=partial(_refit_linear,regressor,degree=regressor.degree)
+    elif isinstance(regressor,PolyvarRegressor):
+        X=np.concatenate((np.ones((regressor.x.shape[0],1)),regressor.x),axis=1)
+        y=np.asarray(regressor.y,dtype=float).reshape(-1)
+        refit=partial(_refit_linear,regressor)
+    elif isinstance(regressor,Regressor):
+        x,y=np.asarray(regressor.x,dtype=float),np.asarray(regressor.y,dtype=float)
+        initial=np.array(regressor.parameters,dtype=float)
+        fit=partial(_nonlinear_fit,regressor.func,x,y,initial,regressor.max_iter,regressor.tol)
+        residues=partial(_nonlinear_residues,regressor.func,x,y)
+        refit=partial(_refit_nonlinear,regressor)
+        p=len(initial)
+    else:
+        raise TypeError(f"Sample consensus is not available for {type(regressor).__name__}.")
+    if not isinstance(regressor,Regressor):
+        fit,residues=partial(_linear_fit,X,y),partial(_linear_residues,X,y)
+        p=X.shape[1]
+    result=sample_consensus(fit,residues,len(y),num_samples or p,refit,method,threshold,None,
+                            max_trials,confidence,None,seed,n_jobs,callback,cancel)
+    regressor.inlier_id=result["inliers"]
+    return result
+
+_CONSENSUS_MODEL=[]
+
+def _consensus_init(model):
+    # fit, residues and the data are sent once to each worker, tasks only carry (seed, size, band)
+    _CONSENSUS_MODEL[:]=model
+
+def _consensus_batch(task):
+    seed,size,band=task
+    fit,residues,n,num_samples=_CONSENSUS_MODEL
+    samples=_draw_samples(np.random.default_rng(seed),n,size,num_samples)
+    params=np.asarray(fit(samples),dtype=float)
+    r=np.abs(residues(params))
+    degenerate=~np.all(np.isfinite(params),axis=1)
+    if band is None:
+        # LMedS: lowest median squared residue
+        resmed=np.median(r**2,axis=1)
+        resmed[degenerate|np.isnan(resmed)]=np.inf
+        best=np.argmin(resmed)
+        num_inliers=0
+    else:
+        # RANSAC: most points within the band, only the median of the winner is computed
+        inliers=np.sum(r<=band,axis=1)
+        inliers[degenerate]=-1
+        best=np.argmax(inliers)
+        num_inliers=max(int(inliers[best]),0)
+        resmed=np.full(size,np.inf)
+        if not degenerate[best]:
+            resmed[best]=np.median(r[best]**2)
+    return {
+        "params":params[best],
+        "num_inliers":num_inliers,
+        "resmed":resmed[best],
+        "size":size
+    }
+
+def _better(result,best,method):
+    if method==SAPARATE_DELETE.RANSAC:
+        return result["num_inliers"]>best["num_inliers"]
+    return result["resmed"]<best["resmed"]
+
+def _needed_trials(inlier_fraction,num_samples,confidence):
+    # number of samples drawing at least one all-inlier sample with probability `confidence`
+    good=inlier_fraction**num_samples
+    if confidence>=1 or good<=0:
+        return np.inf
+    if good>=1:
+        return 0
+    return np.log(1-confidence)/np.log(1-good)
+
+def _draw_samples(rng,n,size,num_samples):
+    # `size` samples of `num_samples` distinct indices
+    if n<=4*num_samples:
+        return np.argsort(rng.random((size,n)),axis=1)[:,:num_samples]
+    samples=rng.integers(0,n,size=(size,num_samples))
+    while True:
+        ordered=np.sort(samples,axis=1)
+        repeated=np.any(ordered[:,1:]==ordered[:,:-1],axis=1)
+        if not repeated.any():
+            return samples
+        samples[repeated]=rng.integers(0,n,size=(np.sum(repeated),num_samples))
+
+def _linear_fit(X,y,samples):
+    # normal equations of every sample, solved by one stacked np.linalg.solve
+    A=X[samples]
+    G=np.einsum("bki,bkj->bij",A,A)
+    b=np.einsum("bki,bk->bi",A,y[samples])
+    params=np.full((len(samples),X.shape[1]),np.nan)
+    solvable=np.linalg.matrix_rank(G)==X.shape[1]
+    count("linear_solves")
+    params[solvable]=np.linalg.solve(G[solvable],b[solvable][:,:,None])[:,:,0]
+    return params
+
+def _linear_residues(X,y,params):
+    return y-params.dot(X.T)
+
+def _nonlinear_fit(func,x,y,initial,max_iter,tol,samples):
+    # minimal samples leave no degrees of freedom for pcov, its warnings are silenced
+    params=np.full((len(samples),len(initial)),np.nan)
+    with np.errstate(all="ignore"):
+        for i,sample in enumerate(samples):
+            try:
+                regressor=Regressor(func,x[sample],y[sample],initial_para=initial.copy(),max_iter=max_iter,tol=tol)
+                params[i]=regressor.fit(cache=False)[0]
+            except (RuntimeError,ValueError):
+                pass
+    return params
+
+def _nonlinear_residues(func,x,y,params):
+    with np.errstate(all="ignore"):
+        return np.array([y-func(x,*para) for para in params])
+
+def _refit_linear(regressor,inliers,hypothesis,**kwargs):
+    # the same model on the consensus set, solved by its own fit()
+    refitted=type(regressor)(regressor.x[inliers],regressor.y[inliers],lamb=regressor.lamb,**kwargs)
+    outputs=refitted.fit(cache=False) if isinstance(regressor,PolynomialRegressor) else refitted.fit()
+    regressor.weights,regressor.pcov,regressor.Rsq,regressor.Rsq_adj=outputs
+    return regressor.weights
+
+def _refit_nonlinear(regressor,inliers,hypothesis):
+    # Levenberg-Marquardt on the consensus set starts from the best hypothesis
+    refitted=Regressor(regressor.func,regressor.x[inliers],regressor.y[inliers],initial_para=hypothesis.copy(),
+                       max_iter=regressor.max_iter,tol=regressor.tol)
+    regressor.parameters,regressor.pcov=refitted.fit(cache=False)
+    return regressor.parameters
@@ -0,0 +1,254 @@
+import numpy as np
+from enum import Enum, auto
+from .linregress import LinRegressor
+from .polyregress import PolynomialRegressor, PolyvarRegressor, _ridge_path
+from .lasso import lasso_path, _check_Xy
+
+class CV_BACKEND(Enum):
+    SERIAL=auto()
+    THREAD=auto() # numpy releases the GIL in most linear algebra routines
+    PROCESS=auto() # model class and arguments must be picklable
+
+def kfold_indices(n:int,k:int=5,shuffle:bool=True,seed=None):
+    """split range(n) into k folds, only index arrays are generated (data are never copied)
+
+    Args:
+        n (int): number of samples
+        k (int, optional): number of folds. Defaults to 5.
+        shuffle (bool, optional): shuffle samples before splitting. Defaults to True.
+        seed (optional): seed of the random generator. Defaults to None.
+
+    Yields:
+        train, test: index arrays of training and testing samples of each fold
+    """
+    if k<2 or k>n:
+        raise ValueError("Number of folds should be in [2, number of samples].")
+    order=np.random.default_rng(seed).permutation(n) if shuffle else np.arange(n)
+    bounds=np.linspace(0,n,k+1).astype(int)
+    for i in range(k):
+        mask=np.ones(n,dtype=bool)
+        mask[order[bounds[i]:bounds[i+1]]]=False
+        yield np.where(mask)[0], np.sort(order[bounds[i]:bounds[i+1]])
+
+def cross_validate(model:callable,
+                   x:np.ndarray,
+                   y:np.ndarray,
+                   k:int=5,
+                   shuffle:bool=True,
+                   seed=None,
+                   backend:CV_BACKEND=CV_BACKEND.SERIAL,
+                   n_jobs:int=None,
+                   fit_kwargs:dict=None,
+                   **model_kwargs):
+    """k-fold cross-validation of any regressor with a `fit()` method and a `__call__` prediction
+
+    Args:
+        model (callable): regressor class (or factory) called as model(x_train, y_train, **model_kwargs),\
+            e.g. PolynomialRegressor or functools.partial(Regressor, hyperbl).
+        x (np.ndarray): independent variable, dim 0: data
+        y (np.ndarray): dependent variable, dim 0: data
+        k (int, optional): number of folds. Defaults to 5.
+        shuffle (bool, optional): shuffle samples before splitting. Defaults to True.
+        seed (optional): seed of the random generator used for splitting. Defaults to None.
+        backend (CV_BACKEND, optional): run folds serially, on a thread pool or on a process pool.\
+            Defaults to CV_BACKEND.SERIAL.
+        n_jobs (int, optional): number of workers. Defaults to None (min(cpu_count(), 8, k)).
+        fit_kwargs (dict, optional): keyword arguments passed to `fit()`. Defaults to None.
+
+    Returns:
+        result: dict with keys "mse" (mean squared prediction error of each fold), "mean" and "std"
+    """
+    if len(x)!=len(y):
+        raise ValueError("x and y are not in the same length.")
+    tasks=[(model,x,y,train,test,model_kwargs,fit_kwargs or {})
+           for train,test in kfold_indices(len(x),k,shuffle,seed)]
+    if backend!=CV_BACKEND.SERIAL:
+        from multiprocessing import Pool,cpu_count
+        from multiprocessing.pool import ThreadPool
+        if n_jobs is None:
+            n_jobs=min(cpu_count(),8,k)
+    match backend:
+        case CV_BACKEND.SERIAL:
+            mse=list(map(_fit_fold,tasks))
+        case CV_BACKEND.THREAD:
+            with ThreadPool(processes=n_jobs) as pool:
+                mse=pool.map(_fit_fold,tasks)
+        case CV_BACKEND.PROCESS:
+            with Pool(processes=n_jobs) as pool:
+                mse=pool.map(_fit_fold,tasks)
+        case _:
+            raise ValueError(f"Unknown backend {backend}.")
+    mse=np.array(mse,dtype=float)
+    return {
+        "mse":mse,
+        "mean":mse.mean(),
+        "std":mse.std()
+    }
+
+def leave_one_out(regressor):
+    """closed-form leave-one-out residues of a linear or ridge model, no refitting is needed
+
+    Supported regressors: LinRegressor (plain or weighted, without deleting separated points),\
+    PolynomialRegressor and PolyvarRegressor (with their L2 coefficient `lamb`).
+
+    Args:
+        regressor: regressor object, it does not need to be fitted.
+
+    Returns:
+        result: dict with keys "residues" (y_i minus prediction of the model trained without point i),\
+            "mse" (mean squared LOO error) and "leverage" (diagonal of the hat matrix)
+    """
+    if isinstance(regressor,LinRegressor):
+        if regressor.del_saparated_point:
+            raise ValueError("Closed-form leave-one-out is not available when separated points are deleted.")
+        x,y=np.asarray(regressor.x,dtype=float),np.asarray(regressor.y,dtype=float)
+        if regressor.weights is not None:
+            weights=np.asarray(regressor.weights,dtype=float)
+        elif regressor.multi_y:
+            weights=1/(regressor.std_y+1e-2) # same default as LinRegressor.fit
+        else:
+            weights=np.ones(len(x))
+        # h_ii=w_i*(1/sum(w)+(x_i-x_w)^2/S_xx,w), x_w is the weighted mean of x
+        sum_w=np.sum(weights)
+        mean_x=np.sum(weights*x)/sum_w
+        Sxx=np.sum(weights*(x-mean_x)**2)
+        mean_y=np.sum(weights*y)/sum_w
+        slope=np.sum(weights*(x-mean_x)*(y-mean_y))/Sxx
+        residues=y-mean_y-slope*(x-mean_x)
+        leverage=weights*(1/sum_w+(x-mean_x)**2/Sxx)
+    elif isinstance(regressor,PolynomialRegressor):
+        X=np.vander(np.asarray(regressor.x,dtype=float),N=regressor.degree+1,increasing=True)
+        residues,leverage=_ridge_loo(X,np.asarray(regressor.y,dtype=float),regressor.lamb,False)
+    elif isinstance(regressor,PolyvarRegressor):
+        residues,leverage=_ridge_loo(np.asarray(regressor.x,dtype=float),
+                                     np.asarray(regressor.y,dtype=float).reshape(-1),regressor.lamb,True)
+    else:
+        raise TypeError(f"Closed-form leave-one-out is not available for {type(regressor).__name__}.")
+    loo_residues=residues/(1-leverage)
+    return {
+        "residues":loo_residues,
+        "mse":np.mean(loo_residues**2),
+        "leverage":leverage
+    }
+
+def select_degree(x:np.ndarray,
+                  y:np.ndarray,
+                  degrees=range(1,11),
+                  k:int=None,
+                  lamb:float=0.0,
+                  shuffle:bool=True,
+                  seed=None):
+    """choose the degree of a PolynomialRegressor by cross-validation.
+
+    The Vandermonde matrix of the highest degree is built once, lower degrees use its leading columns.\
+    In k-fold mode the normal equations of each fold are also built once and sliced for every degree.
+
+    Args:
+        x (np.ndarray): 1D array, independent variable
+        y (np.ndarray): 1D array, dependent variable
+        degrees (optional): candidate degrees. Defaults to range(1,11).
+        k (int, optional): number of folds. Defaults to None (closed-form leave-one-out).
+        lamb (float, optional): L2 regularization term coefficient. Defaults to 0.0.
+        shuffle (bool, optional): shuffle samples before splitting. Defaults to True.
+        seed (optional): seed of the random generator used for splitting. Defaults to None.
+
+    Returns:
+        result: dict with keys "degrees", "mse" (CV error of each degree, inf for degrees that interpolate\
+            the training samples when lamb is 0) and "best_degree"
+    """
+    if len(x)!=len(y):
+        raise ValueError("x and y are not in the same length.")
+    degrees=np.asarray(list(degrees),dtype=int)
+    x,y=np.asarray(x,dtype=float),np.asarray(y,dtype=float)
+    V=np.vander(x,N=degrees.max()+1,increasing=True)
+    mse=np.zeros(len(degrees),dtype=float)
+    # without regularization a degree with d+1 >= training samples interpolates them, its CV error is inf
+    if k is None:
+        for i,d in enumerate(degrees):
+            if lamb==0 and d+1>=len(x)-1:
+                mse[i]=np.inf
+                continue
+            residues,leverage=_ridge_loo(V[:,:d+1],y,lamb,False)
+            mse[i]=np.mean((residues/(1-leverage))**2)
+    else:
+        for train,test in kfold_indices(len(x),k,shuffle,seed):
+            G=V[train].T.dot(V[train])
+            b=V[train].T.dot(y[train])
+            for i,d in enumerate(degrees):
+                if lamb==0 and d+1>=len(train):
+                    mse[i]=np.inf
+                    continue
+                w=np.linalg.solve(G[:d+1,:d+1]+lamb*np.eye(d+1),b[:d+1])
+                mse[i]+=np.sum((V[test,:d+1].dot(w)-y[test])**2)
+        mse/=len(x)
+    mse[~np.isfinite(mse)]=np.inf
+    if np.all(np.isinf(mse)):
+        raise ValueError(f"No candidate degree can be cross-validated with {len(x)} samples.")
+    return {
+        "degrees":degrees,
+        "mse":mse,
+        "best_degree":int(degrees[np.argmin(mse)])
+    }
+
+def lasso_cv(X:np.ndarray,
+             y:np.ndarray,
+             Cs:np.ndarray=None,
+             k:int=5,
+             num_C:int=100,
+             C_ratio:float=1e-3,
+             shuffle:bool=True,
+             seed=None,
+             tol=1e-7,
+             max_iter=1000):
+    """choose the L1 regularization coefficient of LASSO by k-fold cross-validation.
+
+    One warm-started regularization path (lasso_path) is computed for every fold on a shared grid of C.
+
+    Args:
+        X (np.ndarray): 2D array or scipy.sparse matrix
+        y (np.ndarray): 1D array
+        Cs (np.ndarray, optional): L1 regularization term coefficients. Defaults to None (generated from\
+            the full dataset as in lasso_path).
+        k (int, optional): number of folds. Defaults to 5.
+        num_C (int, optional): number of generated coefficients when `Cs` is None. Defaults to 100.
+        C_ratio (float, optional): C_min/C_max when `Cs` is None. Defaults to 1e-3.
+        shuffle (bool, optional): shuffle samples before splitting. Defaults to True.
+        seed (optional): seed of the random generator used for splitting. Defaults to None.
+        tol (optional): convergence tolerance. Defaults to 1e-7.
+        max_iter (int, optional): maximum coordinate descent sweeps for each C. Defaults to 1000.
+
+    Returns:
+        result: dict with keys "Cs", "mse" (CV error of each C), "best_C", "weights" and "intercept"\
+            (refitted on the whole dataset with best_C)
+    """
+    X,y=_check_Xy(X,y)
+    if Cs is None:
+        Cs=lasso_path(X,y,num_C=num_C,C_ratio=C_ratio,tol=tol,max_iter=max_iter)["Cs"]
+    Cs=np.sort(np.atleast_1d(np.asarray(Cs,dtype=float)))[::-1]
+    mse=np.zeros(len(Cs),dtype=float)
+    for train,test in kfold_indices(X.shape[0],k,shuffle,seed):
+        path=lasso_path(X[train],y[train],Cs=Cs,tol=tol,max_iter=max_iter)
+        pred=np.asarray(X[test].dot(path["weights"].T))+path["intercepts"]
+        mse+=np.sum((pred-y[test][:,None])**2,axis=0)
+    mse/=X.shape[0]
+    best=int(np.argmin(np.where(np.isfinite(mse),mse,np.inf)))
+    final=lasso_path(X,y,Cs=Cs[:best+1],tol=tol,max_iter=max_iter)
+    return {
+        "Cs":Cs,
+        "mse":mse,
+        "best_C":Cs[best],
+        "weights":final["weights"][-1],
+        "intercept":final["intercepts"][-1]
+    }
+
+def _fit_fold(args):
+    model,x,y,train,test,model_kwargs,fit_kwargs=args
+    regressor=model(x[train],y[train],**model_kwargs)
+    regressor.fit(**fit_kwargs)
+    pred=np.asarray(regressor(x[test]),dtype=float).reshape(-1)
+    return np.mean((pred-np.asarray(y[test],dtype=float).reshape(-1))**2)
+
+def _ridge_loo(X,y,lamb,intercept):
+    path=_ridge_path(X,y,[lamb],None,dof=max(X.shape[0]-X.shape[1],1),num_para=X.shape[1],
+                     criterion=None,intercept=intercept)
+    return path["residues"][0],path["leverage"][0]
@@ -1,39 +1,293 @@
+import sys
 import numpy as np
+from enum import Enum, auto
+from ..instrument import count, phase
+
+class LASSO_SOLVER(Enum):
+    ISTA=auto() # proximal gradient descent
+    FISTA=auto() # accelerated proximal gradient descent with backtracking
+    CD=auto() # cyclic coordinate descent with active set
 
 def LASSO(X:np.ndarray,y:np.ndarray,
           C:float=1.0,
-          learning_rate:float=0.001,
+          learning_rate:float=None,
           tol=1e-7,
-          max_iter=1000):
-    """Lasso regression function
+          max_iter=1000,
+          solver:LASSO_SOLVER=LASSO_SOLVER.CD,
+          w_init:np.ndarray=None,
+          backtracking:bool=True,
+          return_history:bool=False):
+    """Lasso regression function, minimizing 1/n*||y-Xw-b||^2+C*||w||_1
 
     Args:
-        X (np.ndarray): 2D array
-        y (np.ndarray): 1D array
+        X (np.ndarray): 2D array, could also be a scipy.sparse matrix (CSR/CSC), which is never densified.
+        y (np.ndarray): 1D array (or 2D array with one column)
         C (float, optional): L1 regularization term coefficient. Defaults to 1.0.
-        learning_rate (float, optional): Learning rate in gradient descent. Defaults to 0.001.
+        learning_rate (float, optional): Learning rate in gradient descent (used by LASSO_SOLVER.ISTA and \
+            LASSO_SOLVER.FISTA). Defaults to None (1/L, L=2/n*||X||_2^2 estimated by power iteration).
         tol (_type_, optional): When \Delta w < tol, parameter updating will be stopped. Defaults to 1e-7.
         max_iter (int, optional): When parameter updating occurs more than max_iter times,\
-            the function will be stopped. Defaults to 1000.
+            the function will be stopped. For LASSO_SOLVER.CD one iteration is one sweep over the\
+            coefficients. Defaults to 1000.
+        solver (LASSO_SOLVER, optional): optimization method. Defaults to LASSO_SOLVER.CD.
+        w_init (np.ndarray, optional): initial weights (warm start) for LASSO_SOLVER.CD and\
+            LASSO_SOLVER.FISTA. Defaults to None.
+        backtracking (bool, optional): shrink the learning rate of LASSO_SOLVER.FISTA until the\
+            sufficient decrease condition holds. Defaults to True.
+        return_history (bool, optional): also return the convergence history. Defaults to False.
 
     Returns:
-        w, b: sparse regression weights and bias
+        w, b: sparse regression weights (n_features*1) and bias
+        history (only if `return_history`): dict with keys "objective" and "delta_w" (norm of weight\
+            updates) for every iteration, and "n_iter"
     """
-    
-    w = np.zeros((X.shape[1])).reshape(X.shape[1],1)
-    b = 0.0
+    X,y=_check_Xy(X,y)
+    with phase("LASSO.setup"):
+        problem=_LassoProblem(X,y)
+    with phase(f"LASSO.{getattr(solver,'name',solver)}"):
+        match solver:
+            case LASSO_SOLVER.ISTA:
+                w,history=_lasso_ista(problem,C,learning_rate,tol,max_iter)
+            case LASSO_SOLVER.FISTA:
+                w,history=_lasso_fista(problem,C,learning_rate,w_init,tol,max_iter,backtracking)
+            case LASSO_SOLVER.CD:
+                w,_,n_iter=_lasso_cd(problem,C,w_init,tol,max_iter)
+                history={"objective":np.array([problem.objective(w,C)]),"delta_w":np.array([]),"n_iter":n_iter}
+            case _:
+                raise ValueError(f"Unknown LASSO solver {solver}.")
+    count("LASSO.iterations",history["n_iter"])
+    if return_history:
+        return w.reshape(X.shape[1],1), problem.intercept(w), history
+    return w.reshape(X.shape[1],1), problem.intercept(w)
+
+def lasso_path(X:np.ndarray,y:np.ndarray,
+               Cs:np.ndarray=None,
+               num_C:int=100,
+               C_ratio:float=1e-3,
+               tol=1e-7,
+               max_iter=1000):
+    """Lasso regularization path computed by coordinate descent with warm starts and strong rules.
+
+    Args:
+        X (np.ndarray): 2D array or scipy.sparse matrix
+        y (np.ndarray): 1D array (or 2D array with one column)
+        Cs (np.ndarray, optional): L1 regularization term coefficients. They are sorted decreasingly\
+            before solving. Defaults to None (`num_C` values spaced logarithmically from C_max, the smallest\
+            C giving w=0, down to C_ratio*C_max).
+        num_C (int, optional): number of generated coefficients when `Cs` is None. Defaults to 100.
+        C_ratio (float, optional): C_min/C_max when `Cs` is None. Defaults to 1e-3.
+        tol (_type_, optional): convergence tolerance for each C. Defaults to 1e-7.
+        max_iter (int, optional): maximum coordinate descent sweeps for each C. Defaults to 1000.
+
+    Returns:
+        path: dict with keys "Cs" (n_C), "weights" (n_C*n_features), "intercepts" (n_C) and "n_iter" (n_C)
+    """
+    X,y=_check_Xy(X,y)
+    problem=_LassoProblem(X,y)
+    C_max=2/problem.n*np.max(np.abs(problem.corr))
+    if Cs is None:
+        Cs=C_max*np.logspace(0,np.log10(C_ratio),num_C)
+    Cs=np.sort(np.atleast_1d(np.asarray(Cs,dtype=float)))[::-1]
+    weights=np.zeros((len(Cs),X.shape[1]),dtype=float)
+    intercepts=np.zeros(len(Cs),dtype=float)
+    n_iter=np.zeros(len(Cs),dtype=int)
+    w=np.zeros(X.shape[1],dtype=float)
+    C_prev=C_max
+    for k,C in enumerate(Cs):
+        # sequential strong rule: feature j is very likely zero at C if 2/n*|x_j^T r| < 2C-C_prev
+        grad=2/problem.n*np.abs(problem.correlation(w))
+        strong=(grad>=2*C-C_prev)|(w!=0)
+        while True:
+            w,b,it=_lasso_cd(problem,C,w,tol,max_iter,candidates=np.where(strong)[0])
+            n_iter[k]+=it
+            violated=(~strong)&(2/problem.n*np.abs(problem.correlation(w))>C*(1+1e-10))
+            if not np.any(violated):
+                break
+            strong|=violated
+        weights[k],intercepts[k]=w,b
+        C_prev=C
+    return {
+        "Cs":Cs,
+        "weights":weights,
+        "intercepts":intercepts,
+        "n_iter":n_iter
+    }
+
+def _issparse(X):
+    # scipy is never imported here, a sparse matrix could only exist if the caller imported scipy.sparse
+    sparse=sys.modules.get("scipy.sparse")
+    return sparse is not None and sparse.issparse(X)
+
+def _check_Xy(X,y):
+    if _issparse(X):
+        # CSC keeps column access O(nnz_j) in coordinate descent
+        X=X.tocsc() if X.format!="csc" else X
+        if X.dtype!=float:
+            X=X.astype(float)
+    else:
+        X=np.asarray(X,dtype=float)
+    y=np.asarray(y,dtype=float)
+    if y.ndim==2 and y.shape[1]==1:
+        y=y.reshape(-1)
+    if X.ndim!=2 or y.ndim!=1:
+        raise ValueError("X should be a 2D array and y should be a 1D array.")
+    if X.shape[0]!=len(y):
+        raise ValueError("X and y are not in the same length.")
+    return X,y
+
+class _LassoProblem:
+    # shared, C-independent precomputation of a lasso problem on implicitly centered data
+    # (the intercept is not penalized, so x_j-mean_j and y-mean_y are used without copying X)
+    def __init__(self,X,y,gram_max_features:int=500):
+        self.X,self.y=X,y
+        self.n,self.p=X.shape
+        self.sparse=_issparse(X)
+        self.mean_y=y.mean()
+        if self.sparse:
+            self.mean_x=np.asarray(X.mean(axis=0)).reshape(-1)
+            sq_norm=np.asarray(X.multiply(X).sum(axis=0)).reshape(-1)
+        else:
+            self.mean_x=X.mean(axis=0)
+            sq_norm=np.einsum("ij,ij->j",X,X)
+        self.corr=X.T.dot(y)-self.n*self.mean_x*self.mean_y # Xc^T yc
+        self.norm2=sq_norm-self.n*self.mean_x**2 # ||Xc_j||^2
+        if self.p<=min(self.n,gram_max_features):
+            gram=X.T.dot(X)
+            gram=gram.toarray() if self.sparse else gram
+            self.gram=gram-self.n*np.outer(self.mean_x,self.mean_x)
+        else:
+            self.gram=None
+
+    def residue(self,w):
+        return self.y-self.mean_y-self.X.dot(w)+self.mean_x.dot(w)
+
+    def correlation(self,w):
+        # Xc^T (yc-Xc w)
+        if self.gram is not None:
+            return self.corr-self.gram.dot(w)
+        return self.X.T.dot(self.residue(w))
+
+    def intercept(self,w):
+        return self.mean_y-self.mean_x.dot(w)
+
+    def objective(self,w,C):
+        return np.sum(self.residue(w)**2)/self.n+C*np.sum(np.abs(w))
+
+    def lipschitz(self,num_iter:int=100,rtol:float=1e-6):
+        # L=2/n*sigma_max(Xc)^2, by power iteration on Xc^T Xc (works for sparse X)
+        v=np.random.default_rng(0).standard_normal(self.p)
+        v/=np.linalg.norm(v)
+        sigma2=0.0
+        for _ in range(num_iter):
+            u=self.X.dot(v)-self.mean_x.dot(v)
+            v=self.X.T.dot(u)-self.mean_x*np.sum(u)
+            sigma2_new=np.linalg.norm(v)
+            if sigma2_new==0:
+                break
+            v/=sigma2_new
+            if abs(sigma2_new-sigma2)<rtol*sigma2_new:
+                sigma2=sigma2_new
+                break
+            sigma2=sigma2_new
+        return 2/self.n*sigma2
+
+def _lasso_cd(problem:_LassoProblem,C,w_init,tol,max_iter,candidates=None):
+    # minimizes 1/n*||yc-Xc w||^2+C*||w||_1 over features in `candidates`
+    # closed-form coordinate update: w_j=S(rho_j, n*C/2)/||Xc_j||^2
+    X,mean_x,norm2,gram=problem.X,problem.mean_x,problem.norm2,problem.gram
+    w=np.zeros(problem.p,dtype=float) if w_init is None else np.asarray(w_init,dtype=float).reshape(-1).copy()
+    if candidates is None:
+        candidates=np.arange(problem.p)
+    candidates=candidates[norm2[candidates]>0]
+    thr=problem.n*C/2
+    if gram is not None:
+        grad=problem.correlation(w)
+    else:
+        r=problem.residue(w)
+        if problem.sparse:
+            indptr,indices,data=X.indptr,X.indices,X.data
+    active=candidates
+    n_iter=0
+    full_sweep=True
+    while n_iter<max_iter:
+        n_iter+=1
+        max_delta=0.0
+        for j in (candidates if full_sweep else active):
+            if gram is not None:
+                rho=grad[j]+norm2[j]*w[j]
+            elif problem.sparse:
+                idx,val=indices[indptr[j]:indptr[j+1]],data[indptr[j]:indptr[j+1]]
+                rho=val.dot(r[idx])+norm2[j]*w[j]
+            else:
+                rho=X[:,j].dot(r)+norm2[j]*w[j]
+            w_new=np.sign(rho)*max(abs(rho)-thr,0)/norm2[j]
+            delta=w_new-w[j]
+            if delta!=0:
+                if gram is not None:
+                    grad-=delta*gram[:,j]
+                elif problem.sparse:
+                    r[idx]-=delta*val
+                    r+=delta*mean_x[j]
+                else:
+                    r-=delta*(X[:,j]-mean_x[j])
+                w[j]=w_new
+                max_delta=max(max_delta,abs(delta))
+        if max_delta<tol:
+            if full_sweep:
+                break
+            # active set converged, check all candidates once more
+            full_sweep=True
+        else:
+            full_sweep=False
+            active=candidates[w[candidates]!=0]
+    return w,problem.intercept(w),n_iter
+
+def _soft_threshold(w,threshold):
+    return np.sign(w)*np.maximum(np.abs(w)-threshold,0)
+
+def _lasso_ista(problem:_LassoProblem,C,learning_rate,tol,max_iter):
+    # the intercept is eliminated by centering, so only w is updated
+    if learning_rate is None:
+        learning_rate=1/problem.lipschitz()
+    w=np.zeros(problem.p,dtype=float)
+    threshold=C*learning_rate
+    objective,delta_w=[],[]
+    for i in range(max_iter):
+        grad_w=-2*problem.correlation(w)/problem.n
+        w_new=_soft_threshold(w-learning_rate*grad_w,threshold)
+        delta_w.append(np.linalg.norm(w_new-w))
+        w=w_new
+        objective.append(problem.objective(w,C))
+        if delta_w[-1]<tol:
+            break
+    return w,{"objective":np.array(objective),"delta_w":np.array(delta_w),"n_iter":len(delta_w)}
+
+def _lasso_fista(problem:_LassoProblem,C,learning_rate,w_init,tol,max_iter,backtracking,eta:float=0.5):
+    # Beck & Teboulle (2009), FISTA with backtracking on f(w)=1/n*||yc-Xc w||^2
+    step=1/problem.lipschitz() if learning_rate is None else learning_rate
+    w=np.zeros(problem.p,dtype=float) if w_init is None else np.asarray(w_init,dtype=float).reshape(-1).copy()
+    z,t=w.copy(),1.0
+    objective,delta_w=[],[]
     for i in range(max_iter):
-        grad_w = 2 * np.dot(X.T,np.dot(X,w)-y) / X.shape[0]
-        grad_b = 2 * np.sum(np.dot(X,w)+b-y) / X.shape[0]
-        
-        w_temp=w-learning_rate*grad_w
-
-        threshold = C * learning_rate
-        w_new = np.sign(w_temp) * np.maximum(np.abs(w_temp) - threshold, 0)
-        b_new = b - learning_rate * grad_b
-        
-        if np.linalg.norm(w_new - w) < tol and abs(b_new - b) < tol:
+        f_z=np.sum(problem.residue(z)**2)/problem.n
+        grad_z=-2*problem.correlation(z)/problem.n
+        while True:
+            w_new=_soft_threshold(z-step*grad_z,C*step)
+            if not backtracking:
+                break
+            diff=w_new-z
+            f_new=np.sum(problem.residue(w_new)**2)/problem.n
+            if f_new<=f_z+grad_z.dot(diff)+diff.dot(diff)/(2*step)*(1+1e-12):
+                break
+            step*=eta
+        objective.append(problem.objective(w_new,C))
+        if len(objective)>1 and objective[-1]>objective[-2]:
+            # adaptive restart (O'Donoghue & Candes, 2015): drop the momentum when the objective rises
+            t=1.0
+        t_new=0.5*(1+np.sqrt(1+4*t**2))
+        z=w_new+(t-1)/t_new*(w_new-w)
+        delta_w.append(np.linalg.norm(w_new-w))
+        w,t=w_new,t_new
+        if delta_w[-1]<tol:
             break
-        w = w_new
-        b = b_new
-    return w, b
\ No newline at end of file
+    return w,{"objective":np.array(objective),"delta_w":np.array(delta_w),"n_iter":len(delta_w)}
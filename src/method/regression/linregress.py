@@ -1,11 +1,21 @@
 import numpy as np
+import warnings
 from enum import Enum, auto
-from multiprocessing import Pool,cpu_count
+from .RegressUtils import Transform, get_transform
+from .regression import FitCancelled
+from .robust import ROBUST_LOSS, TUNING, irls, robust_pcov
+from ..cache import resolve_cache, hash_key
+from ..instrument import count, phase
+from ..plotting import update_line
 
 class SAPARATE_DELETE(Enum):
     RANSAC=auto()
     LMedS=auto()
     Zscore=auto()
+    HUBER=auto() # M-estimator by iteratively reweighted least squares, deterministic
+    TUKEY=auto() # bisquare M-estimator, outliers get zero weight
+
+_ROBUST_LOSSES={SAPARATE_DELETE.HUBER:ROBUST_LOSS.HUBER,SAPARATE_DELETE.TUKEY:ROBUST_LOSS.TUKEY}
 
 class LinRegressor:
     def __init__(self,
@@ -13,9 +23,10 @@ class LinRegressor:
                  weights:np.ndarray=None,
                  del_saparated_point:bool=False,
                  optim_method=SAPARATE_DELETE.RANSAC,
-                 threshold:float=3,
+                 threshold:float=None,
                  max_iter:int=100,
                  transform_xy:callable=None,
+                 propagate_weights:bool=True,
                  *args,**kwargs):
         """One-independent-variable Linear Regressor
 
@@ -23,7 +34,8 @@ class LinRegressor:
             x (np.ndarray): values of independent variable, should be 1Dcould be 1D or 2D (dim 0: data).
             y (np.ndarray): values of dependent variable, could be 1D or 2D \
                 (dim 0: data for different x; dim 1: parallel values for certain x).
-            weights (np.ndarray): weights of each point, could be None if you do not need weighted regression.
+            weights (np.ndarray): weights of each point, 1/SD of y (as generated for 2D y), could be None if you\
+                do not need weighted regression.
             del_saparated_point (bool, optional): choose whether to delete separated points from dataset or not.\
                 Defaults to False.
             optim_method (_type_, optional): method to delete separated points, \
@@ -34,18 +46,26 @@ class LinRegressor:
                     
                 In **LMedS**, point i will be recognized as inliers if |residue_i|<sqrt(threshold*median(residue^2));\
                     
-                In **Zscore**, point i will be deleted if |Z|>threshold (where Z=(residue-mu)/sigma)) \
-                Defaults to 3.
+                In **Zscore**, point i will be deleted if |Z|>threshold (where Z=(residue-mu)/sigma));\
+                    
+                In **HUBER** and **TUKEY**, threshold is the tuning constant c in units of the MAD scale of the\
+                residues, points with |residue_i|<=max(c,2.5)*scale are reported as inliers. \
+                Defaults to None (3, or 1.345 for HUBER and 4.685 for TUKEY).
             max_iter (int, optional): RANSAC and LMedS need to select some points from dataset to train many\
                 small linear models parallelly, then select a best one. max_iter tells the function\
-                how many small models should be trained. Defaults to 100.
+                how many small models should be trained. For HUBER and TUKEY, the maximum number of\
+                reweighting iterations. Defaults to 100.
             transform_xy (callable, optional): In original data, x and y may not be fit for a linear\
                 model. This is an interface to input a function like this:
                     ```
                     def Arrhenius(T:float, k:float):
                         return 1/T, np.log(k)
                     ```
-                module RegressUtils.py provides many functions like this.
+                module RegressUtils.py provides many transforms like this (Transform objects), which could also\
+                be selected by their registered name, e.g. transform_xy="Arrhenius". For Transform objects, points\
+                out of the domain of the transform are deleted (1D y) or ignored (2D y) with a warning.
+            propagate_weights (bool, optional): when transform_xy is a Transform and weights (1/SD of y) are\
+                given, convert them to weights of the transformed y by first-order error propagation. Defaults to True.
         """
         if len(x)!=len(y):
             if len(y.shape)==2:
@@ -53,16 +73,35 @@ class LinRegressor:
                     y=y.T.copy()
                 else:
                     raise ValueError("x and y are not in the same length.")
-        if not transform_xy is None:
+        if isinstance(transform_xy,str):
+            transform_xy=get_transform(transform_xy)
+        if isinstance(transform_xy,Transform):
+            self.transform=transform_xy
+            # one copy of the data, then everything is done in place
+            x,y=np.array(x,dtype=float),np.array(y,dtype=float)
+            mask=transform_xy.mask(x,y)
+            rows=mask if mask.ndim==1 else mask.any(axis=1)
+            if not np.all(rows):
+                warnings.warn(f"{np.sum(~rows)} points are out of the domain of transform {transform_xy.name}"
+                              " and are deleted.")
+                x,y,mask=x[rows],y[rows],mask[rows]
+                if weights is not None:
+                    weights=np.asarray(weights)[rows]
+            if weights is not None and propagate_weights:
+                y_=y if y.ndim==1 else np.nanmean(np.where(mask,y,np.nan),axis=1)
+                weights=transform_xy.propagate_weights(np.asarray(weights,dtype=float),x,y_)
+            self.x,self.y=transform_xy(x,y,inplace=True,mask=mask)
+        elif not transform_xy is None:
             self.transform=transform_xy
             self.x,self.y=transform_xy(x,y)
         else:
             self.x, self.y=x, y
-        self.length=len(x)
-        self.mean_x=np.mean(x)
+        self.length=len(self.x)
+        self.mean_x=np.mean(self.x)
         self.weights=weights
+        self._input_weights=weights # fit() replaces self.weights by 1/SD weights of 2D y
         if len(self.y.shape)==1:
-            self.mean_y=np.mean(y)
+            self.mean_y=np.mean(self.y)
             self.multi_y=False
         elif len(self.y.shape)==2:
             self.std_y=np.nanstd(self.y, axis=1)
@@ -74,11 +113,14 @@ class LinRegressor:
         
         self.del_saparated_point=del_saparated_point
         if del_saparated_point:
+            if threshold is None:
+                threshold=TUNING[_ROBUST_LOSSES[optim_method]] if optim_method in _ROBUST_LOSSES else 3
             self.threshold=threshold
             self.optim_method=optim_method
             self.max_iter=max_iter
             
-    def fit(self,use_weights=True,num_samples=3,epsilon:float=1e-2):
+    def fit(self,use_weights=True,num_samples=3,epsilon:float=1e-2,callback:callable=None,cancel=None,cache=None,
+            tol:float=1e-8):
         """fit a linear model.
 
         Args:
@@ -87,6 +129,15 @@ class LinRegressor:
             num_samples (int, optional): For RANSAC and LMedS, how many points are selected to construct\
                 each small model. Defaults to 2.
             epsilon (float, optional): Protection term in generating weights when input y is 2D: 1/(SD+epsilon). Defaults to 1e-2.
+            callback (callable, optional): For RANSAC and LMedS, called as callback(iteration, result) whenever a\
+                small model is finished, result is a dict of its slope, intercept and num_inliers (RANSAC) or\
+                resmed (LMedS). Defaults to None.
+            cancel (optional): object with an is_set() method (e.g. threading.Event), checked between small models\
+                of RANSAC and LMedS; FitCancelled is raised once it is set. Defaults to None.
+            cache (optional): ResultCache, the result is looked up by the (transformed) data, weights and settings.\
+                Defaults to None (the default cache, see cache.set_default_cache), False disables it.
+            tol (float, optional): For HUBER and TUKEY, relative change of slope and intercept at which the\
+                reweighting stops. Defaults to 1e-8.
 
         Returns:
             slope: Slope of regression curve.
@@ -95,7 +146,27 @@ class LinRegressor:
             Rsq: correlation coefficient.
             Rsq_adj: adjusted correlation coefficient.
         """
+        cache=resolve_cache(cache)
+        if cache is not None:
+            settings={"use_weights":use_weights,"epsilon":epsilon}
+            if self.del_saparated_point:
+                settings.update(optim_method=self.optim_method.name,threshold=self.threshold,
+                                max_iter=self.max_iter,num_samples=num_samples,tol=tol)
+            key=hash_key("LinRegressor",np.asarray(self.x),np.asarray(self.y),self._input_weights,
+                         self.std_y if self.multi_y else None,**settings)
+            result=cache.get(key)
+            if result is not None:
+                self.slope,self.intercept=result["slope"][()],result["intercept"][()]
+                self.pcov,self.Rsq,self.Rsq_adj=result["pcov"],result["Rsq"][()],result["Rsq_adj"][()]
+                if "weights" in result:
+                    self.weights=result["weights"]
+                if "inlier_id" in result:
+                    self.inlier_id=result["inlier_id"]
+                if "robust_weights" in result:
+                    self.robust_weights=result["robust_weights"]
+                return self.slope, self.intercept, self.pcov, self.Rsq, self.Rsq_adj
         if not self.del_saparated_point:
+            self.weights=self._input_weights
             if (not self.multi_y) and (self.weights is None):
                 self.slope,self.intercept=_simpleRegressor(self.x,self.y,
                                                            self.length,self.mean_x,self.mean_y)
@@ -114,16 +185,15 @@ class LinRegressor:
         else:
             match self.optim_method:
                 case SAPARATE_DELETE.RANSAC:
-                    with Pool(processes=min(cpu_count(),8)) as pool:
-                        results=pool.map(_ransac_once,[(self.x,self.y,
-                                                self.threshold,num_samples)]*self.max_iter)
+                    results=_sample_models(_ransac_once,(self.x,self.y,self.threshold,num_samples),
+                                           self.max_iter,callback,cancel)
                     best_id=np.argmax(np.array([results[i]["num_inliers"] for i in range(len(results))]))
                     self.inlier_id=results[best_id]["inliers"]
                     self.slope,self.intercept,self.pcov, self.Rsq,self.Rsq_adj=\
                     _fit_final_model(self.x[self.inlier_id],self.y[self.inlier_id])
                 case SAPARATE_DELETE.LMedS:
-                    with Pool(processes=min(cpu_count(),8)) as pool:
-                        results=pool.map(_lmeds_once,[(self.x,self.y,num_samples)]*self.max_iter)
+                    results=_sample_models(_lmeds_once,(self.x,self.y,num_samples),
+                                           self.max_iter,callback,cancel)
                     best_id=np.argmin(np.array([results[i]["resmed"] for i in range(len(results))]))
                     self.inlier_id=_get_inliers(self.x,self.y,results[best_id]["slope"],
                                            results[best_id]["intercept"],
@@ -137,6 +207,32 @@ class LinRegressor:
                                 self.threshold*np.std(self.y-slope_*self.x-intercept_))
                     self.slope,self.intercept,self.pcov, self.Rsq,self.Rsq_adj=\
                     _fit_final_model(self.x[self.inlier_id],self.y[self.inlier_id])
+                case SAPARATE_DELETE.HUBER | SAPARATE_DELETE.TUKEY:
+                    self.weights=self._input_weights
+                    if self.weights is None and self.multi_y:
+                        self.weights=1/(self.std_y+epsilon)
+                    prior=self.weights if use_weights else None
+                    result=irls(lambda weights:np.array(_weightedRegressor(self.x,self.y,weights)),
+                                lambda para:self.y-para[0]*self.x-para[1],
+                                self.length,_ROBUST_LOSSES[self.optim_method],self.threshold,prior,
+                                tol,self.max_iter)
+                    self.slope,self.intercept=result["params"]
+                    self.robust_weights,self.inlier_id=result["weights"],result["inliers"]
+                    J=np.stack((self.x,np.ones(self.length)),axis=1)
+                    self.pcov=robust_pcov(J,self.y-self.slope*self.x-self.intercept,result["scale"],
+                                          _ROBUST_LOSSES[self.optim_method],self.threshold,prior)
+                    mean_y=np.sum(self.robust_weights*self.y)/np.sum(self.robust_weights)
+                    self.Rsq,self.Rsq_adj=_compute_Rsq(self.x,self.y,mean_y,self.slope,self.intercept,
+                                                       self.robust_weights)
+        if cache is not None:
+            result={"slope":self.slope,"intercept":self.intercept,"pcov":self.pcov,"Rsq":self.Rsq,"Rsq_adj":self.Rsq_adj}
+            if self.weights is not None:
+                result["weights"]=self.weights
+            if self.del_saparated_point:
+                result["inlier_id"]=self.inlier_id
+                if self.optim_method in _ROBUST_LOSSES:
+                    result["robust_weights"]=self.robust_weights
+            cache.put(key,result)
         return self.slope, self.intercept, self.pcov, self.Rsq, self.Rsq_adj
     
     def __call__(self, x, *args, **kwds):
@@ -152,6 +248,8 @@ class LinRegressor:
             ax : matplotlib canvas object
             decimals (int, optional): For printing the expression of the curve,\
                 how many decimals will be retained. Defaults to 4.
+            line (optional): Line2D returned by an earlier call, its data are replaced instead of\
+                adding a new line. Defaults to None.
 
         Returns:
             line: regression curve, a matplotlib Line2D object
@@ -159,10 +257,9 @@ class LinRegressor:
         sign="+" if self.intercept>0 else "-"
         expr=rf"$y={np.round(self.slope,decimals)}x{sign}{np.round(abs(self.intercept),decimals)}$"
         legend=kwargs.pop("legend",expr)
-        line, =ax.plot([min(self.x),max(self.x)],[self(min(self.x)),self(max(self.x))],label=legend,*args,**kwargs)
-        ax.figure.canvas.draw()
-        ax.legend()
-        return line
+        line=kwargs.pop("line",None)
+        x=np.array([np.min(self.x),np.max(self.x)])
+        return update_line(ax,x,self(x),line,label=legend,*args,**kwargs)
     
     def scatter(self,ax,*args,**kwargs):
         if self.del_saparated_point:
@@ -185,6 +282,20 @@ def _fit_final_model(x,y):
     Rsq,Rsq_adj=_compute_Rsq(x,y,y.mean(),slope,intercept)
     return slope,intercept,pcov,Rsq,Rsq_adj
                 
+def _sample_models(func,args,max_iter,callback=None,cancel=None):
+    # results are collected in order as they arrive, so the caller could report progress or stop early
+    from multiprocessing import Pool,cpu_count
+    results=[]
+    with phase("LinRegressor.trials"),Pool(processes=min(cpu_count(),8)) as pool:
+        for result in pool.imap(func,[args]*max_iter,chunksize=max(1,max_iter//64)):
+            if cancel is not None and cancel.is_set():
+                raise FitCancelled("Fitting is cancelled.")
+            results.append(result)
+            count("LinRegressor.trials")
+            if callback is not None:
+                callback(len(results)-1,result)
+    return results
+
 def _ransac_once(args):
     x,y,threshold,num_samples=args
     samples=np.random.choice(list(range(len(x))),num_samples)
@@ -225,6 +336,7 @@ def _weightedRegressor(x,y,weights):
                 ])
     b_=np.array([[np.sum(weights*x*y)],
                 [np.sum(weights*y)]])
+    count("linear_solves")
     slope,intercept=np.linalg.solve(A_,b_).reshape(2,)
     return slope,intercept
 
@@ -233,16 +345,16 @@ def _get_inliers(x,y,a,b,tol):
 
 def _compute_linpcov(x,y,a,b,weights=None):
     sigma2=np.sum((y-a*x-b)**2)/(len(x)-2)
-    if weights is None:
-        weights=np.eye(len(x))
-    else:
-        weights=np.diag(weights)
     J=np.concat((x.reshape(len(x),1),np.ones((len(x),1),dtype=float)),axis=1)
-    return sigma2*np.linalg.inv(J.T.dot(weights).dot(J))
+    # J^T*W*J without forming the n*n diagonal matrix
+    JW=J if weights is None else J*np.asarray(weights,dtype=float).reshape(len(x),1)
+    count("linear_solves")
+    return sigma2*np.linalg.inv(JW.T.dot(J))
 
-def _compute_Rsq(x,y,mean_y,a,b):
-    SSres=np.sum((y-a*x-b)**2)
-    SStot=np.sum((y-mean_y)**2)
+def _compute_Rsq(x,y,mean_y,a,b,weights=None):
+    weights=1.0 if weights is None else weights
+    SSres=np.sum(weights*(y-a*x-b)**2)
+    SStot=np.sum(weights*(y-mean_y)**2)
     Rsq=1-SSres/SStot
     Rsq_adj=1-((1-Rsq)*(len(x)-1)/(len(x)-2))
     return Rsq,Rsq_adj
\ No newline at end of file
@@ -1,4 +1,13 @@
 import numpy as np
+from enum import Enum, auto
+from ..plotting import update_line, curve_points
+from ..cache import resolve_cache, hash_key
+from ..instrument import count, phase
+from .robust import ROBUST_LOSS, irls, robust_pcov
+
+class RIDGE_CRITERION(Enum):
+    LOO=auto() # leave-one-out (PRESS) mean squared error
+    GCV=auto() # generalized cross-validation
 
 class PolynomialRegressor:
     def __init__(self,
@@ -22,25 +31,91 @@ class PolynomialRegressor:
         self.lamb=lamb
         self.degree=degree
         
-    def fit(self):
+    def fit(self,cache=None,robust:ROBUST_LOSS=None,tuning:float=None,tol:float=1e-8,max_iter:int=50):
         """fit the polynominal model
 
+        Args:
+            cache (optional): ResultCache, the result is looked up by x, y, degree, lamb and the robust settings.\
+                Defaults to None (the default cache, see cache.set_default_cache), False disables it.
+            robust (ROBUST_LOSS, optional): fit an M-estimator by iteratively reweighted least squares, so that\
+                outliers are down-weighted (HUBER) or ignored (TUKEY). Defaults to None (least squares).
+            tuning (float, optional): tuning constant of the robust loss in units of the MAD scale of the\
+                residues. Defaults to None (robust.TUNING).
+            tol (float, optional): relative change of the coefficients at which the reweighting stops. Defaults to 1e-8.
+            max_iter (int, optional): maximum number of reweighting iterations. Defaults to 50.
+
         Returns:
             weights: Weights on each x^k term
             pcov: Covarience matrix of parameters
             Rsq: correlation coefficient
             Rsq_adj: adjusted correlation coefficient
         """
+        cache=resolve_cache(cache)
+        if cache is not None:
+            settings={} if robust is None else {"robust":robust.name,"tuning":tuning,"tol":tol,"max_iter":max_iter}
+            key=hash_key("PolynomialRegressor",np.asarray(self.x),np.asarray(self.y),
+                         degree=self.degree,lamb=self.lamb,**settings)
+            result=cache.get(key)
+            if result is not None:
+                self.weights,self.pcov=result["weights"],result["pcov"]
+                self.Rsq,self.Rsq_adj=result["Rsq"][()],result["Rsq_adj"][()]
+                if "robust_weights" in result:
+                    self.robust_weights,self.inlier_id=result["robust_weights"],result["inlier_id"]
+                return self.weights,self.pcov,self.Rsq,self.Rsq_adj
         poly=np.zeros((len(self.x),self.degree+1),dtype=float)
         for _ in range(self.degree+1):
             poly[:,_]=self.x**_
-        self.weights=np.linalg.solve(poly.T.dot(poly)+self.lamb*np.eye(self.degree+1),
-                                     poly.T.dot(self.y))
-        sigma2=np.sum((self(self.x)-self.y)**2)/(len(self.x)-self.degree-1)
-        self.pcov=sigma2*np.linalg.inv(poly.T.dot(poly)+self.lamb*np.eye(self.degree+1)).\
-            dot(poly.T.dot(poly)).dot(np.linalg.inv(poly.T.dot(poly)+self.lamb*np.eye(self.degree+1)))
-        self.Rsq,self.Rsq_adj=_compute_Rsq(self.x,self.y,self(self.x),self.degree+1)
+        penalty=self.lamb*np.eye(self.degree+1)
+        if robust is None:
+            count("linear_solves")
+            with phase("PolynomialRegressor.solve"):
+                self.weights=np.linalg.solve(poly.T.dot(poly)+penalty,poly.T.dot(self.y))
+            self.pcov=_sandwich_pcov(poly,self.y-self(self.x),penalty,len(self.x)-self.degree-1)
+            self.Rsq,self.Rsq_adj=_compute_Rsq(self.x,self.y,self(self.x),self.degree+1)
+        else:
+            with phase("PolynomialRegressor.solve"):
+                result=irls(lambda weights:_weighted_solve(poly,self.y,weights,penalty),
+                            lambda para:self.y-poly.dot(para),
+                            len(self.x),robust,tuning,None,tol,max_iter)
+            self.weights,self.robust_weights,self.inlier_id=result["params"],result["weights"],result["inliers"]
+            self.pcov=robust_pcov(poly,self.y-self(self.x),result["scale"],robust,tuning,penalty=penalty)
+            self.Rsq,self.Rsq_adj=_compute_Rsq(self.x,self.y,self(self.x),self.degree+1,self.robust_weights)
+        if cache is not None:
+            result={"weights":self.weights,"pcov":self.pcov,"Rsq":self.Rsq,"Rsq_adj":self.Rsq_adj}
+            if robust is not None:
+                result.update(robust_weights=self.robust_weights,inlier_id=self.inlier_id)
+            cache.put(key,result)
         return self.weights,self.pcov,self.Rsq,self.Rsq_adj
+    
+    def fit_path(self,lambdas:np.ndarray=None,
+                 criterion=RIDGE_CRITERION.GCV,
+                 num_lambdas:int=100):
+        """fit the polynominal model for a whole sweep of L2 regularization coefficients.
+
+        Only one SVD of the design matrix is computed, every lambda is then solved
+        in a single vectorized pass. The lambda with the lowest score is selected,
+        and the regressor is left fitted with it (`self.lamb` is updated).
+
+        Args:
+            lambdas (np.ndarray, optional): 1D array of L2 regularization coefficients. Defaults to None \
+                (`num_lambdas` values spaced logarithmically between 1e-10*s_max^2 and s_max^2, \
+                where s_max is the largest singular value of the design matrix).
+            criterion (RIDGE_CRITERION, optional): score used to select the best lambda. Defaults to RIDGE_CRITERION.GCV.
+            num_lambdas (int, optional): number of lambdas generated when `lambdas` is None. Defaults to 100.
+
+        Returns:
+            path: dict with keys "lambdas", "weights" (n_lambdas*(degree+1)), "pcov", "Rsq", "Rsq_adj",\
+                "loo", "gcv" and "best_lamb".
+        """
+        poly=np.vander(np.asarray(self.x,dtype=float),N=self.degree+1,increasing=True)
+        path=_ridge_path(poly,np.asarray(self.y,dtype=float),lambdas,num_lambdas,
+                         dof=len(self.x)-self.degree-1,num_para=self.degree+1,
+                         criterion=criterion,intercept=False)
+        best=path["best_id"]
+        self.lamb=path["best_lamb"]
+        self.weights,self.pcov=path["weights"][best],path["pcov"][best]
+        self.Rsq,self.Rsq_adj=path["Rsq"][best],path["Rsq_adj"][best]
+        return path
         
     def __call__(self, x, *args, **kwds):
         try:
@@ -59,6 +134,10 @@ class PolynomialRegressor:
             ax : matplotlib canvas object
             decimals (int, optional): For printing the expression of the curve,\
                 how many decimals will be retained. Defaults to 4.
+            num_points (int, optional): number of points on the curve. Defaults to None\
+                (min(10*len(x), 2*width of the axes in pixels)).
+            line (optional): Line2D returned by an earlier call, its data are replaced instead of\
+                adding a new line. Defaults to None.
 
         Returns:
             line: regression curve, a matplotlib Line2D object
@@ -75,14 +154,10 @@ class PolynomialRegressor:
                 expr+=rf"{sign}{np.round(abs(self.weights[i]),decimals)}x^{i}"
         expr+=rf"$"
         legend=kwargs.pop("legend",expr)
-        if num_points is None:
-            num_points=len(self.x)*10
-        x=np.linspace(min(self.x),max(self.x),num_points)
-        y=self(x)
-        line, =ax.plot(x,y,label=legend,*args,**kwargs)
-        ax.figure.canvas.draw()
-        ax.legend()
-        return line
+        line=kwargs.pop("line",None)
+        num_points=curve_points(ax,num_points,len(self.x)*10)
+        x=np.linspace(np.min(self.x),np.max(self.x),num_points)
+        return update_line(ax,x,self(x),line,label=legend,*args,**kwargs)
     
     def scatter(self,ax,*args,**kwargs):
         dots=ax.scatter(self.x,self.y,*args,**kwargs)
@@ -104,16 +179,70 @@ class PolyvarRegressor:
             raise ValueError("x and y are not in the same length.")
         self.x,self.y,self.lamb=x,y,lamb
         
-    def fit(self):
+    def fit(self,robust:ROBUST_LOSS=None,tuning:float=None,tol:float=1e-8,max_iter:int=50):
+        """fit the multiple variable linear model
+
+        Args:
+            robust (ROBUST_LOSS, optional): fit an M-estimator by iteratively reweighted least squares, so that\
+                outliers are down-weighted (HUBER) or ignored (TUKEY). Defaults to None (least squares).
+            tuning (float, optional): tuning constant of the robust loss in units of the MAD scale of the\
+                residues. Defaults to None (robust.TUNING).
+            tol (float, optional): relative change of the coefficients at which the reweighting stops. Defaults to 1e-8.
+            max_iter (int, optional): maximum number of reweighting iterations. Defaults to 50.
+
+        Returns:
+            weights: intercept and coefficients of each variable
+            pcov: Covarience matrix of parameters
+            Rsq: correlation coefficient
+            Rsq_adj: adjusted correlation coefficient
+        """
         x=np.concatenate((np.ones((self.x.shape[0],1)),self.x),axis=1)
         I=np.eye(x.shape[1])
         I[0,0]=0
-        self.weights=np.linalg.solve(x.T.dot(x)+self.lamb*I,x.T.dot(self.y))
-        sigma2=np.sum((self.y-self(x))**2)/(self.x.shape[0]-self.x.shape[1])
-        self.pcov=sigma2*np.linalg.inv(x.T.dot(x)+self.lamb*I).\
-            dot(x.T.dot(x)).dot(np.linalg.inv(x.T.dot(x)+self.lamb*I))
-        self.Rsq,self.Rsq_adj=_compute_Rsq(x,self.y,self(x),num_para=x.shape[1])
+        dof=self.x.shape[0]-self.x.shape[1]
+        if robust is None:
+            count("linear_solves")
+            with phase("PolyvarRegressor.solve"):
+                self.weights=np.linalg.solve(x.T.dot(x)+self.lamb*I,x.T.dot(self.y))
+            self.pcov=_sandwich_pcov(x,self.y-self(x),self.lamb*I,dof)
+            self.Rsq,self.Rsq_adj=_compute_Rsq(x,self.y,self(x),num_para=x.shape[1])
+        else:
+            with phase("PolyvarRegressor.solve"):
+                result=irls(lambda weights:_weighted_solve(x,self.y,weights,self.lamb*I),
+                            lambda para:self.y-x.dot(para),
+                            x.shape[0],robust,tuning,None,tol,max_iter)
+            self.weights,self.robust_weights,self.inlier_id=result["params"],result["weights"],result["inliers"]
+            self.pcov=robust_pcov(x,self.y-self(x),result["scale"],robust,tuning,penalty=self.lamb*I)
+            self.Rsq,self.Rsq_adj=_compute_Rsq(x,self.y,self(x),x.shape[1],self.robust_weights)
         return self.weights,self.pcov,self.Rsq,self.Rsq_adj
+    
+    def fit_path(self,lambdas:np.ndarray=None,
+                 criterion=RIDGE_CRITERION.GCV,
+                 num_lambdas:int=100):
+        """fit the multiple variable linear model for a whole sweep of L2 regularization coefficients.
+
+        The intercept is not penalized (same as `fit`), so the SVD is computed once on the centered x.
+        The lambda with the lowest score is selected and the regressor is left fitted with it.
+
+        Args:
+            lambdas (np.ndarray, optional): 1D array of L2 regularization coefficients. Defaults to None \
+                (`num_lambdas` values spaced logarithmically between 1e-10*s_max^2 and s_max^2).
+            criterion (RIDGE_CRITERION, optional): score used to select the best lambda. Defaults to RIDGE_CRITERION.GCV.
+            num_lambdas (int, optional): number of lambdas generated when `lambdas` is None. Defaults to 100.
+
+        Returns:
+            path: dict with keys "lambdas", "weights" (n_lambdas*(n_dim+1), intercept first), "pcov", "Rsq",\
+                "Rsq_adj", "loo", "gcv" and "best_lamb".
+        """
+        path=_ridge_path(np.asarray(self.x,dtype=float),np.asarray(self.y,dtype=float).reshape(-1),
+                         lambdas,num_lambdas,
+                         dof=self.x.shape[0]-self.x.shape[1],num_para=self.x.shape[1]+1,
+                         criterion=criterion,intercept=True)
+        best=path["best_id"]
+        self.lamb=path["best_lamb"]
+        self.weights,self.pcov=path["weights"][best],path["pcov"][best]
+        self.Rsq,self.Rsq_adj=path["Rsq"][best],path["Rsq_adj"][best]
+        return path
         
     def __call__(self,x,*args,**kwargs):
         if len(x.shape)==1:
@@ -122,9 +251,93 @@ class PolyvarRegressor:
             x=np.concatenate((np.ones((x.shape[0],1)),x),axis=1)
         return x.dot(self.weights)
         
-def _compute_Rsq(x,y,y_pred,num_para):
-    SSres=np.sum((y-y_pred)**2)
-    SStot=np.sum((y-np.mean(y))**2)
+def _weighted_solve(X,y,weights,penalty):
+    # (X^T*W*X+penalty)^-1*X^T*W*y from weighted moments, W is never formed
+    XW=X*weights[:,None]
+    count("linear_solves")
+    return np.linalg.solve(XW.T.dot(X)+penalty,XW.T.dot(y))
+
+def _sandwich_pcov(X,residues,penalty,dof,weights=None):
+    # sigma^2*A^-1*X^T*W*X*A^-1, A=X^T*W*X+penalty
+    XW=X if weights is None else X*weights[:,None]
+    sigma2=np.sum((residues**2 if weights is None else weights*residues**2))/dof
+    XtX=XW.T.dot(X)
+    count("linear_solves")
+    inverse=np.linalg.inv(XtX+penalty)
+    return sigma2*inverse.dot(XtX).dot(inverse)
+
+def _compute_Rsq(x,y,y_pred,num_para,weights=None):
+    # weighted by the robust weights of an M-estimator, so that outliers do not dominate
+    weights=np.ones(len(y)) if weights is None else weights
+    SSres=np.sum(weights*(y-y_pred)**2)
+    SStot=np.sum(weights*(y-np.sum(weights*y)/np.sum(weights))**2)
     Rsq=1-SSres/SStot
     Rsq_adj=1-((1-Rsq)*(len(x)-1)/(len(x)-num_para-1))
-    return Rsq,Rsq_adj
\ No newline at end of file
+    return Rsq,Rsq_adj
+
+def _ridge_path(X,y,lambdas,num_lambdas,dof,num_para,criterion,intercept):
+    # X=U*diag(s)*V^T, then for every lambda (f_k=s_k^2/(s_k^2+lambda)):
+    # w=V*diag(s/(s^2+lambda))*U^T*y, diag(H)=(U**2)*f, tr(H)=sum(f)
+    # and A^-1*X^T*X*A^-1=V*diag(f^2/s^2)*V^T (A=X^T*X+lambda*I)
+    n=X.shape[0]
+    if intercept:
+        mean_x,mean_y=X.mean(axis=0),y.mean()
+        U,s,Vt=np.linalg.svd(X-mean_x,full_matrices=False)
+        Uty=U.T.dot(y-mean_y)
+    else:
+        U,s,Vt=np.linalg.svd(X,full_matrices=False)
+        Uty=U.T.dot(y)
+    if lambdas is None:
+        lambdas=s[0]**2*np.logspace(-10,0,num_lambdas)
+    lambdas=np.atleast_1d(np.asarray(lambdas,dtype=float))
+    if np.any(lambdas<0):
+        raise ValueError("L2 regularization coefficients should be non-negative.")
+    s2=s**2
+    with np.errstate(divide="ignore",invalid="ignore"):
+        shrink=np.where(s2>0,s/(s2+lambdas[:,None]),0.0)  # (n_lambdas, rank)
+    filt=shrink*s
+    coef=(shrink*Uty).dot(Vt)
+    fitted=U.dot((filt*Uty).T).T
+    cov_core=np.einsum("ki,li,mi->mkl",Vt.T,Vt.T,shrink**2)
+    if intercept:
+        fitted+=mean_y
+        b=mean_y-coef.dot(mean_x)
+        weights=np.concatenate((b[:,None],coef),axis=1)
+        cx=cov_core.dot(mean_x)
+        pcov=np.empty((len(lambdas),X.shape[1]+1,X.shape[1]+1),dtype=float)
+        pcov[:,0,0]=1/n+cx.dot(mean_x)
+        pcov[:,0,1:]=-cx
+        pcov[:,1:,0]=-cx
+        pcov[:,1:,1:]=cov_core
+        hat=1/n+(U**2).dot(filt.T).T
+        trace=1+filt.sum(axis=1)
+    else:
+        weights=coef
+        pcov=cov_core
+        hat=(U**2).dot(filt.T).T
+        trace=filt.sum(axis=1)
+    residues=y-fitted
+    SSres=np.sum(residues**2,axis=1)
+    pcov=pcov*(SSres/dof)[:,None,None]
+    SStot=np.sum((y-np.mean(y))**2)
+    Rsq=1-SSres/SStot
+    with np.errstate(divide="ignore",invalid="ignore"):
+        Rsq_adj=1-((1-Rsq)*(n-1)/(n-num_para-1))
+        loo=np.mean((residues/(1-hat))**2,axis=1)
+        gcv=SSres/n/(1-trace/n)**2
+    score=loo if criterion==RIDGE_CRITERION.LOO else gcv
+    # leverage 1 (interpolation) gives NaN or inf scores, the first lambda is kept if no score is finite
+    best_id=int(np.argmin(np.where(np.isfinite(score),score,np.inf)))
+    return {
+        "lambdas":lambdas,
+        "weights":weights,
+        "pcov":pcov,
+        "Rsq":Rsq,
+        "Rsq_adj":Rsq_adj,
+        "loo":loo,
+        "gcv":gcv,
+        "residues":residues,
+        "leverage":hat,
+        "best_id":best_id,
+        "best_lamb":lambdas[best_id]
+    }
@@ -1,5 +1,11 @@
 import numpy as np
-import inspect
+from ..plotting import update_line, curve_points
+from ..cache import resolve_cache, hash_key
+from ..instrument import count, record, phase
+from ..backend import BACKEND, resolve_backend, jit_run
+
+class FitCancelled(RuntimeError):
+    """raised inside a fitting loop when the `cancel` flag given to fit() is set"""
 
 class Regressor:
     def __init__(self,func:callable,
@@ -30,6 +36,7 @@ class Regressor:
             raise ValueError("x and y are not in the same length.")
         self.x,self.y=x,y
         self.func=func
+        import inspect
         sig=inspect.signature(func)
         self.parameters = list(sig.parameters.values())[1:]
         if initial_para is None:
@@ -46,34 +53,86 @@ class Regressor:
         
     def fit(self,lambda_modifier:float=2.0,
             lambda_init:float=0.1,
-            *args,**kwargs):
+            *args,
+            callback:callable=None,
+            cancel=None,
+            cache=None,
+            backend:BACKEND=None,
+            **kwargs):
+        """fit parameters of the function model by the Levenberg-Marquardt method
+
+        Args:
+            lambda_modifier (float, optional): damping is multiplied or divided by it after each step. Defaults to 2.0.
+            lambda_init (float, optional): initial damping. Defaults to 0.1.
+            *args, **kwargs: passed to grad_func. callback, cancel, cache and backend are keyword-only.
+            callback (callable, optional): called after every iteration as callback(iteration, loss, lamb, parameters),\
+                e.g. to report progress. Defaults to None.
+            cancel (optional): object with an is_set() method (e.g. threading.Event), checked before every iteration;\
+                FitCancelled is raised once it is set. Defaults to None.
+            cache (optional): ResultCache, the result is looked up by data, model function, initial parameters\
+                and settings. Defaults to None (the default cache, see cache.set_default_cache), False disables it.
+            backend (BACKEND, optional): BACKEND.NUMBA compiles the model function and evaluates the Jacobian\
+                point by point in a numba loop, BACKEND.NUMPY evaluates it with one call per parameter (point by\
+                point if the model only takes scalars). Defaults to None (backend.set_default_backend).
+
+        Returns:
+            parameters: fitted parameters
+            pcov: parameter covariance matrix
+        """
+        cache=resolve_cache(cache)
+        if cache is not None:
+            key=hash_key("Regressor",np.asarray(self.x),np.asarray(self.y),
+                         np.asarray(self.parameters,dtype=float),func=self.func,grad_func=self.grad_func,
+                         max_iter=self.max_iter,tol=self.tol,theta=self.theta,
+                         lambda_modifier=lambda_modifier,lambda_init=lambda_init,args=args,kwargs=kwargs)
+            if key is None:
+                # functions without a content-based identity are never cached
+                cache=None
+            else:
+                result=cache.get(key)
+                if result is not None:
+                    self.parameters=result["parameters"]
+                    return self.parameters, result["pcov"]
         try:
-            lamb=lambda_init
-            loss_old=np.inf
-            jac=None
-            for _ in range(self.max_iter):
-                if self.grad_func is None:
-                    dtheta, residues, jac=_grad_func(self.func,self.x,self.y,self.parameters,lamb)
-                else:
-                    dtheta=self.grad_func(self.func,self.x,self.y,self.parameters,*args,**kwargs)
-                    residues=self.func(self.x)-self.y
-                loss=0.5*np.sum(residues**2)
-                self.parameters += dtheta
-                if loss>=loss_old:
-                    lamb = min(lamb * lambda_modifier, 1e6)
-                else:
-                    lamb = max(lamb / lambda_modifier, 1e-12)
-                loss_old=loss
-                if lamb<self.tol:
-                    break
-            if jac is None:
-                jac=_compute_jac(self.func,self.x,self.y,self.parameters,1e-8)
-            sigma2=np.sum((self(self.x)-self.y)**2)/(len(self.x)-len(self.parameters))
-            pcov=sigma2*np.linalg.pinv(jac.T.dot(jac))
-            return self.parameters, pcov
+            with phase("Regressor.fit"):
+                lamb=lambda_init
+                loss_old=np.inf
+                jac=None
+                for iteration in range(self.max_iter):
+                    if cancel is not None and cancel.is_set():
+                        raise FitCancelled("Fitting is cancelled.")
+                    if self.grad_func is None:
+                        dtheta, residues, jac=_grad_func(self.func,self.x,self.y,self.parameters,lamb,
+                                                         backend=backend)
+                    else:
+                        dtheta=self.grad_func(self.func,self.x,self.y,self.parameters,*args,**kwargs)
+                        residues=self.func(self.x,*self.parameters)-self.y
+                    loss=0.5*np.sum(residues**2)
+                    self.parameters += dtheta
+                    if loss>=loss_old:
+                        lamb = min(lamb * lambda_modifier, 1e6)
+                    else:
+                        lamb = max(lamb / lambda_modifier, 1e-12)
+                    loss_old=loss
+                    record("Regressor.fit",iteration=iteration,loss=loss,lamb=lamb)
+                    if callback is not None:
+                        callback(iteration,loss,lamb,self.parameters)
+                    if lamb<self.tol:
+                        break
+                if jac is None:
+                    jac=_compute_jac(self.func,self.x,self.y,self.parameters,np.full(len(self.parameters),1e-8),
+                                     backend)
+                sigma2=np.sum((self(self.x)-self.y)**2)/(len(self.x)-len(self.parameters))
+                pcov=sigma2*np.linalg.pinv(jac.T.dot(jac))
+                count("linear_solves")
+        except FitCancelled:
+            raise
         except:
             raise RuntimeError("Failed to fit a regression curve. Sometimes it is because of some\
                 problems in random parameter initilization. You could try again.")
+        if cache is not None:
+            cache.put(key,{"parameters":self.parameters,"pcov":pcov})
+        return self.parameters, pcov
     
     def __call__(self, x, *args, **kwds):
         try:
@@ -82,14 +141,10 @@ class Regressor:
             raise ValueError("Invalid input.")
         
     def plot(self,ax,num_points:int=None,*args,**kwargs):
-        if not num_points:
-            num_points=len(self.x)*10
-        x=np.linspace(min(self.x),max(self.x),num_points)
-        y=self(x)
-        line,=ax.plot(x,y,*args,**kwargs)
-        ax.figure.canvas.draw()
-        ax.legend()
-        return line
+        line=kwargs.pop("line",None)
+        num_points=curve_points(ax,num_points,len(self.x)*10)
+        x=np.linspace(np.min(self.x),np.max(self.x),num_points)
+        return update_line(ax,x,self(x),line,*args,**kwargs)
     
     def scatter(self,ax,*args,**kwargs):
         dots=ax.scatter(self.x,self.y,*args,**kwargs)
@@ -101,22 +156,52 @@ def _grad_func(func:callable,
                parameters,
                lamb:float,
                theta:np.ndarray=None,
-               *args,**kwargs):
+               *args,
+               backend:BACKEND=None,
+               **kwargs):
     if theta is None:
         epsilon=np.finfo(float).eps
         theta=epsilon**(1/3)*(np.abs(parameters) + 1e-8)
     residues=np.zeros(len(x),dtype=float)
-    jac=_compute_jac(func,x,y,parameters,theta)
+    with phase("Regressor.jacobian"):
+        jac=_compute_jac(func,x,y,parameters,theta,backend)
     residues=func(x,*parameters)-y
-    return np.linalg.pinv(jac.T.dot(jac)+lamb*np.diag(jac.T.dot(jac))).\
-                           dot(jac.T).dot(-residues), residues, jac
+    count("Regressor.evaluations",len(x)) # per point, as in _compute_jac
+    with phase("Regressor.solve"):
+        count("linear_solves")
+        return np.linalg.pinv(jac.T.dot(jac)+lamb*np.diag(jac.T.dot(jac))).\
+                               dot(jac.T).dot(-residues), residues, jac
                            
-def _compute_jac(func,x,y,parameters,theta):
+def _compute_jac(func,x,y,parameters,theta,backend=None):
+    count("Regressor.evaluations",2*len(x)*len(parameters))
+    parameters=np.asarray(parameters,dtype=float)
+    x=np.asarray(x)
+    numba=resolve_backend(backend)==BACKEND.NUMBA and x.dtype.kind in "fi"
     jac=np.zeros((len(x),len(parameters)),dtype=float)
+    for j in range(len(parameters)):
+        h1,h2=parameters.copy(),parameters.copy()
+        h1[j]+=theta[j]
+        h2[j]-=theta[j]
+        column=jit_run(_jac_column,(func,),x.astype(float),tuple(h1),tuple(h2),2*theta[j]) if numba else None
+        if column is None:
+            numba=False
+            column=_jac_column_numpy(func,x,h1,h2,2*theta[j])
+        jac[:,j]=column
+    return jac
+
+def _jac_column(func,x,upper,lower,step):
+    # central difference of one parameter, point by point (compiled by numba)
+    column=np.empty(len(x))
     for i in range(len(x)):
-        for j in range(len(parameters)):
-            h1,h2=parameters.copy(),parameters.copy()
-            h1[j]+=theta[j]
-            h2[j]-=theta[j]
-            jac[i,j]=(func(x[i],*h1)-func(x[i],*h2))/(2*theta[j])
-    return jac
\ No newline at end of file
+        column[i]=(func(x[i],*upper)-func(x[i],*lower))/step
+    return column
+
+def _jac_column_numpy(func,x,upper,lower,step):
+    # one vectorized call on all points, point by point if func only takes scalars
+    try:
+        column=(np.asarray(func(x,*upper),dtype=float)-np.asarray(func(x,*lower),dtype=float))/step
+        if column.shape==x.shape:
+            return column
+    except Exception:
+        pass
+    return np.array([(func(x[i],*upper)-func(x[i],*lower))/step for i in range(len(x))],dtype=float)
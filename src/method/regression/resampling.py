@@ -0,0 +1,126 @@
+import numpy as np
+from .linregress import LinRegressor
+from .polyregress import PolynomialRegressor, PolyvarRegressor
+from .regression import Regressor
+
+def bootstrap(regressor,
+              n_resamples:int=10000,
+              confidence:float=0.95,
+              seed=None,
+              chunk_size:int=1000,
+              n_jobs:int=None):
+    """bootstrap confidence intervals of fitted parameters (case resampling, percentile intervals)
+
+    For LinRegressor, PolynomialRegressor and PolyvarRegressor, the index sets of a whole chunk of\
+    resamples are generated at once and turned into per-point counts, so every resample is solved from\
+    weighted moments (closed-form for lines, one stacked np.linalg.solve for polynomials) without refitting.\
+    Nonlinear Regressor models are refitted chunk by chunk on a process pool, starting from the fitted\
+    parameters. Every chunk has its own seed spawned from `seed`, so output does not depend on `n_jobs`.
+
+    Args:
+        regressor: a fitted LinRegressor, PolynomialRegressor, PolyvarRegressor or Regressor.\
+            For LinRegressor deleting separated points, only the inliers are resampled.
+        n_resamples (int, optional): number of bootstrap resamples. Defaults to 10000.
+        confidence (float, optional): confidence level of the intervals. Defaults to 0.95.
+        seed (optional): seed of the random generator. Defaults to None.
+        chunk_size (int, optional): resamples generated (and solved) together, bounds the memory to\
+            chunk_size*n_samples indices. Defaults to 1000.
+        n_jobs (int, optional): number of processes for Regressor. Defaults to None (min(cpu_count(), 8)).
+
+    Returns:
+        result: dict with keys "samples" (n_resamples*n_parameters), "estimate" (fitted parameters),\
+            "se" (bootstrap standard errors), "ci_low" and "ci_high". Parameters are ordered as\
+            [slope, intercept] for LinRegressor, and as the `weights` or `parameters` attribute otherwise.
+    """
+    if not 0<confidence<1:
+        raise ValueError("Confidence level should be in (0, 1).")
+    sizes=[min(chunk_size,n_resamples-i) for i in range(0,n_resamples,chunk_size)]
+    seeds=np.random.SeedSequence(seed).spawn(len(sizes))
+    try:
+        if isinstance(regressor,LinRegressor):
+            estimate=np.array([regressor.slope,regressor.intercept])
+            if regressor.del_saparated_point:
+                x,y=regressor.x[regressor.inlier_id],regressor.y[regressor.inlier_id]
+                weights=None
+            else:
+                x,y,weights=regressor.x,regressor.y,regressor.weights
+            samples=[_bootstrap_line(x,y,weights,s,size) for s,size in zip(seeds,sizes)]
+        elif isinstance(regressor,PolynomialRegressor):
+            estimate=np.asarray(regressor.weights)
+            V=np.vander(np.asarray(regressor.x,dtype=float),N=regressor.degree+1,increasing=True)
+            penalty=regressor.lamb*np.eye(regressor.degree+1)
+            samples=[_bootstrap_ridge(V,regressor.y,penalty,s,size) for s,size in zip(seeds,sizes)]
+        elif isinstance(regressor,PolyvarRegressor):
+            estimate=np.asarray(regressor.weights).reshape(-1)
+            X=np.concatenate((np.ones((regressor.x.shape[0],1)),regressor.x),axis=1)
+            penalty=regressor.lamb*np.eye(X.shape[1])
+            penalty[0,0]=0
+            samples=[_bootstrap_ridge(X,np.asarray(regressor.y).reshape(-1),penalty,s,size)
+                     for s,size in zip(seeds,sizes)]
+        elif isinstance(regressor,Regressor):
+            from multiprocessing import Pool,cpu_count
+            estimate=np.array(regressor.parameters,dtype=float)
+            # same estimator as the reported fit: user gradient and Jacobian steps are passed on
+            tasks=[(regressor.func,regressor.x,regressor.y,estimate,regressor.max_iter,regressor.tol,
+                    regressor.theta,regressor.grad_func,s,size) for s,size in zip(seeds,sizes)]
+            with Pool(processes=n_jobs or min(cpu_count(),8)) as pool:
+                samples=pool.map(_bootstrap_nonlinear,tasks)
+        else:
+            raise TypeError(f"Bootstrap is not available for {type(regressor).__name__}.")
+    except AttributeError:
+        raise RuntimeError("Undefined parameters (use fit() first).")
+    samples=np.concatenate(samples,axis=0)
+    alpha=(1-confidence)/2
+    ci_low,ci_high=np.nanpercentile(samples,[100*alpha,100*(1-alpha)],axis=0)
+    return {
+        "samples":samples,
+        "estimate":estimate,
+        "se":np.nanstd(samples,axis=0,ddof=1),
+        "ci_low":ci_low,
+        "ci_high":ci_high
+    }
+
+def _resample_counts(n,seed,size):
+    # counts[b,i]: how many times point i appears in resample b
+    idx=np.random.default_rng(seed).integers(0,n,size=(size,n))
+    idx+=n*np.arange(size)[:,None]
+    return np.bincount(idx.ravel(),minlength=size*n).reshape(size,n).astype(float)
+
+def _bootstrap_line(x,y,weights,seed,size):
+    # weighted moments of every resample, the same normal equations as _weightedRegressor
+    c=_resample_counts(len(x),seed,size)
+    if weights is not None:
+        c*=weights
+    S=c.sum(axis=1)
+    Sx,Sy=c.dot(x),c.dot(y)
+    Sxx,Sxy=c.dot(x**2),c.dot(x*y)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        slope=(S*Sxy-Sx*Sy)/(S*Sxx-Sx**2)
+    intercept=(Sy-slope*Sx)/S
+    return np.stack((slope,intercept),axis=1)
+
+def _bootstrap_ridge(X,y,penalty,seed,size):
+    c=_resample_counts(X.shape[0],seed,size)
+    p=X.shape[1]
+    outer=(X[:,:,None]*X[:,None,:]).reshape(X.shape[0],p*p)
+    G=c.dot(outer).reshape(size,p,p)+penalty
+    b=c.dot(X*np.asarray(y,dtype=float)[:,None])
+    weights=np.full((size,p),np.nan)
+    solvable=np.linalg.matrix_rank(G)==p
+    weights[solvable]=np.linalg.solve(G[solvable],b[solvable][:,:,None])[:,:,0]
+    return weights
+
+def _bootstrap_nonlinear(args):
+    func,x,y,initial_para,max_iter,tol,theta,grad_func,seed,size=args
+    rng=np.random.default_rng(seed)
+    parameters=np.full((size,len(initial_para)),np.nan)
+    for i in range(size):
+        idx=rng.integers(0,len(x),size=len(x))
+        try:
+            regressor=Regressor(func,x[idx],y[idx],initial_para=initial_para.copy(),max_iter=max_iter,tol=tol,
+                                theta=theta,grad_func=grad_func)
+            # resamples are never worth caching
+            parameters[i]=regressor.fit(cache=False)[0]
+        except (RuntimeError,ValueError):
+            pass
+    return parameters
@@ -0,0 +1,142 @@
+import numpy as np
+from enum import Enum, auto
+from ..instrument import count, phase
+
+class ROBUST_LOSS(Enum):
+    HUBER=auto() # quadratic inside c*scale, linear outside: outliers are down-weighted
+    TUKEY=auto() # bisquare, redescending: points beyond c*scale get zero weight
+
+# tuning constants with 95% efficiency for normally distributed errors
+TUNING={ROBUST_LOSS.HUBER:1.345,ROBUST_LOSS.TUKEY:4.685}
+# points beyond max(c,OUTLIER_CUT)*scale are reported as outliers, the Huber constant alone would flag\
+# about 18% of normally distributed points
+OUTLIER_CUT=2.5
+
+def mad_scale(residues:np.ndarray):
+    """robust standard deviation of residues, 1.4826*median(|r-median(r)|)"""
+    residues=np.asarray(residues,dtype=float)
+    return 1.4826*np.median(np.abs(residues-np.median(residues)))
+
+def robust_weights(u:np.ndarray,loss:ROBUST_LOSS=ROBUST_LOSS.HUBER,tuning:float=None):
+    """IRLS weights psi(u)/u of scaled residues u=r/scale"""
+    c=TUNING[loss] if tuning is None else tuning
+    u=np.abs(np.asarray(u,dtype=float))
+    match loss:
+        case ROBUST_LOSS.HUBER:
+            return np.minimum(1.0,c/np.maximum(u,np.finfo(float).tiny))
+        case ROBUST_LOSS.TUKEY:
+            return np.where(u<c,(1-(u/c)**2)**2,0.0)
+
+def robust_pcov(X:np.ndarray,
+                residues:np.ndarray,
+                scale:float,
+                loss:ROBUST_LOSS=ROBUST_LOSS.HUBER,
+                tuning:float=None,
+                prior:np.ndarray=None,
+                penalty:np.ndarray=None):
+    """covariance matrix of M-estimated linear parameters, computed on all points
+
+    Sandwich A^-1*B*A^-1*n/(n-p) with A=X^T*diag(prior*psi'(u))*X+penalty and\
+    B=scale^2*X^T*diag((prior*psi(u))^2)*X, u=r/scale. For least squares (psi(u)=u) it is the\
+    heteroscedasticity-consistent covariance.
+
+    Args:
+        X (np.ndarray): design matrix, dim 0: data
+        residues (np.ndarray): y-prediction of every point
+        scale (float): scale of the residues (irls result "scale")
+        loss (ROBUST_LOSS, optional): loss function. Defaults to ROBUST_LOSS.HUBER.
+        tuning (float, optional): tuning constant c in units of the scale. Defaults to None (TUNING[loss]).
+        prior (np.ndarray, optional): weights of the points used in the fit. Defaults to None.
+        penalty (np.ndarray, optional): L2 penalty matrix used in the fit. Defaults to None.
+
+    Returns:
+        pcov: covariance matrix of the parameters, zeros if the scale is 0 (exact fit)
+    """
+    c=TUNING[loss] if tuning is None else tuning
+    n,p=X.shape
+    if scale==0:
+        return np.zeros((p,p),dtype=float)
+    prior=np.ones(n,dtype=float) if prior is None else np.asarray(prior,dtype=float)
+    u=np.asarray(residues,dtype=float)/scale
+    match loss:
+        case ROBUST_LOSS.HUBER:
+            psi,dpsi=np.clip(u,-c,c),(np.abs(u)<=c).astype(float)
+        case ROBUST_LOSS.TUKEY:
+            t=np.where(np.abs(u)<c,(u/c)**2,1.0)
+            psi,dpsi=u*(1-t)**2,(1-t)*(1-5*t)
+    A=(X*(prior*dpsi)[:,None]).T.dot(X)
+    if penalty is not None:
+        A=A+penalty
+    B=scale**2*(X*((prior*psi)**2)[:,None]).T.dot(X)
+    count("linear_solves")
+    inverse=np.linalg.inv(A)
+    return inverse.dot(B).dot(inverse)*n/max(n-p,1)
+
+def irls(solve:callable,
+         residues:callable,
+         n:int,
+         loss:ROBUST_LOSS=ROBUST_LOSS.HUBER,
+         tuning:float=None,
+         prior:np.ndarray=None,
+         tol:float=1e-8,
+         max_iter:int=50):
+    """M-estimation by iteratively reweighted least squares
+
+    Every iteration estimates the scale of the residues by MAD, turns the scaled residues into weights\
+    and solves one weighted least squares problem. Tukey's bisquare is started from the Huber estimate,\
+    as a redescending loss could converge to a poor local minimum from the least squares fit.
+
+    Args:
+        solve (callable): solve(weights) returns the parameters of the weighted least squares fit (1D array)
+        residues (callable): residues(parameters) returns y-prediction of all n points
+        n (int): number of points
+        loss (ROBUST_LOSS, optional): loss function. Defaults to ROBUST_LOSS.HUBER.
+        tuning (float, optional): tuning constant c in units of the scale. Defaults to None (TUNING[loss]).
+        prior (np.ndarray, optional): weights of the points multiplied with the robust weights.\
+            Defaults to None.
+        tol (float, optional): stop when no parameter changes by more than tol relatively. Defaults to 1e-8.
+        max_iter (int, optional): maximum number of iterations. Defaults to 50.
+
+    Returns:
+        result: dict of params, weights (prior*robust weights), scale, inliers (indices of points with\
+            |r|<=max(c,OUTLIER_CUT)*scale), iterations and converged
+    """
+    c=TUNING[loss] if tuning is None else tuning
+    prior=np.ones(n,dtype=float) if prior is None else np.asarray(prior,dtype=float)
+    with phase("IRLS"):
+        if loss==ROBUST_LOSS.TUKEY:
+            params=irls(solve,residues,n,ROBUST_LOSS.HUBER,None,prior,tol,max_iter)["params"]
+        else:
+            params=np.asarray(solve(prior),dtype=float)
+        converged,iteration=False,0
+        while iteration<max_iter:
+            r=residues(params)
+            scale=mad_scale(r)
+            if scale==0:
+                # more than half of the points are fitted exactly
+                converged=True
+                break
+            new=np.asarray(solve(prior*robust_weights(r/scale,loss,c)),dtype=float)
+            iteration+=1
+            count("IRLS.iterations")
+            change=np.abs(new-params)
+            params=new
+            if np.all(change<=tol*(np.abs(params)+tol)):
+                converged=True
+                break
+    r=residues(params)
+    scale=mad_scale(r)
+    if scale>0:
+        weights=prior*robust_weights(r/scale,loss,c)
+        inliers=np.where(np.abs(r)<=max(c,OUTLIER_CUT)*scale)[0]
+    else:
+        weights=prior*(r==0)
+        inliers=np.where(r==0)[0]
+    return {
+        "params":params,
+        "weights":weights,
+        "scale":scale,
+        "inliers":inliers,
+        "iterations":iteration,
+        "converged":converged
+    }
@@ -0,0 +1,227 @@
+import re
+import numpy as np
+from math import lcm
+from fractions import Fraction
+from functools import lru_cache
+from .formula import parse_formula, formula_matrix
+
+# IUPAC standard atomic weights (abridged), mass number of the most stable isotope for radioactive elements
+ATOMIC_WEIGHTS={
+    "H":1.008,"D":2.014,"He":4.0026,"Li":6.94,"Be":9.0122,"B":10.81,"C":12.011,"N":14.007,"O":15.999,
+    "F":18.998,"Ne":20.180,"Na":22.990,"Mg":24.305,"Al":26.982,"Si":28.085,"P":30.974,"S":32.06,
+    "Cl":35.45,"Ar":39.95,"K":39.098,"Ca":40.078,"Sc":44.956,"Ti":47.867,"V":50.942,"Cr":51.996,
+    "Mn":54.938,"Fe":55.845,"Co":58.933,"Ni":58.693,"Cu":63.546,"Zn":65.38,"Ga":69.723,"Ge":72.630,
+    "As":74.922,"Se":78.971,"Br":79.904,"Kr":83.798,"Rb":85.468,"Sr":87.62,"Y":88.906,"Zr":91.224,
+    "Nb":92.906,"Mo":95.95,"Tc":98.0,"Ru":101.07,"Rh":102.91,"Pd":106.42,"Ag":107.87,"Cd":112.41,
+    "In":114.82,"Sn":118.71,"Sb":121.76,"Te":127.60,"I":126.90,"Xe":131.29,"Cs":132.91,"Ba":137.33,
+    "La":138.91,"Ce":140.12,"Pr":140.91,"Nd":144.24,"Pm":145.0,"Sm":150.36,"Eu":151.96,"Gd":157.25,
+    "Tb":158.93,"Dy":162.50,"Ho":164.93,"Er":167.26,"Tm":168.93,"Yb":173.05,"Lu":174.97,"Hf":178.49,
+    "Ta":180.95,"W":183.84,"Re":186.21,"Os":190.23,"Ir":192.22,"Pt":195.08,"Au":196.97,"Hg":200.59,
+    "Tl":204.38,"Pb":207.2,"Bi":208.98,"Po":209.0,"At":210.0,"Rn":222.0,"Fr":223.0,"Ra":226.0,
+    "Ac":227.0,"Th":232.04,"Pa":231.04,"U":238.03,"Np":237.0,"Pu":244.0,"Am":243.0,"Cm":247.0,
+    "Bk":247.0,"Cf":251.0,"Es":252.0,"Fm":257.0,"Md":258.0,"No":259.0,"Lr":262.0,"Rf":267.0,
+    "Db":268.0,"Sg":269.0,"Bh":270.0,"Hs":269.0,"Mt":278.0,"Ds":281.0,"Rg":282.0,"Cn":285.0,
+    "Nh":286.0,"Fl":289.0,"Mc":290.0,"Lv":293.0,"Ts":294.0,"Og":294.0
+}
+_ELEMENTS=list(ATOMIC_WEIGHTS)
+_WEIGHTS=np.array([ATOMIC_WEIGHTS[element] for element in _ELEMENTS])
+
+_ARROW=re.compile(r"\s*(?:<=>|<->|->|=>|→|⇌|=)\s*")
+_PLUS=re.compile(r"\s+\+\s+")
+# also before the electron "e-" of half-reactions, which is a charge-only species
+_LEADING_COEFFICIENT=re.compile(r"^\d+\s*(?=[A-Z(\[{]|e-$)")
+
+@lru_cache(maxsize=65536)
+def molar_mass(formula:str):
+    """molar mass (g/mol) of a chemical formula
+
+    Args:
+        formula (str): chemical formula, see formula.parse_formula
+
+    Returns:
+        mass: molar mass (g/mol)
+    """
+    try:
+        return sum(ATOMIC_WEIGHTS[element]*count for element,count in parse_formula(formula).items())
+    except KeyError as err:
+        raise ValueError(f"Unknown element {err.args[0]} in chemical formula \"{formula}\".")
+
+def molar_masses(formulas):
+    """molar masses (g/mol) of many chemical formulas, computed as one matrix-vector product
+
+    Args:
+        formulas: iterable of formula strings
+
+    Returns:
+        masses: 1D array
+    """
+    try:
+        matrix,_=formula_matrix(formulas,elements=_ELEMENTS)
+    except ValueError as err:
+        raise ValueError(f"Unknown element in chemical formulas: {err}")
+    return matrix.dot(_WEIGHTS)
+
+def balance_reaction(reaction):
+    """balance a chemical reaction with the smallest positive integer coefficients
+
+    Args:
+        reaction: string like "Fe2O3 + CO -> Fe + CO2" (species are separated by " + " with spaces,\
+            arrows could be ->, =, =>, <=>, →), or a tuple (reactants, products) of formula lists.\
+            Existing leading coefficients are ignored. Charges are balanced as well, electrons of\
+            half-reactions are written "e-" (e.g. "Cu+2 + 2e- -> Cu").
+
+    Returns:
+        result: dict with keys "reactants", "products", "coefficients" (1D int array, reactants first)\
+            and "equation" (balanced equation string)
+    """
+    reactants,products=_split_reaction(reaction)
+    return balance_reactions([(reactants,products)],errors="raise")[0]
+
+def balance_reactions(reactions,errors:str="raise"):
+    """balance many chemical reactions.
+
+    All species are parsed once into one composition matrix, reactions with the same number of species\
+    are balanced together by one batched SVD. The floating null-space vector is scaled to integers and\
+    verified exactly; only reactions failing the check are solved again with exact rational arithmetic.
+
+    Args:
+        reactions: list of reaction strings or (reactants, products) tuples, see balance_reaction
+        errors (str, optional): "raise" to raise ValueError for a reaction that could not be balanced\
+            uniquely, "ignore" to return None for it. Defaults to "raise".
+
+    Returns:
+        results: list of dicts, see balance_reaction
+    """
+    if errors not in ("raise","ignore"):
+        raise ValueError("Parameter errors should be \"raise\" or \"ignore\".")
+    split=[_split_reaction(reaction) for reaction in reactions]
+    species={}
+    for reactants,products in split:
+        for formula in reactants+products:
+            species.setdefault(formula,len(species))
+    matrix,elements,charges=formula_matrix(list(species),return_charge=True)
+    composition=np.concatenate((matrix,charges[:,None]),axis=1) # (n_species, n_elements+1)
+    results=[None]*len(split)
+    groups={}
+    for i,(reactants,products) in enumerate(split):
+        groups.setdefault(len(reactants)+len(products),[]).append(i)
+    for n,ids in groups.items():
+        index=np.array([[species[f] for f in split[i][0]+split[i][1]] for i in ids])
+        sign=np.array([[1.0]*len(split[i][0])+[-1.0]*len(split[i][1]) for i in ids])
+        # A[b]: (rows, n_species) with products negated, only rows used by this group are kept
+        A=np.transpose(composition[index]*sign[:,:,None],(0,2,1))
+        A=A[:,np.any(A!=0,axis=(0,2)),:]
+        coefficients=_null_vectors(A)
+        for b,i in enumerate(ids):
+            coef=coefficients[b]
+            if coef is None or not _is_balanced(A[b],coef):
+                try:
+                    coef=_exact_null_vector(A[b])
+                except ValueError as err:
+                    if errors=="raise":
+                        raise ValueError(f"Reaction {_format(*split[i])} could not be balanced: {err}")
+                    continue
+            results[i]=_result(split[i][0],split[i][1],coef)
+    return results
+
+def _split_reaction(reaction):
+    if isinstance(reaction,str):
+        sides=_ARROW.split(reaction.strip())
+        if len(sides)!=2:
+            raise ValueError(f"Reaction \"{reaction}\" should have exactly one arrow.")
+        reactants,products=(_PLUS.split(side.strip()) for side in sides)
+    else:
+        reactants,products=reaction
+    reactants=[_LEADING_COEFFICIENT.sub("",f.strip()) for f in reactants]
+    products=[_LEADING_COEFFICIENT.sub("",f.strip()) for f in products]
+    if not reactants or not products or "" in reactants+products:
+        raise ValueError(f"Invalid reaction {reaction}.")
+    return reactants,products
+
+def _null_vectors(A,max_denominator:int=1000,rtol:float=1e-10):
+    # batched SVD, a unique balance exists when rank(A)=n_species-1
+    n=A.shape[2]
+    if A.shape[1]<n:
+        A=np.concatenate((A,np.zeros((A.shape[0],n-A.shape[1],n))),axis=1)
+    _,s,Vt=np.linalg.svd(A)
+    unique=(s[:,n-2]>rtol*s[:,0])&(s[:,n-1]<=rtol*s[:,0]) if n>1 else np.zeros(len(A),dtype=bool)
+    v=Vt[:,-1,:]
+    v=v/v[np.arange(len(v)),np.argmin(np.abs(v)+np.where(np.abs(v)>rtol,0,np.inf),axis=1)][:,None]
+    # smallest multiplier making every ratio an integer, searched in blocks for unresolved reactions
+    multiplier=np.zeros(len(v),dtype=np.int64)
+    for start in range(1,max_denominator+1,64):
+        todo=np.where(unique&(multiplier==0))[0]
+        if len(todo)==0:
+            break
+        k=np.arange(start,min(start+64,max_denominator+1))
+        scaled=v[todo,None,:]*k[None,:,None]
+        near=np.all(np.abs(scaled-np.round(scaled))<1e-6*np.maximum(1,np.abs(scaled)),axis=2)
+        found=near.any(axis=1)
+        multiplier[todo[found]]=k[np.argmax(near[found],axis=1)]
+    coefficients=[]
+    for b in range(len(v)):
+        if multiplier[b]==0:
+            coefficients.append(None)
+        else:
+            coefficients.append(_normalize(np.round(v[b]*multiplier[b]).astype(np.int64)))
+    return coefficients
+
+def _normalize(coef):
+    if np.all(coef<0):
+        coef=-coef
+    if not np.all(coef>0):
+        return None
+    return coef//np.gcd.reduce(coef)
+
+def _is_balanced(A,coef):
+    if coef is None:
+        return False
+    if np.all(A==np.round(A)):
+        return not np.any(A.astype(np.int64).dot(coef))
+    return np.allclose(A.dot(coef),0,atol=1e-9)
+
+def _exact_null_vector(A):
+    # reduced row echelon form with fractions
+    rows=[[Fraction(value).limit_denominator(10**6) for value in row] for row in A]
+    n=len(rows[0]) if rows else 0
+    pivots=[]
+    r=0
+    for c in range(n):
+        pivot=next((i for i in range(r,len(rows)) if rows[i][c]!=0),None)
+        if pivot is None:
+            continue
+        rows[r],rows[pivot]=rows[pivot],rows[r]
+        rows[r]=[value/rows[r][c] for value in rows[r]]
+        for i in range(len(rows)):
+            if i!=r and rows[i][c]!=0:
+                factor=rows[i][c]
+                rows[i]=[a-factor*b for a,b in zip(rows[i],rows[r])]
+        pivots.append(c)
+        r+=1
+    free=[c for c in range(n) if c not in pivots]
+    if len(free)!=1:
+        raise ValueError("no unique balance exists." if free else "the reaction is impossible.")
+    solution=[Fraction(0)]*n
+    solution[free[0]]=Fraction(1)
+    for i,c in enumerate(pivots):
+        solution[c]=-rows[i][free[0]]
+    multiplier=lcm(*(value.denominator for value in solution))
+    coef=np.array([int(value*multiplier) for value in solution],dtype=np.int64)
+    coef=_normalize(coef)
+    if coef is None:
+        raise ValueError("coefficients are not all positive.")
+    return coef
+
+def _format(reactants,products,coef=None):
+    if coef is None:
+        coef=[1]*(len(reactants)+len(products))
+    terms=[(f"{c}" if c!=1 else "")+f for c,f in zip(coef,reactants+products)]
+    return " + ".join(terms[:len(reactants)])+" -> "+" + ".join(terms[len(reactants):])
+
+def _result(reactants,products,coef):
+    return {
+        "reactants":reactants,
+        "products":products,
+        "coefficients":coef,
+        "equation":_format(reactants,products,coef.tolist())
+    }
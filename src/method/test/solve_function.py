@@ -8,4 +8,5 @@ eq2=sp.Eq(-A*h1+B*h2,1)
 eq3=sp.Eq(A*h1**2+B*h2**2,0)
 sol=sp.solve((eq1,eq2,eq3),(A,B,C),simplify=True)
 for name in ["A","B","C"]:
-    print(f"{name} = {sp.simplify(sol[sp.Symbol(name)])}")
\ No newline at end of file
+    print(f"{name} = {sp.simplify(sol[sp.Symbol(name)])}")
+# the same coefficients for any order and offsets, without sympy: devint.fd_weights(1,(-h1,0,h2))
@@ -0,0 +1,65 @@
+import math
+import numpy as np
+from ..backend import BACKEND, numba_available, set_default_backend
+from ..chromatography import HPLCSimulator, CHROM_SCHEME
+from ..devint import intergration_func, INTEGRATION_TYPE
+from ..interpolation import Interpolation, INTERPOLATE_TYPE
+from ..regression import Regressor
+from ..regression.RegressUtils import holliday
+
+def piecewise(x):
+    return math.exp(-x)*math.sin(3*x) if x>1 else x*x
+
+if __name__ == '__main__':
+    
+    # parity: every kernel with both backends, differences should be 0 or a few ulps
+    print("numba installed:",numba_available())
+    x=np.linspace(0,5,200)
+    y=holliday(x,2.0,0.3,0.1)+0.001*np.random.randn(200)
+    for backend in BACKEND:
+        print(backend.name,Regressor(holliday,x,y,initial_para=np.array([1.5,0.2,0.2])).fit(cache=False,backend=backend)[0])
+    
+    x1=np.linspace(0,3,12)
+    interpolation=Interpolation(x1,np.sin(x1),INTERPOLATE_TYPE.LAGRANGE)
+    for val in (0.7,1.2345,2.99):
+        print(interpolation(val,backend=BACKEND.NUMPY)-interpolation(val,backend=BACKEND.NUMBA),
+              interpolation.derivative(val,backend=BACKEND.NUMPY)-interpolation.derivative(val,backend=BACKEND.NUMBA))
+    
+    for rule in (INTEGRATION_TYPE.RECTANGLE,INTEGRATION_TYPE.TRAPZOID,INTEGRATION_TYPE.BOOLE):
+        areas=[intergration_func(0,4,piecewise,rule,1000,backend=backend) for backend in BACKEND]
+        print(rule.name,areas,areas[0]-areas[1])
+    
+    for scheme in CHROM_SCHEME:
+        simulator=HPLCSimulator(dx=0.05,dt=0.01 if scheme==CHROM_SCHEME.EXPLICIT else 0.1,scheme=scheme,
+                                D=np.array([0.01,0.02]),Ka=np.array([0.3,0.6]))
+        fields=[simulator.simulate(300,inlet=lambda t:1.0 if t<0.5 else 0.0,save_every=10,backend=backend)
+                for backend in BACKEND]
+        print(scheme.name,np.max(np.abs(fields[0]-fields[1])))
+    
+    # global switch, per-call backend still takes precedence
+    set_default_backend(BACKEND.NUMBA)
+    print(intergration_func(0,4,piecewise,INTEGRATION_TYPE.BOOLE,1000))
+    set_default_backend(BACKEND.NUMPY)
+    
+    # a kernel numba fails to type falls back to the NumPy path (with one warning) instead of returning garbage
+    if numba_available():
+        import numba
+        from .. import backend as _backend
+        from ..chromatography import _simulate_kernel
+        from ..interpolation import _lagrange_value
+        def untypable(*args):
+            raise numba.core.errors.TypingError("simulated typing failure")
+        saved={kernel:_backend._KERNELS.get(kernel) for kernel in (_simulate_kernel,_lagrange_value)}
+        for kernel in saved:
+            _backend._KERNELS[kernel]=untypable
+        simulator=HPLCSimulator()
+        simulator.simulate(100,save_every=None,backend=BACKEND.NUMBA)
+        detector=simulator.detector
+        simulator.simulate(100,save_every=None,backend=BACKEND.NUMPY)
+        print(np.max(np.abs(detector-simulator.detector))) # 0.0
+        print(interpolation(0.7,backend=BACKEND.NUMBA)-interpolation(0.7,backend=BACKEND.NUMPY)) # 0.0
+        for kernel,compiled in saved.items():
+            if compiled is None:
+                del _backend._KERNELS[kernel]
+            else:
+                _backend._KERNELS[kernel]=compiled
@@ -0,0 +1,41 @@
+import numpy as np
+from ..regression import LinRegressor, PolynomialRegressor, Regressor, bootstrap
+from ..regression.RegressUtils import hyperbl
+from ..cache import ResultCache, set_default_cache
+
+def gauss_newton(func,x,y,parameters,step=1.0,h=1e-7):
+    residues=func(x,*parameters)-y
+    jac=np.stack([(func(x,*(parameters+h*e))-func(x,*parameters))/h for e in np.eye(len(parameters))],axis=1)
+    return -step*np.linalg.lstsq(jac,residues,rcond=None)[0]
+
+if __name__ == '__main__':
+    
+    x=np.linspace(-10,10,20)
+    y=3.5*x+4.2+np.random.randn(20)
+    regressor=LinRegressor(x,y)
+    print(regressor.fit())
+    result=bootstrap(regressor,n_resamples=10000,seed=0)
+    print(f"slope:{result['ci_low'][0]}~{result['ci_high'][0]}, intercept:{result['ci_low'][1]}~{result['ci_high'][1]}")
+    
+    x1=np.linspace(-6,6,25)
+    y1=0.25*x1**3+0.45*x1**2-1.34*x1+9.48+np.random.randn(25)
+    regressor=PolynomialRegressor(x1,y1,degree=3)
+    regressor.fit()
+    result=bootstrap(regressor,n_resamples=10000,seed=0)
+    print(result["se"],np.sqrt(np.diag(regressor.pcov)))
+    
+    x2=np.linspace(2,10,30)
+    y2=hyperbl(x2,4.5,6.5)+0.02*np.random.randn(30)
+    regressor=Regressor(hyperbl,x2,y2,max_iter=2000,tol=1e-8,bound=(-5,5))
+    regressor.fit()
+    result=bootstrap(regressor,n_resamples=400,seed=0,chunk_size=50)
+    print(result["ci_low"],result["ci_high"])
+    
+    # the resamples are refitted with the same gradient function and are not written to the default cache
+    cache=ResultCache()
+    set_default_cache(cache)
+    regressor=Regressor(hyperbl,x2,y2,initial_para=np.array([4.0,6.0]),max_iter=200,grad_func=gauss_newton)
+    regressor.fit()
+    result=bootstrap(regressor,n_resamples=200,seed=0,chunk_size=50)
+    print(result["ci_low"],result["ci_high"],len(cache)) # only the original fit is cached
+    set_default_cache(None)
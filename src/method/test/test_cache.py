@@ -0,0 +1,51 @@
+import time
+import tempfile
+import numpy as np
+from ..cache import ResultCache, set_default_cache
+from ..interpolation import Interpolation, INTERPOLATE_TYPE
+from ..regression import LinRegressor, PolynomialRegressor, Regressor
+from ..regression.RegressUtils import hyperbl
+
+if __name__ == '__main__':
+    
+    cache=ResultCache(max_bytes=2**20,path=tempfile.mkdtemp())
+    x=np.linspace(2,10,30)
+    y=hyperbl(x,4.5,6.5)+0.02*np.random.randn(30)
+    for _ in range(3):
+        print(Regressor(hyperbl,x,y,initial_para=np.array([4.0,6.0])).fit(cache=cache)[0])
+        print(PolynomialRegressor(x,y,degree=3).fit(cache=cache)[0])
+        print(LinRegressor(x,y,del_saparated_point=True).fit(cache=cache)[:2])
+    print(cache.stats())
+    
+    set_default_cache(cache) # used by every fit without a cache argument
+    x1=np.linspace(0,10,300)
+    for _ in range(2):
+        start=time.time()
+        interpolation=Interpolation(x1,np.sin(x1),INTERPOLATE_TYPE.CUBIC)
+        print(f"cubic interpolation: {time.time()-start:.4f}s")
+    print(cache.stats())
+    
+    cache.invalidate()
+    set_default_cache(None)
+    print(len(cache),cache.stats())
+    
+    # models differing only in the called function or in a closure value get different keys
+    cache=ResultCache()
+    x2=np.linspace(0,1,20)
+    y2=np.sin(2*x2)
+    for model in (lambda x,a:np.sin(a*x),lambda x,a:np.cos(a*x)):
+        print(Regressor(model,x2,y2,initial_para=np.array([1.5])).fit(cache=cache)[0])
+    def shifted(c):
+        return lambda x,a:np.sin(a*x)+c
+    for c in (0.0,5.0):
+        print(Regressor(shifted(c),x2,y2,initial_para=np.array([1.5])).fit(cache=cache)[0])
+    print(cache.stats()) # should be 0 hits
+    regressor=LinRegressor(x,np.stack((y,y+0.1,y-0.1),axis=1))
+    regressor.fit(cache=cache)
+    regressor.fit(cache=cache)
+    print(cache.stats()) # the second fit of the same object is a hit
+    
+    # functions with nested code objects (generator expressions, inner functions) are hashed as well
+    def nested(x,a):
+        return sum(np.sin(a*x)**k for k in range(1,2))
+    print(Regressor(nested,x2,y2,initial_para=np.array([1.5])).fit(cache=cache)[0])
@@ -0,0 +1,39 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from ..chromatography import HPLCSimulator, CHROM_SCHEME, SweepCache, sweep
+
+# same parameters as example_code/HPLC.py, explicit scheme is unstable with this dt
+L,dx,dt,time_steps=10,0.1,0.1,100
+simulator=HPLCSimulator(L=L,v=1,D=0.01,Ka=0.5,dx=dx,dt=dt,scheme=CHROM_SCHEME.CRANK_NICOLSON)
+C=simulator.simulate(time_steps)
+plt.imshow(C, aspect='auto', cmap='viridis', extent=[0, L, 0, time_steps*dt])
+plt.colorbar(label="Concentration")
+plt.xlabel("Position (cm)")
+plt.ylabel("Time (min)")
+plt.show()
+
+# two components on a fine grid, only every 100th time slice is stored
+simulator=HPLCSimulator(L=10,v=1,D=[0.01,0.01],Ka=[0.05,0.2],dx=0.01,dt=0.01)
+C=simulator.simulate(1500,save_every=100,inlet=lambda t:1.0 if t<0.1 else 0.0)
+print(C.shape) # (16, 2, 1000)
+fig,ax=plt.subplots()
+ax.plot(simulator.t,simulator.detector)
+plt.show()
+
+# the default injection is a unit amount in the first interior cell, its detector area does not depend on\
+# the time step or the scheme
+for scheme in CHROM_SCHEME:
+    for dt in (0.001,0.01):
+        simulator=HPLCSimulator(dt=dt,scheme=scheme)
+        simulator.simulate(int(30/dt),save_every=None)
+        print(scheme.name,dt,np.trapezoid(simulator.detector,simulator.t)) # all 0.0074554729752
+
+if __name__ == '__main__':
+    
+    cache=SweepCache()
+    result=sweep(v=[0.5,1.0,2.0],D=[0.005,0.01],Ka=[0.1,0.5],L=[5.0,10.0],dx=0.05,dt=0.02,cache=cache)
+    print(result[["v","L","retention_time","plates"]])
+    result=sweep(v=[0.5,1.0,2.0,4.0],D=[0.005,0.01],Ka=[0.1,0.5],L=[5.0,10.0],dx=0.05,dt=0.02,cache=cache)
+    print(len(cache)) # only runs with v=4.0 are simulated again
+    result=sweep(v=[1.0,2.0],L=[5.0],dx=0.05,dt=0.02,scheme=CHROM_SCHEME.IMPLICIT)
+    print(result[["v","retention_time","plates"]]) # finite metrics with the default injection
@@ -0,0 +1,35 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from ..regression import SAPARATE_DELETE, PolynomialRegressor, PolyvarRegressor, Regressor, consensus_fit
+from ..regression.RegressUtils import rlogistic
+
+if __name__ == '__main__':
+    
+    # calibration curve with a quarter of gross errors
+    x=np.linspace(-6,6,80)
+    y=0.25*x**3+0.45*x**2-1.34*x+9.48+0.2*np.random.randn(80)
+    y[::4]+=np.random.uniform(-20,20,20)
+    for method in (SAPARATE_DELETE.RANSAC,SAPARATE_DELETE.LMedS):
+        regressor=PolynomialRegressor(x,y,degree=3)
+        result=consensus_fit(regressor,method,seed=0)
+        print(method.name,result["params"],result["trials"],len(result["inliers"])) # should be close to [9.48,-1.34,0.45,0.25], 60 inliers
+    print(PolynomialRegressor(x,y,degree=3).fit(cache=False)[0]) # least squares for comparison
+    
+    X=np.random.randn(200,3)
+    y1=1+X.dot([2.0,-3.0,0.5])+0.05*np.random.randn(200)
+    y1[:30]+=8
+    result=consensus_fit(PolyvarRegressor(X,y1),seed=0)
+    print(result["params"],len(result["inliers"])) # should be close to [1,2,-3,0.5], 170 inliers
+    
+    # dose-response curve, the minimal Levenberg-Marquardt fits run on a process pool
+    x2=np.linspace(-5,5,60)
+    y2=rlogistic(x2,5,2,1.5)+0.05*np.random.randn(60)
+    y2[::6]+=1.5
+    regressor=Regressor(rlogistic,x2,y2,initial_para=np.array([4.0,1.0,1.0]))
+    result=consensus_fit(regressor,seed=0,n_jobs=None)
+    print(result["params"],result["trials"]) # should be close to [5,2,1.5]
+    fig,ax=plt.subplots()
+    regressor.plot(ax)
+    regressor.scatter(ax)
+    ax.scatter(x2[regressor.inlier_id],y2[regressor.inlier_id],color="red",s=8)
+    plt.show()
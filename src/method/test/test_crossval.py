@@ -0,0 +1,27 @@
+import numpy as np
+import functools
+from ..regression import PolynomialRegressor, LinRegressor, Regressor, CV_BACKEND,\
+    cross_validate, leave_one_out, select_degree, lasso_cv
+from ..regression.RegressUtils import hyperbl
+
+if __name__ == '__main__':
+    
+    x=np.linspace(-6,6,40)
+    y=0.25*x**3+0.45*x**2-1.34*x+9.48+np.random.randn(40)
+    
+    print(cross_validate(PolynomialRegressor,x,y,k=5,degree=3,backend=CV_BACKEND.PROCESS))
+    print(leave_one_out(PolynomialRegressor(x,y,degree=3))["mse"])
+    print(leave_one_out(LinRegressor(x,y))["mse"])
+    print(select_degree(x,y,degrees=range(1,8))) # best degree should be 3
+    print(select_degree(x,y,degrees=range(1,8),k=5))
+    print(select_degree(x[::5],y[::5])) # 8 points, degrees >= 6 interpolate the training points (mse inf)
+    
+    x1=np.linspace(2,10,30)
+    y1=hyperbl(x1,4.5,6.5)+0.01*np.random.randn(30)
+    print(cross_validate(functools.partial(Regressor,hyperbl),x1,y1,k=5,backend=CV_BACKEND.THREAD,
+                         max_iter=2000,tol=1e-8,bound=(-5,5)))
+    
+    X2=np.random.randn(50,10)
+    y2=X2.dot(np.array([1.5,0,0,-2.3,0,0,0,4.6,0,0]))+0.1*np.random.randn(50)
+    result=lasso_cv(X2,y2,k=5,num_C=30)
+    print(result["best_C"],result["weights"])
@@ -1,5 +1,6 @@
 import numpy as np
 from ..devint import *
+from ..instrument import instrument
 
 def test_func(x:float):
     return np.exp(-x)+np.sin(x)-x**2
@@ -25,4 +26,52 @@ x=np.linspace(-2,3,100)
 y=test_func(x)
 dev=derivative_discrete(x,y)
 print(f"relative discrete derivative error={((dev-test_func_dev(x))/test_func_dev(x)).mean()}")
-print(f"integration of array:{integration_discrete(x,y,absolute=False)}")
\ No newline at end of file
+print(f"integration of array:{integration_discrete(x,y,absolute=False)}")
+def test_func_dev2(x:float):
+    return np.exp(-x)-np.sin(x)-2
+
+print(f"weights of 4th-order central stencil:{fd_weights(1,central_offsets(1,4))}")
+print(f"weights of non-uniform stencil:{fd_weights(2,(-1,0,0.5,2))}")
+for accuracy in (2,4,6):
+    print(f"2nd derivative, accuracy {accuracy}:{derivative_stencil(3.0,test_func,order=2,accuracy=accuracy)}")
+# real value: -2.09133293969
+points=np.linspace(-2,3,5)
+print(f"one-sided stencil at {points}:{derivative_stencil(points,test_func,offsets=(0,1,2,3))}")
+x=np.sort(np.random.default_rng(0).uniform(-2,3,100))
+y=test_func(x)
+for accuracy in (2,4):
+    dev=derivative_discrete(x,y,order=1,accuracy=accuracy)
+    dev2=derivative_discrete(x,y,order=2,accuracy=accuracy)
+    print(f"non-uniform grid, accuracy {accuracy}: max error of 1st derivative={abs(dev-test_func_dev(x)).max()},\
+ 2nd derivative={abs(dev2-test_func_dev2(x)).max()}")
+
+print(f"Ridders:{derivative_func(3.0,test_func,DERIVATIZATION_TYPE.RIDDERS)}")
+result=derivative_ridders(points,test_func)
+print(f"Ridders at {points}: error={result['derivative']-test_func_dev(points)},\
+ estimated error={result['error']}, evaluations={result['evaluations']}")
+# the step 0.1 reaches out of the domain of sqrt, it is shrunk instead of returning NaN
+print(f"Ridders near the domain edge:{derivative_ridders(1e-8,np.sqrt,h=0.1)}") # 5000
+with instrument() as recorder:
+    derivative_func(3.0,test_func,DERIVATIZATION_TYPE.RIDDERS)
+print(recorder.counters, derivative_ridders(3.0,test_func)["evaluations"]) # same number of evaluations
+
+for n_nodes in (8,16,24):
+    print(f"Gauss-Legendre, {n_nodes} nodes:{intergration_func(-2,3,test_func,INTEGRATION_TYPE.GAUSS_LEGENDRE,n_domains=1,n_nodes=n_nodes)}")
+    print(f"Clenshaw-Curtis, {n_nodes} nodes:{intergration_func(-2,3,test_func,INTEGRATION_TYPE.CLENSHAW_CURTIS,n_domains=1,n_nodes=n_nodes)}")
+print(f"composite Gauss-Legendre, 4 panels*6 nodes:{intergration_func(-2,3,test_func,INTEGRATION_TYPE.GAUSS_LEGENDRE,n_domains=4,n_nodes=6)}")
+with instrument() as recorder:
+    intergration_func(-2,3,test_func,INTEGRATION_TYPE.GAUSS_LEGENDRE,n_nodes=16)
+print(recorder.counters) # one panel by default: 16 points in one vectorized call
+
+# noisy trace: raw 3-point derivative against Savitzky-Golay derivative
+rng=np.random.default_rng(1)
+x=np.linspace(-2,3,2001)
+y=test_func(x)+1e-3*rng.standard_normal(x.size)
+print(f"noisy data: max error of derivative_discrete={abs(derivative_discrete(x,y)-test_func_dev(x)).max()},\
+ savgol_filter={abs(savgol_filter(y,51,3,deriv=1,x=x)-test_func_dev(x)).max()}")
+xn=np.sort(rng.uniform(-2,3,2001))
+yn=test_func(xn)+1e-3*rng.standard_normal(xn.size)
+print(f"non-uniform noisy data: max error of savgol_filter={abs(savgol_filter(yn,51,3,deriv=1,x=xn)-test_func_dev(xn)).max()}")
+chunks=np.array_split(np.stack([y,2*y]),20,axis=1)
+streamed=np.concatenate(list(savgol_stream(chunks,51,3,deriv=1,delta=x[1]-x[0])),axis=1)
+print(f"streamed in 20 chunks, difference to savgol_filter={abs(streamed-savgol_filter(np.stack([y,2*y]),51,3,deriv=1,x=x)).max()}")
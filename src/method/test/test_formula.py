@@ -0,0 +1,22 @@
+from ..formula import parse_formula, formula_matrix
+
+examples = [
+    "Mg[Fe(CN)6]2",
+    "K4[ON(SO3)2]2",
+    "Na3[Co(NO2)6]",
+    "C2H5OH",
+    "CuSO4·5H2O",
+    "CuSO4.5H2O",
+    "CaSO4·0.5H2O", # O 4.5, H 1
+    "Fe^3+", # "Fe3+" would be Fe3 with charge +1
+    "[Fe(CN)6]^4-",
+    "NH4+"
+]
+
+for f in examples:
+    print(f"{f} → {parse_formula(f,return_charge=True)}")
+
+matrix,elements,charges=formula_matrix(examples,return_charge=True)
+print(elements)
+print(matrix)
+print(charges)
@@ -0,0 +1,33 @@
+import numpy as np
+from ..instrument import instrument
+from ..devint import derivative_func, intergration_func, INTEGRATION_TYPE
+from ..regression import Regressor, LinRegressor
+from ..regression.RegressUtils import hyperbl
+
+if __name__ == '__main__':
+    
+    with instrument(callback=lambda metrics: print(metrics["counters"])) as recorder:
+        print(derivative_func(1.0,np.exp))
+        print(intergration_func(0,1,np.exp,INTEGRATION_TYPE.BOOLE,n_domains=10))
+        x=np.linspace(2,10,30)
+        Regressor(hyperbl,x,hyperbl(x,4.5,6.5),initial_para=np.array([4.0,6.0])).fit()
+        LinRegressor(x,3.5*x+4.2+np.random.randn(30),del_saparated_point=True).fit()
+    for item in recorder.series["Regressor.fit"]:
+        print(item["iteration"],item["loss"],item["lamb"])
+    print(recorder.timers)
+    print(recorder.to_json(indent=1)[:200])
+    
+    # recorders are local to the thread that opened the block, concurrent fits are not mixed
+    import threading
+    counters={}
+    def worker(name,repeats):
+        with instrument() as recorder:
+            for _ in range(repeats):
+                LinRegressor(x,3.5*x+4.2).fit(cache=False)
+        counters[name]=recorder.counters
+    threads=[threading.Thread(target=worker,args=(name,repeats)) for name,repeats in (("a",2),("b",5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(counters) # one linear solve (the covariance) per fit: a 2, b 5
@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from ..regression import SAPARATE_DELETE, LinRegressor
+from ..regression.RegressUtils import Arrhenius
 
 if __name__ == '__main__':
     
@@ -27,4 +28,29 @@ if __name__ == '__main__':
     fig,ax=plt.subplots()
     regressor.plot(ax)
     regressor.errorbar(ax)
-    plt.show()
\ No newline at end of file
+    plt.show()
+    
+    T=np.linspace(280,350,20)
+    k=1e6*np.exp(-5000/T)*(1+0.02*np.random.randn(20))
+    T=np.append(T,-1.0) # out of the domain of Arrhenius transform, deleted with a warning
+    k=np.append(k,3.0)
+    regressor=LinRegressor(T,k,weights=1/(0.02*k),transform_xy=Arrhenius)
+    slope,intercept,pcov,Rsq,Rsq_adj=regressor.fit()
+    print(f"Ea/R={-slope}, A={np.exp(intercept)}") # should be 5000 and 1e6
+    
+    # deterministic robust fits: a few weighted solves instead of random trials
+    x=np.linspace(-10,10,50)
+    y=3.5*x+4.2+np.random.randn(50)
+    y[::7]+=25
+    for method in (SAPARATE_DELETE.HUBER,SAPARATE_DELETE.TUKEY):
+        regressor=LinRegressor(x,y,del_saparated_point=True,optim_method=method)
+        print(method.name,regressor.fit()[:2],len(regressor.inlier_id)) # 42 inliers
+    # the robust standard error of the slope is computed on all points, close to the least squares one\
+    # (about 0.024) on clean data, where (almost) no point is reported as an outlier
+    y=3.5*x+4.2+np.random.randn(50)
+    regressor=LinRegressor(x,y,del_saparated_point=True,optim_method=SAPARATE_DELETE.HUBER)
+    print(np.sqrt(regressor.fit()[2][0,0]),np.sqrt(LinRegressor(x,y).fit()[2][0,0]),len(regressor.inlier_id))
+    fig,ax=plt.subplots()
+    regressor.plot(ax)
+    regressor.scatter(ax)
+    plt.show()
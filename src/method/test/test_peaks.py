@@ -0,0 +1,35 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from ..chromatography import HPLCSimulator
+from ..peaks import find_peaks, find_peaks_batch, estimate_baseline
+
+# five Gaussian peaks (two overlapping) on a drifting baseline
+t=np.linspace(0,20,4001)
+components=[(3,1.0,0.1),(6,0.5,0.15),(6.6,0.3,0.12),(12,2.0,0.2),(16,0.05,0.1)]
+clean=sum(h*np.exp(-0.5*((t-rt)/w)**2) for rt,h,w in components)
+rng=np.random.default_rng(0)
+signal=clean+0.02*t+0.5+0.1*np.sin(t/5)+0.005*rng.standard_normal(len(t))
+
+peaks=find_peaks(t,signal)
+print(peaks[["retention_time","height","area","width","plates"]])
+print(f"true areas:{[h*w*np.sqrt(2*np.pi) for _,h,w in components]}")
+
+fig,ax=plt.subplots()
+ax.plot(t,signal)
+ax.plot(t,signal-clean,alpha=0.5) # baseline and noise
+ax.plot(peaks["retention_time"],signal[peaks["index"]],"x")
+for start,end in zip(peaks["start"],peaks["end"]):
+    ax.axvspan(start,end,alpha=0.1)
+plt.show()
+
+# detector signal of the column simulator
+simulator=HPLCSimulator(L=10,v=1,D=0.01,Ka=0.05,dx=0.05,dt=0.02)
+simulator.simulate(1000,save_every=None,inlet=lambda t:1.0 if t<0.1 else 0.0)
+print(find_peaks(simulator.t,simulator.detector,baseline=False))
+
+if __name__ == '__main__':
+    
+    signals=clean*rng.uniform(0.5,2.0,(500,1))+0.005*rng.standard_normal((500,len(t)))
+    result=find_peaks_batch(t,signals,baseline=False)
+    print(len(result),np.bincount(result["injection"]).min(),np.bincount(result["injection"]).max())
+    print(result[result["injection"]<2])
@@ -0,0 +1,22 @@
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from ..plotting import decimate_minmax, plot_lod
+
+if __name__ == '__main__':
+    
+    x=np.linspace(0,100,1000000)
+    y=np.sin(x)+0.1*np.random.randn(len(x))
+    x_,y_=decimate_minmax(x,y,800)
+    print(len(x_),y_.max()==y.max(),y_.min()==y.min())
+    
+    fig,ax=plt.subplots()
+    start=time.time()
+    line=plot_lod(ax,x,y,label="1e6 points")
+    fig.canvas.draw()
+    print(f"first draw: {time.time()-start:.3f}s, {len(line.line.get_xdata())} points drawn")
+    start=time.time()
+    line=plot_lod(ax,x,np.cos(x)+0.1*np.random.randn(len(x)),line=line)
+    fig.canvas.draw()
+    print(f"update: {time.time()-start:.3f}s, {len(ax.lines)} line(s)")
+    plt.show()
@@ -1,7 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from ..regression.polyregress import PolynomialRegressor, PolyvarRegressor
-from ..regression.lasso import LASSO
+from ..regression.polyregress import PolynomialRegressor, PolyvarRegressor, RIDGE_CRITERION
+from ..regression.lasso import LASSO, LASSO_SOLVER, lasso_path
 
 x=np.linspace(-6,6,25)
 y=0.25*x**3+0.45*x**2-1.34*x+9.48
@@ -20,6 +20,10 @@ y1=x1_.dot(w)
 mulregressor=PolyvarRegressor(x1,y1,lamb=0.0)
 print(mulregressor.fit())
 
+path=mulregressor.fit_path(np.logspace(-4,2,100),criterion=RIDGE_CRITERION.LOO)
+print(f"best lambda:{path['best_lamb']}, LOO:{path['loo'].min()}")
+print(mulregressor.weights)
+
 y2=np.array([-1.077,-1.308,-1.248,-0.534,0.868,0.721,1.534,-0.392,1.443,-0.205]).reshape(10,1)
 X2=np.array([[-1.784, -0.192, 0.505, 0.346],
             [-0.749, 0.762, -1.823, 0.215],
@@ -32,4 +36,18 @@ X2=np.array([[-1.784, -0.192, 0.505, 0.346],
             [0.705, -1.287, 0.078, 0.984],
             [-0.637, -0.378, 0.070, 1.140]])
 
-print(LASSO(X2,y2,C=0.1,learning_rate=0.001,max_iter=500))
\ No newline at end of file
+print(LASSO(X2,y2,C=0.1,learning_rate=0.001,max_iter=500,solver=LASSO_SOLVER.ISTA))
+print(LASSO(X2,y2,C=0.1))
+w,b,history=LASSO(X2,y2,C=0.1,solver=LASSO_SOLVER.FISTA,return_history=True)
+print(w,b,history["n_iter"])
+path=lasso_path(X2,y2,num_C=20)
+print(f"non-zero weights along the path:{(path['weights']!=0).sum(axis=1)}")
+from ..regression.robust import ROBUST_LOSS
+y3=y+np.random.randn(25)
+y3[::6]-=30
+for robust in (None,ROBUST_LOSS.HUBER,ROBUST_LOSS.TUKEY):
+    regressor=PolynomialRegressor(x,y3,degree=3)
+    print(robust,regressor.fit(robust=robust)[0]) # should be close to [9.48,-1.34,0.45,0.25]
+y4=y1.copy()
+y4[:3]+=50
+print(PolyvarRegressor(x1,y4).fit(robust=ROBUST_LOSS.TUKEY)[0]) # should be close to w
@@ -1,7 +1,8 @@
 import numpy as np
+import threading
 import matplotlib.pyplot as plt
 from scipy.optimize import curve_fit
-from ..regression import Regressor
+from ..regression import Regressor, FitCancelled
 from ..regression.RegressUtils import *
 
 x=np.linspace(2,10,30)
@@ -13,4 +14,23 @@ print(regress.fit())
 fig, ax=plt.subplots()
 regress.plot(ax)
 regress.scatter(ax)
-plt.show()
\ No newline at end of file
+plt.show()
+
+regress=Regressor(hyperbl,x,y,max_iter=2000,tol=1e-8,bound=(-5,5))
+cancel=threading.Event()
+def callback(iteration,loss,lamb,parameters):
+    print(iteration,loss,lamb)
+    if iteration==4:
+        cancel.set()
+try:
+    regress.fit(callback=callback,cancel=cancel)
+except FitCancelled as err:
+    print(err)
+
+# positional arguments after lambda_init are passed to grad_func
+def gauss_newton(func,x,y,parameters,step,h=1e-7):
+    residues=func(x,*parameters)-y
+    jac=np.stack([(func(x,*(parameters+h*e))-func(x,*parameters))/h for e in np.eye(len(parameters))],axis=1)
+    return -step*np.linalg.lstsq(jac,residues,rcond=None)[0]
+regress=Regressor(hyperbl,x,y,initial_para=np.array([4.0,6.0]),max_iter=2000,grad_func=gauss_newton)
+print(regress.fit(2.0,0.1,0.8,cache=False)[0]) # close to [4.5,6.5]
@@ -0,0 +1,17 @@
+from ..stoichiometry import molar_mass, molar_masses, balance_reaction, balance_reactions
+
+print(molar_mass("CuSO4·5H2O")) # 249.68
+print(molar_masses(["H2O","C6H12O6","Mg[Fe(CN)6]2"]))
+
+reactions=[
+    "Fe2O3 + CO -> Fe + CO2",
+    "C8H18 + O2 = CO2 + H2O",
+    "KMnO4 + HCl -> KCl + MnCl2 + H2O + Cl2",
+    "MnO4- + Fe+2 + H+ -> Mn+2 + Fe+3 + H2O",
+    "Cu+2 + 2e- -> Cu", # half-reaction, the coefficient of e- is ignored like any other
+    "MnO4- + H+ + e- -> Mn+2 + H2O",
+    "H2 + O2 -> H2O2 + H2O" # no unique balance
+]
+print(balance_reaction(reactions[2]))
+for result in balance_reactions(reactions,errors="ignore"):
+    print(result["equation"] if result is not None else None)